@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""Time TaskManager against synthetic Taskwarrior databases.
+
+Each database is generated with `task import` into a temporary TASKDATA,
+so nothing but the `task` binary is needed and your own tasks are never
+touched. Results are written as JSON; pass --baseline with an earlier
+result file to fail when a benchmark got slower than --tolerance allows.
+
+    python benchmarks/bench_data_layer.py --sizes 1000,10000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import TaskManager  # noqa: E402
+from tasklib import TaskWarrior  # noqa: E402
+
+
+PROJECTS = [
+    "Work", "Work.Reports", "Work.Hiring", "Work.Infra", "Home", "Home.Garden",
+    "Home.Repairs", "Health", "Finance", "Learning", "Travel", "Writing",
+]
+TAGS = [
+    "next", "urgent", "waiting", "phone", "email", "errand", "review", "code",
+    "read", "someday", "bug", "meeting", "quick", "deep", "followup",
+]
+WORDS = [
+    "write", "review", "call", "fix", "plan", "book", "buy", "email", "draft",
+    "update", "clean", "report", "invoice", "budget", "pipeline", "release",
+    "garden", "dentist", "tickets", "notes", "backup", "server", "slides",
+]
+# Share of generated tasks that are completed history
+COMPLETED_SHARE = 0.6
+
+
+def timestamp(moment):
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def generate_tasks(count, seed=0):
+    """Exported-format tasks: mostly completed history plus a pending backlog"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    tasks = []
+    pending = []
+    for _ in range(count):
+        entry = now - timedelta(days=rng.uniform(0, 3 * 365))
+        task = {
+            "uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))),
+            "entry": timestamp(entry),
+            "modified": timestamp(entry),
+            "status": "pending",
+        }
+        if rng.random() < 0.85:
+            task["project"] = rng.choice(PROJECTS)
+        if rng.random() < 0.7:
+            task["tags"] = rng.sample(TAGS, rng.randint(1, 3))
+        if rng.random() < 0.3:
+            task["priority"] = rng.choice("HML")
+        if rng.random() < 0.2:
+            task["due"] = timestamp(now + timedelta(days=rng.uniform(-30, 60)))
+        if rng.random() < 0.05:
+            task["annotations"] = [{
+                "entry": timestamp(entry), "description": "see " + rng.choice(WORDS),
+            }]
+
+        if rng.random() < COMPLETED_SHARE:
+            end = entry + timedelta(days=rng.uniform(0, 60))
+            task["status"] = "completed"
+            task["end"] = task["modified"] = timestamp(min(end, now))
+        else:
+            # Dependencies only point at earlier pending tasks, so never cycle
+            if pending and rng.random() < 0.1:
+                task["depends"] = rng.sample(pending, min(len(pending), rng.randint(1, 2)))
+            pending.append(task["uuid"])
+        tasks.append(task)
+    return tasks
+
+
+def make_database(directory, count, seed=0):
+    """Create a taskrc and a database of `count` tasks under `directory`"""
+    data = os.path.join(directory, "data")
+    os.makedirs(data, exist_ok=True)
+    taskrc = os.path.join(directory, "taskrc")
+    with open(taskrc, "w") as f:
+        f.write(f"data.location={data}\nconfirmation=off\nverbose=nothing\nhooks=off\n")
+
+    tasks_file = os.path.join(directory, "import.json")
+    with open(tasks_file, "w") as f:
+        json.dump(generate_tasks(count, seed), f)
+    subprocess.run(
+        ["task", f"rc:{taskrc}", "import", tasks_file],
+        check=True, stdout=subprocess.DEVNULL, env=dict(os.environ, TASKDATA=data),
+    )
+    os.remove(tasks_file)
+    return data, taskrc
+
+
+def measure(fn, runs, setup=None):
+    """Run fn() `runs` times (after setup(), untimed) and return the timings in ms"""
+    timings = []
+    for _ in range(runs):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+def data_layer_benchmarks(make_manager, runs):
+    """(name, timings) for every TaskManager operation worth tracking"""
+    results = []
+
+    def record(name, fn, runs=runs, setup=None):
+        results.append((name, measure(fn, runs, setup)))
+
+    record("init", make_manager)
+    task_manager = make_manager()
+    record("update_task_lists", task_manager.update_task_lists)
+    record("refresh", task_manager.refresh)
+
+    project = task_manager.projects[0] if task_manager.projects else None
+    tag = task_manager.tags[0] if task_manager.tags else None
+    word = task_manager.current_tasks[0]["description"].split()[0]
+
+    def filter_then_clear(apply):
+        def run():
+            apply()
+            task_manager.clear_filters()
+        return run
+
+    record("filter_project", filter_then_clear(lambda: task_manager.set_project_filter(project)))
+    record("filter_tag", filter_then_clear(lambda: task_manager.set_tag_filter(tag)))
+    record("filter_text", filter_then_clear(lambda: task_manager.set_filter(word)))
+    # As typed into the filter dialog, one key at a time
+    record("filter_text_typed", filter_then_clear(
+        lambda: [task_manager.set_filter(word[:n]) for n in range(1, len(word) + 1)]
+    ))
+    record("group_by_project", task_manager._group_by_project)
+    record("group_by_tag", task_manager._group_by_tag)
+
+    record("toggle_completed_on", task_manager.toggle_completed, runs=1)
+    record("load_completed_page", lambda: task_manager.load_completed_near(
+        len(task_manager.current_tasks) - 1
+    ))
+    record("toggle_completed_off", task_manager.toggle_completed, runs=1)
+
+    def last_index():
+        return len(task_manager.current_tasks) - 1
+
+    record("add_task", lambda: task_manager.add_task("bench task", project="Bench", tags=["bench"]))
+    record("edit_task", lambda index: task_manager.edit_task(index, priority="H"),
+           setup=last_index)
+    record("set_dependency", lambda index: task_manager.set_dependency(
+        index, task_manager.current_tasks[0]
+    ), setup=last_index)
+    record("complete_task", lambda index: task_manager.complete_task(index), setup=last_index)
+    record("delete_task", lambda index: task_manager.delete_task(index), setup=last_index)
+
+    def mark_ten():
+        task_manager.clear_marks()
+        for index in range(max(0, last_index() - 9), last_index() + 1):
+            task_manager.toggle_mark(index)
+
+    record("bulk_modify", lambda _: task_manager.bulk_modify(tags=["bulk"]), setup=mark_ten)
+    record("bulk_complete", lambda _: task_manager.bulk_complete(), setup=mark_ten)
+    record("bulk_delete", lambda _: task_manager.bulk_delete(), setup=mark_ten)
+    return results
+
+
+def summarise(size, name, timings):
+    return {
+        "size": size,
+        "benchmark": name,
+        "runs": len(timings),
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Results whose median is more than `tolerance` slower than the baseline's"""
+    previous = {(r["size"], r["benchmark"]): r for r in baseline["results"]}
+    slower = []
+    for result in results:
+        before = previous.get((result["size"], result["benchmark"]))
+        if before and result["median_ms"] > before["median_ms"] * (1.0 + tolerance):
+            slower.append((result, before))
+    return slower
+
+
+def task_version():
+    try:
+        return subprocess.run(
+            ["task", "--version"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma separated task counts (default: %(default)s)")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    version = task_version()
+    if version is None:
+        parser.error("the `task` binary is needed to build the benchmark databases")
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        directory = tempfile.mkdtemp(prefix=f"tsakarori-bench-{size}-")
+        try:
+            data, taskrc = make_database(directory, size, args.seed)
+            os.environ["TASKDATA"] = data
+            os.environ["TASKRC"] = taskrc
+
+            def make_manager():
+                return TaskManager(tw=TaskWarrior(data_location=data, taskrc_location=taskrc))
+
+            for name, timings in data_layer_benchmarks(make_manager, args.runs):
+                result = summarise(size, name, timings)
+                results.append(result)
+                print(f"{size:>7} {name:<22} {result['median_ms']:>10.1f} ms", file=sys.stderr)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "task": version,
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = regressions(results, baseline, args.tolerance)
+        for result, before in slower:
+            print(
+                f"REGRESSION {result['size']} {result['benchmark']}: "
+                f"{before['median_ms']:.1f} -> {result['median_ms']:.1f} ms",
+                file=sys.stderr,
+            )
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
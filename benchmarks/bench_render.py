@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Time TsakaroriTUI frames on a virtual screen.
+
+Drives TsakaroriTUI.main with scripted keys on a VirtualScreen, for each
+view at several terminal sizes and task counts, and reports per-frame
+time, window calls and terminal cells written while moving the selection
+(or, in the stats view, refreshing).
+No terminal or `task` binary is needed: tasks are generated and served
+from memory. Results are JSON; --baseline works as in bench_data_layer.
+
+    python benchmarks/bench_render.py --counts 1000,10000 --output render.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_data_layer import generate_tasks, regressions  # noqa: E402
+from profiler import percentile  # noqa: E402
+from tsakarori import TsakaroriTUI  # noqa: E402
+from virtual_screen import VirtualScreen, memory_task_manager  # noqa: E402
+
+
+VIEWS = ["all", "by_project", "by_tags", "stats"]
+SIZES = [(24, 80), (50, 160), (100, 250)]
+
+
+def render_frames(tasks, view, height, width, moves):
+    """Frames of `moves` selection moves (down then back up) in a view.
+
+    The stats view has no selection; it is repainted by refreshing instead.
+    """
+    steps = "r" * (2 * moves) if view == "stats" else "j" * moves + "k" * moves
+    keys = "v" * VIEWS.index(view) + steps + "q"
+    task_manager = memory_task_manager(tasks)
+    with VirtualScreen(height, width, keys) as screen:
+        TsakaroriTUI(task_manager).main(screen.stdscr)
+    return [frame for frame in screen.frames if frame.key in map(ord, set(steps))]
+
+
+def summarise(count, view, height, width, frames):
+    times = [frame.seconds * 1000.0 for frame in frames]
+    return {
+        "size": count,
+        "benchmark": f"{view}@{width}x{height}",
+        "view": view,
+        "terminal": [width, height],
+        "frames": len(frames),
+        "median_ms": round(statistics.median(times), 3),
+        "p95_ms": round(percentile(times, 0.95), 3),
+        "max_ms": round(max(times), 3),
+        "calls_per_frame": round(statistics.mean(frame.call_count for frame in frames), 1),
+        "chars_per_frame": round(statistics.mean(frame.chars_written for frame in frames), 1),
+        "cells_per_frame": round(statistics.mean(frame.cells_changed for frame in frames), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", default="100,1000,10000",
+                        help="comma separated task counts (default: %(default)s)")
+    parser.add_argument("--moves", type=int, default=100,
+                        help="selection moves down (and back up) per run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    # The TUI reads (and on first run writes) its colour config under HOME
+    os.environ["HOME"] = tempfile.mkdtemp(prefix="tsakarori-render-")
+
+    results = []
+    for count in (int(count) for count in args.counts.split(",")):
+        tasks = generate_tasks(count, args.seed)
+        for height, width in SIZES:
+            for view in VIEWS:
+                frames = render_frames(tasks, view, height, width, args.moves)
+                result = summarise(count, view, height, width, frames)
+                results.append(result)
+                print(
+                    f"{count:>7} {result['benchmark']:<20} {result['median_ms']:>8.2f} ms "
+                    f"{result['calls_per_frame']:>7.1f} calls {result['cells_per_frame']:>7.1f} cells",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = regressions(results, baseline, args.tolerance)
+        for result, before in slower:
+            print(
+                f"REGRESSION {result['size']} {result['benchmark']}: "
+                f"{before['median_ms']:.2f} -> {result['median_ms']:.2f} ms",
+                file=sys.stderr,
+            )
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""Headless stand-in for curses, for driving TsakaroriTUI without a terminal.
+
+VirtualScreen patches the curses functions Tsakarori uses, hands out
+VirtualWindows that draw into in-memory grids, and feeds scripted keys to
+getch(). Every screen update is diffed like curses' doupdate() would, and
+the work between two reads of a key is recorded as one Frame.
+
+    with VirtualScreen(24, 80, ["jjj", "v", "q"]) as screen:
+        TsakaroriTUI(task_manager).main(screen.stdscr)
+    screen.frames, screen.text()
+"""
+import curses
+import json
+import time
+from collections import Counter
+
+from models import TaskManager
+from task_row import TaskRow
+
+
+class Frame:
+    """Work done between two key reads: time, window calls and screen output"""
+
+    __slots__ = ("key", "seconds", "overhead", "calls", "chars_written", "cells_changed")
+
+    def __init__(self, key):
+        self.key = key
+        # Time spent in Tsakarori; `overhead` is the screen diffing done by
+        # VirtualScreen in place of the terminal, and is not counted
+        self.seconds = 0.0
+        self.overhead = 0.0
+        self.calls = Counter()
+        self.chars_written = 0
+        self.cells_changed = 0
+
+    @property
+    def call_count(self):
+        return sum(self.calls.values())
+
+    def __repr__(self):
+        return (f"Frame({self.key!r}, {self.seconds * 1000:.2f} ms, "
+                f"{self.call_count} calls, {self.cells_changed} cells)")
+
+
+class VirtualWindow:
+    """A curses window drawing into a grid of (char, attr) cells"""
+
+    def __init__(self, screen, height, width, y=0, x=0):
+        self.screen = screen
+        self.height = height
+        self.width = width
+        self.begin_y = y
+        self.begin_x = x
+        self.attr = 0
+        self.background = (" ", 0)
+        self.cursor = (0, 0)
+        self.cells = [[self.background] * width for _ in range(height)]
+
+    def _record(self, name):
+        self.screen.frame.calls[name] += 1
+
+    def _parse(self, args):
+        """Split (y, x, text[, attr]) or (text[, attr]) curses arguments"""
+        if len(args) >= 3 and isinstance(args[0], int):
+            y, x, text, *rest = args
+        else:
+            (y, x), (text, *rest) = self.cursor, args
+        return y, x, text, rest[0] if rest else self.attr
+
+    def _put(self, y, x, text, attr):
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            raise curses.error("addwstr() returned ERR")
+        if isinstance(text, bytes):
+            text = text.decode("utf-8", "replace")
+        self.screen.frame.chars_written += len(text)
+        for char in text:
+            if char == "\n":
+                self.cells[y][x:] = [(" ", attr)] * (self.width - x)
+                y, x = y + 1, 0
+            else:
+                self.cells[y][x] = (char, attr)
+                x += 1
+            if x == self.width:
+                y, x = y + 1, 0
+            if y == self.height:
+                # Like curses, writing into the last cell is an error
+                self.cursor = (self.height - 1, self.width - 1)
+                raise curses.error("addwstr() returned ERR")
+        self.cursor = (y, x)
+
+    def addstr(self, *args):
+        self._record("addstr")
+        self._put(*self._parse(args))
+
+    def addch(self, *args):
+        self._record("addch")
+        y, x, char, attr = self._parse(args)
+        self._put(y, x, chr(char) if isinstance(char, int) else char, attr)
+
+    def vline(self, y, x, char, n):
+        self._record("vline")
+        for row in range(y, min(y + n, self.height)):
+            self.cells[row][x] = ("|", self.attr)
+
+    def hline(self, y, x, char, n):
+        self._record("hline")
+        for col in range(x, min(x + n, self.width)):
+            self.cells[y][col] = ("-", self.attr)
+
+    def box(self, *args):
+        self._record("box")
+        self.vline(0, 0, 0, self.height)
+        self.vline(0, self.width - 1, 0, self.height)
+        self.hline(0, 0, 0, self.width)
+        self.hline(self.height - 1, 0, 0, self.width)
+
+    def attron(self, attr):
+        self._record("attron")
+        self.attr |= attr
+
+    def attroff(self, attr):
+        self._record("attroff")
+        self.attr &= ~attr
+
+    def attrset(self, attr):
+        self._record("attrset")
+        self.attr = attr
+
+    def bkgd(self, char, attr=0):
+        self._record("bkgd")
+        self.background = (char if isinstance(char, str) else chr(char), attr)
+
+    def erase(self):
+        self._record("erase")
+        self.cells = [[self.background] * self.width for _ in range(self.height)]
+
+    def clear(self):
+        self._record("clear")
+        self.erase()
+        # clear() also makes the next refresh repaint the whole terminal
+        self.screen.physical = None
+
+    def clrtoeol(self):
+        self._record("clrtoeol")
+        y, x = self.cursor
+        self.cells[y][x:] = [self.background] * (self.width - x)
+
+    def move(self, y, x):
+        self._record("move")
+        self.cursor = (y, x)
+
+    def getyx(self):
+        return self.cursor
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def getbegyx(self):
+        return self.begin_y, self.begin_x
+
+    def noutrefresh(self):
+        self._record("noutrefresh")
+        self.screen.copy_in(self)
+
+    def refresh(self):
+        self.noutrefresh()
+        self.screen.doupdate()
+
+    def getch(self):
+        return self.screen.read_key()
+
+    def getkey(self):
+        key = self.screen.read_key()
+        return chr(key) if key >= 0 else ""
+
+    def getstr(self, *args):
+        """Read scripted keys up to Enter, as curses does with echo on"""
+        chars = []
+        while True:
+            key = self.screen.read_key()
+            if key in (-1, ord("\n"), 13):
+                return "".join(chars).encode("utf-8")
+            chars.append(chr(key))
+
+    def timeout(self, delay):
+        self.screen.input_timeout = delay
+
+    def nodelay(self, flag):
+        self.screen.input_timeout = 0 if flag else -1
+
+    def keypad(self, flag):
+        pass
+
+    def touchwin(self):
+        pass
+
+    def clearok(self, flag):
+        pass
+
+    def leaveok(self, flag):
+        pass
+
+    def scrollok(self, flag):
+        pass
+
+    def idlok(self, flag):
+        pass
+
+
+class VirtualScreen:
+    """Replaces curses for the duration of a `with` block"""
+
+    PATCHED = (
+        "newwin", "doupdate", "color_pair", "init_pair", "start_color",
+        "use_default_colors", "curs_set", "napms", "echo", "noecho", "beep",
+    )
+
+    def __init__(self, height=24, width=80, keys="q"):
+        self.height = height
+        self.width = width
+        # Each item is typed once the previous frame has been drawn; a string
+        # of several keys is typed all at once, as when a key is held down
+        self.bursts = [
+            [ord(k) for k in item] if isinstance(item, str) else [item] for item in keys
+        ]
+        self.pending = []
+        self.input_timeout = -1
+        self.stdscr = VirtualWindow(self, height, width)
+        # What the terminal shows, and what the next doupdate() will show
+        self.physical = None
+        self.virtual = [[(" ", 0)] * width for _ in range(height)]
+        self.frames = []
+        self.frame = Frame(None)
+        self._frame_start = time.perf_counter()
+        self._saved = {}
+
+    def __enter__(self):
+        for name in self.PATCHED:
+            self._saved[name] = getattr(curses, name, None)
+            setattr(curses, name, getattr(self, "_" + name))
+        # Line drawing characters only exist once initscr() has run
+        self._saved["ACS_VLINE"] = getattr(curses, "ACS_VLINE", None)
+        curses.ACS_VLINE = ord("|")
+        self._frame_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._end_frame()
+        for name, value in self._saved.items():
+            if value is None:
+                delattr(curses, name)
+            else:
+                setattr(curses, name, value)
+        return False
+
+    def read_key(self):
+        """Close the current frame and hand out the next scripted key.
+
+        Reads that do not wait (timeout 0) only see the rest of the burst
+        being typed, and stay in the current frame.
+        """
+        if self.input_timeout == 0:
+            return self.pending.pop(0) if self.pending else -1
+        self._end_frame()
+        if not self.pending:
+            self.pending = self.bursts.pop(0) if self.bursts else [ord("q")]
+        key = self.pending.pop(0)
+        self.frame = Frame(key)
+        self._frame_start = time.perf_counter()
+        return key
+
+    def _end_frame(self):
+        self.frame.seconds = time.perf_counter() - self._frame_start - self.frame.overhead
+        self.frames.append(self.frame)
+
+    def copy_in(self, win):
+        start = time.perf_counter()
+        for row in range(win.height):
+            y = win.begin_y + row
+            if 0 <= y < self.height:
+                line = self.virtual[y]
+                for col, cell in enumerate(win.cells[row]):
+                    x = win.begin_x + col
+                    if 0 <= x < self.width:
+                        line[x] = cell
+        self.frame.overhead += time.perf_counter() - start
+
+    def doupdate(self):
+        """Count the cells a terminal update would have to send"""
+        start = time.perf_counter()
+        if self.physical is None:
+            changed = self.height * self.width
+        else:
+            changed = sum(
+                1
+                for new, old in zip(self.virtual, self.physical)
+                for a, b in zip(new, old)
+                if a != b
+            )
+        self.frame.cells_changed += changed
+        self.physical = [list(line) for line in self.virtual]
+        self.frame.overhead += time.perf_counter() - start
+
+    def text(self):
+        """The terminal's contents as lines of text"""
+        screen = self.physical or self.virtual
+        return ["".join(char for char, _ in line).rstrip() for line in screen]
+
+    # curses functions
+
+    def _newwin(self, height, width, y=0, x=0):
+        self.frame.calls["newwin"] += 1
+        return VirtualWindow(self, height or self.height - y, width or self.width - x, y, x)
+
+    def _doupdate(self):
+        self.frame.calls["doupdate"] += 1
+        self.doupdate()
+
+    def _color_pair(self, n):
+        return n << 8
+
+    def _init_pair(self, *args):
+        pass
+
+    def _start_color(self):
+        pass
+
+    def _use_default_colors(self):
+        pass
+
+    def _curs_set(self, visibility):
+        return 0
+
+    def _napms(self, ms):
+        pass
+
+    def _echo(self):
+        pass
+
+    def _noecho(self):
+        pass
+
+    def _beep(self):
+        pass
+
+
+class MemoryReader:
+    """A task reader serving exported task dicts from memory.
+
+    It also stands in for tasklib's TaskWarrior, so a TaskManager can run
+    without the `task` binary; writes fail.
+    """
+
+    config = {}
+
+    def __init__(self, tasks):
+        # Rows are never modified once built, so loads can share them
+        self.rows = [TaskRow.from_export(json.loads(json.dumps(task))) for task in tasks]
+
+    def _rows(self, status=None):
+        return [task for task in self.rows if status in (None, task.status)]
+
+    def pending(self):
+        return self._rows("pending")
+
+    def completed_page(self, project=None, tag=None, before=None, limit=200, after=None):
+        tasks = [
+            task for task in self._rows("completed")
+            if (not project or task.project == project) and (not tag or tag in task.tags)
+            and (before is None or (task.end and task.end < before))
+            and (after is None or (task.end and task.end > after))
+        ]
+        tasks.sort(key=lambda task: task.end.timestamp() if task.end else 0.0, reverse=True)
+        return tasks[-limit:] if after is not None else tasks[:limit]
+
+    def modified_since(self, since):
+        return [task for task in self._rows() if task.modified and task.modified > since]
+
+    def get_many(self, uuids):
+        return [task for task in self._rows() if task.uuid in uuids]
+
+    def count(self, status):
+        return len(self._rows(status))
+
+
+def memory_task_manager(tasks):
+    """A TaskManager over exported task dicts held in memory"""
+    reader = MemoryReader(tasks)
+    return TaskManager(tw=reader, reader=reader)
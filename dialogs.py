@@ -21,10 +21,15 @@ class Dialogs:
             "  D          : Delete selected task",
             "  d          : Add dependency to selected task (Space to select)",
             "  Space      : Complete task",
+            "  m          : Mark/unmark task for a bulk operation",
+            "  u          : Unmark all tasks",
+            "  M          : Modify marked tasks (project, tags, priority, due)",
+            "               Space/D complete/delete all marked tasks at once",
             "",
             "Filtering:",
             "  p          : Filter by project",
             "  t          : Filter by tag",
+            "  f          : Filter by text as you type",
             "  T          : Toggle show/hide completed tasks",
             "  c          : Clear filters",
             "",
@@ -82,6 +87,29 @@ class Dialogs:
         task_manager.add_task(description, project if project else None, tags)
         curses.noecho()
 
+    @staticmethod
+    def bulk_modify(stdscr, task_manager):
+        curses.echo()
+        height, width = stdscr.getmaxyx()
+        count = len(task_manager.marked_tasks())
+
+        prompts = [
+            f"Set project on {count} tasks (optional): ",
+            "Add tags (comma-separated, optional): ",
+            "Set priority (H,M,L, optional): ",
+            "Set due date (YYYY-MM-DD, optional): ",
+        ]
+        values = []
+        for prompt in prompts:
+            stdscr.addstr(height - 2, 0, prompt + " " * (width - len(prompt) - 1))
+            stdscr.move(height - 2, len(prompt))
+            values.append(stdscr.getstr().decode("utf-8").strip())
+        curses.noecho()
+
+        project, tags_str, priority, due_date = values
+        tags = [t.strip() for t in tags_str.split(",") if t.strip()]
+        task_manager.bulk_modify(project or None, tags, priority or None, due_date or None)
+
     @staticmethod
     def edit_task(stdscr, task_manager, task_idx):
         if not task_manager.current_tasks:
@@ -209,7 +237,8 @@ class Dialogs:
             for idx, project in enumerate(task_manager.projects):
                 if idx == selected:
                     win.attron(curses.color_pair(3))
-                win.addstr(idx + 1, 2, f"{project[:35]}")
+                count = task_manager.project_counts[project]
+                win.addstr(idx + 1, 2, f"{project[:28]:<28} {count:>5}")
                 if idx == selected:
                     win.attroff(curses.color_pair(3))
 
@@ -245,7 +274,8 @@ class Dialogs:
             for idx, tag in enumerate(task_manager.tags):
                 if idx == selected:
                     win.attron(curses.color_pair(3))
-                win.addstr(idx + 1, 2, f"{tag[:35]}")
+                count = task_manager.tag_counts[tag]
+                win.addstr(idx + 1, 2, f"{tag[:28]:<28} {count:>5}")
                 if idx == selected:
                     win.attroff(curses.color_pair(3))
 
@@ -262,18 +292,19 @@ class Dialogs:
                 selected = (selected + 1) % len(task_manager.tags)
 
     @staticmethod
-    def filter_tasks(stdscr):
+    def filter_tasks(stdscr, on_change=None):
+        """Read filter text, calling on_change(text) as it is typed"""
         height, width = stdscr.getmaxyx()
 
-        # Create filter window
-        filter_win = curses.newwin(5, width - 4, height // 2 - 2, 2)
+        # Create filter window at the bottom so the filtered list stays visible
+        filter_win = curses.newwin(5, width - 4, height - 6, 2)
         filter_win.box()
         filter_win.addstr(0, 2, "Filter Tasks")
-        filter_win.addstr(1, 2, "Enter text to filter by description, project, or tags")
-        filter_win.addstr(2, 2, "Press Ctrl-G or Enter to apply, ESC to cancel")
+        filter_win.addstr(1, 2, "Type to filter by description, project, or tags")
+        filter_win.addstr(2, 2, "Press Enter to apply, ESC to cancel")
 
         # Create text input box
-        text_win = curses.newwin(1, width - 8, height // 2 + 1, 4)
+        text_win = curses.newwin(1, width - 8, height - 3, 4)
         text_box = curses.textpad.Textbox(text_win, insert_mode=True)
 
         # Show cursor for text input
@@ -284,21 +315,38 @@ class Dialogs:
         text_win.refresh()
 
         try:
-            # Handle ESC key
+            filter_text = ""
             while True:
-                c = stdscr.getch()
-                if c == 27:  # ESC
-                    curses.curs_set(0)
-                    return None
-                if c == ord("\n") or c == ord("\r"):
-                    break
-                text_box.do_command(c)
+                keys = [stdscr.getch()]
+                # Drain keys typed faster than we can redraw, so a burst of
+                # input costs one filter update and one frame
+                stdscr.nodelay(True)
+                try:
+                    while True:
+                        c = stdscr.getch()
+                        if c == -1:
+                            break
+                        keys.append(c)
+                finally:
+                    stdscr.nodelay(False)
+
+                for c in keys:
+                    if c == 27:  # ESC
+                        return None
+                    if c == ord("\n") or c == ord("\r"):
+                        filter_text = text_box.gather().strip()
+                        return filter_text if filter_text else None
+                    text_box.do_command(c)
+
+                new_text = text_box.gather().strip()
+                if on_change and new_text != filter_text:
+                    on_change(new_text)
+                    filter_win.touchwin()
+                    filter_win.refresh()
+                    text_win.touchwin()
+                filter_text = new_text
                 text_win.refresh()
 
-            filter_text = text_box.gather().strip()
-            curses.curs_set(0)
-            return filter_text if filter_text else None
-
         finally:
             curses.curs_set(0)
 
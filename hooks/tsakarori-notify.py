@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""Taskwarrior on-add/on-modify hook that tells running Tsakarori TUIs about changes.
+
+Install by linking it into your hooks directory under both names:
+
+    ln -s "$PWD/hooks/tsakarori-notify.py" ~/.task/hooks/on-add-tsakarori.py
+    ln -s "$PWD/hooks/tsakarori-notify.py" ~/.task/hooks/on-modify-tsakarori.py
+"""
+import os
+import sys
+
+# Linked into ~/.task/hooks, so find live_updates next to the real file
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from live_updates import hook_main  # noqa: E402
+
+if __name__ == "__main__":
+    sys.exit(hook_main(sys.stdin, sys.stdout))
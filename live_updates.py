@@ -0,0 +1,137 @@
+import json
+import os
+import socket
+import stat
+import tempfile
+
+# Messages are single task JSON lines; a datagram larger than this would be
+# truncated, and Taskwarrior tasks come nowhere near it
+MAX_MESSAGE = 1 << 20
+
+
+def socket_dir():
+    """Directory holding one socket per running Tsakarori"""
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "tsakarori")
+    return os.path.join(tempfile.gettempdir(), f"tsakarori-{os.getuid()}")
+
+
+def is_private(path, kind=stat.S_ISDIR):
+    """Whether `path` (not followed if a symlink) is of the given kind, owned
+    by the current user and closed to group and others"""
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return kind(info.st_mode) and info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+
+class UpdateListener:
+    """Receives tasks changed by other processes, as sent by the Taskwarrior hook.
+
+    Each running TUI binds a datagram socket named after its pid in
+    socket_dir(); hooks/tsakarori-notify.py sends every added or modified
+    task to all of them.
+    """
+
+    def __init__(self, directory=None):
+        directory = directory or socket_dir()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # Anyone could have created a directory under /tmp first, and any
+        # user able to write to it could send us tasks
+        if not is_private(directory):
+            raise PermissionError(f"{directory} is not private to the current user")
+        self.path = os.path.join(directory, f"{os.getpid()}.sock")
+        if os.path.lexists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(self.path)
+        os.chmod(self.path, 0o600)
+
+    @classmethod
+    def open(cls, directory=None):
+        """A listener, or None if the socket cannot be created"""
+        try:
+            return cls(directory)
+        except OSError:
+            return None
+
+    def receive(self):
+        """Every task received since the last call, as export dicts, without blocking"""
+        tasks = []
+        while True:
+            try:
+                message = self.sock.recv(MAX_MESSAGE)
+            except (BlockingIOError, InterruptedError):
+                return tasks
+            try:
+                task = json.loads(message)
+            except ValueError:
+                continue
+            if isinstance(task, dict) and task.get("uuid"):
+                tasks.append(task)
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def notify(task_line, directory=None):
+    """Send one task JSON line to every listening Tsakarori; returns how many got it"""
+    directory = directory or socket_dir()
+    # Tasks are only sent to sockets the user's own Tsakarori made
+    if not is_private(directory):
+        return 0
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+
+    message = task_line.encode("utf-8")
+    sent = 0
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    # Never hold up the `task` command: a full queue just misses this update
+    sock.setblocking(False)
+    with sock:
+        for name in names:
+            if not name.endswith(".sock"):
+                continue
+            path = os.path.join(directory, name)
+            if not is_private(path, stat.S_ISSOCK):
+                continue
+            try:
+                sock.sendto(message, path)
+                sent += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a Tsakarori that did not exit cleanly
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError:
+                pass
+    return sent
+
+
+def hook_main(stdin, stdout):
+    """Body of the on-add/on-modify hook.
+
+    Taskwarrior passes the new task (on-add) or the original and modified
+    task (on-modify) as JSON lines and expects the task to store back on
+    stdout; it is echoed unchanged and sent to the listeners.
+    """
+    lines = [line for line in stdin.read().splitlines() if line.strip()]
+    if not lines:
+        return 0
+    stdout.write(lines[-1] + "\n")
+    stdout.flush()
+    try:
+        notify(lines[-1])
+    except OSError:
+        pass
+    return 0
@@ -1,10 +1,99 @@
+import bisect
+from collections import Counter, namedtuple
 from tasklib import TaskWarrior, Task
 from datetime import datetime
+from uuid import uuid4
+from task_loader import COMPLETED_PAGE, Query, TaskLoader, fetch_completed, fetch_tasks
+from task_readers import make_reader
+from task_row import TaskRow, set_fields
+from task_store import TaskStore
+from task_writer import TaskWriter, Write, retry_locked
+from urgency import UrgencyEngine
+
+
+def task_sort_key(task):
+    """Order used for current_tasks: pending by urgency, then completed newest first"""
+    if task.status == "completed":
+        # A task completed here is not read back yet, so has no end date
+        return (True, -task.end.timestamp() if task.end else float("-inf"))
+    return (False, -task.urgency)
+
+
+# current_tasks and the bookkeeping kept alongside it: the sort key of every
+# listed task (parallel to tasks), per uuid the key/project/tags it was
+# listed under, and the listed tasks per project and tag
+Listing = namedtuple("Listing", ["tasks", "sort_keys", "listed", "project_counts", "tag_counts"])
+
+# A full load made ready to adopt: the indexed store, its completed tasks,
+# and the listing for `filters` (project, tag, text)
+PreparedLoad = namedtuple("PreparedLoad", ["store", "completed", "filters", "listing"])
+
+
+def matches_text(task, search_text):
+    """Whether lower case `search_text` is in a task's description, project or tags"""
+    if search_text in (task.description or "").lower():
+        return True
+    if search_text in (task.project or "").lower():
+        return True
+    return any(search_text in tag.lower() for tag in task.tags)
+
+
+def select_tasks(store, project, tag, text):
+    """The stored tasks matching the filters, in current_tasks order"""
+    # Filters resolve through the store's indexes; text matches are only
+    # candidates and get the exact substring check here
+    text = text.strip() if text else None
+    tasks = store.select(project, tag, text)
+    if text:
+        search_text = text.lower()
+        tasks = [task for task in tasks if matches_text(task, search_text)]
+    tasks.sort(key=task_sort_key)
+    return tasks
+
+
+def build_listing(tasks):
+    """The Listing of an already sorted task list"""
+    sort_keys = []
+    listed = {}
+    project_counts = Counter()
+    tag_counts = Counter()
+    for task in tasks:
+        key = task_sort_key(task)
+        sort_keys.append(key)
+        tags = tuple(task.tags)
+        listed[task.uuid] = (key, task.project, tags)
+        if task.project:
+            project_counts[task.project] += 1
+        tag_counts.update(tags)
+    return Listing(tasks, sort_keys, listed, project_counts, tag_counts)
+
+
+def prepare_load(tasks, filters):
+    """Index a full load and list it for `filters`.
+
+    Runs on the loader thread: with tens of thousands of tasks, indexing
+    and sorting take long enough to stall input on the UI thread.
+    """
+    store = TaskStore()
+    store.load(tasks)
+    completed = [task for task in tasks if task.status == "completed"]
+    listing = build_listing(select_tasks(store, *filters))
+    return PreparedLoad(store, completed, filters, listing)
 
 
 class TaskManager:
-    def __init__(self):
-        self.tw = TaskWarrior()
+    # Completed tasks held at most; past this, those furthest from where
+    # the list is being read are dropped, to be read again when scrolled back to
+    COMPLETED_WINDOW = 2000
+    # Cached tasks shown at startup before anything is indexed; more than
+    # fit on a screen
+    FIRST_PAGE = 200
+
+    def __init__(self, tw=None, background=False, cache=None, reader=None):
+        self.tw = tw or TaskWarrior()
+        # Reads may bypass the CLI; writes always go through self.tw
+        self.reader = reader or make_reader(self.tw)
+        self.store = TaskStore()
         self.current_tasks = []
         self.projects = []
         self.tags = []
@@ -12,71 +101,590 @@ class TaskManager:
         self.filter_tag = None
         self.filter_text = None
         self.show_completed = False
+        # Completed tasks are read in pages, newest first, as the list is
+        # scrolled into them: the end date of the oldest one held and whether
+        # older ones remain, and, once the newest were dropped to keep within
+        # COMPLETED_WINDOW, the end date of the newest one held
+        self.completed_before = None
+        self.completed_more = False
+        self.completed_after = None
+        # Directions ("page" for older, "newer") not to read again until the
+        # selection or the filters change, and the task selected meanwhile:
+        # a page that lists nothing new would only be followed by another,
+        # and reading back the other way would undo its eviction
+        self._page_stops = set()
+        self._page_anchor = None
+        self.generation = 0
+        # Derived structures (groupings, row layouts) keyed by name, each
+        # stored with the generation it was built for
+        self._memo = {}
+        # Completed tasks in Taskwarrior (not just the store), fetched on
+        # first use and then kept up to date by status changes we see
+        self._completed_count = None
+        # With a background writer, edits are shown optimistically and saved
+        # on a worker thread. Unconfirmed maps uuid -> (seq, optimistic task)
+        # for the newest write per task, rollback seq -> task before the write
+        self.writer = TaskWriter(self.tw) if background else None
+        self.write_error = None
+        self._write_seq = 0
+        self._unconfirmed = {}
+        self._rollback = {}
+        self._failed_adds = set()
+        # Coefficients from the Taskwarrior configuration, read on first use
+        self._urgency = None
+        # Uuids of tasks marked for a bulk operation, and a count of changes
+        # to them (toggling the same task twice leaves the size as it was)
+        self.marked = set()
+        self.mark_revision = 0
+        # Bookkeeping for incremental updates of current_tasks: the sort key
+        # of every listed task (parallel to current_tasks) and, per uuid, the
+        # key/project/tags it was listed under, since tasks are edited in place
+        self._sort_keys = []
+        self._listed = {}
+        self._project_counts = Counter()
+        self._tag_counts = Counter()
+        # With a background loader, exports run on a worker thread and land
+        # in poll_loader(); writes made meanwhile are replayed on top of them
+        self.loader = TaskLoader(self.reader, prepare_load, cache) if background else None
+        self.load_error = None
+        # Whether a full load was requested and none has been adopted since
+        self._full_load_pending = False
+        self._local_writes = []
+
+        # Show the cached snapshot from the last session until the live
+        # load (necessarily in the background) replaces it. It is saved in
+        # list order, so its first lines are shown as they are; the whole
+        # snapshot is read and indexed on the loader thread
+        self.cache = cache
+        self.stale = False
+        if cache is not None and self.loader:
+            first_page = cache.load(limit=self.FIRST_PAGE)
+            if first_page is not None:
+                self._set_listing(first_page)
+                self.stale = True
+                self.loader.request(
+                    "cache", self._query(), len(self._local_writes), filters=self._filters()
+                )
+
         self.update_task_lists()
 
+    @property
+    def loading(self):
+        """Whether a background load is in flight"""
+        return self.loader is not None and self.loader.busy
+
+    @property
+    def saving(self):
+        """Whether background writes are waiting to be persisted"""
+        return self.writer is not None and self.writer.busy
+
     def update_task_lists(self):
-        """Update task lists with current filters"""
-        # Get tasks based on completion status
-        if self.show_completed:
-            tasks = list(self.tw.tasks.pending()) + list(self.tw.tasks.completed())
+        """Reload all tasks from Taskwarrior and rebuild the filtered lists"""
+        if self.loader:
+            self.loader.request(
+                "full", self._query(), len(self._local_writes), filters=self._filters()
+            )
+            self._full_load_pending = True
+            return
+
+        tasks = fetch_tasks(self.reader, self._query())
+        self._adopt(prepare_load(tasks, self._filters()))
+
+    def _adopt(self, prepared):
+        """Switch to a full load made by prepare_load"""
+        self._completed_page_read(prepared.completed, first=True)
+        self.store = prepared.store
+        self._completed_count = None
+        if prepared.filters == self._filters():
+            self._adopt_listing(prepared.listing)
         else:
-            tasks = self.tw.tasks.pending()
+            # The filters changed while it was being prepared
+            self.apply_filters()
+
+    def _query(self):
+        """What a full load reads for the current filters.
 
-        # Apply filters in sequence
-        if self.filter_project:
-            tasks = [t for t in tasks if t["project"] == self.filter_project]
+        Completed tasks are read a page at a time and only ever shown
+        filtered, so the project and tag filters are handed to Taskwarrior
+        for them. Pending tasks are always
+        read in full: the store's indexes filter them instantly, and the
+        statistics and startup cache need all of them. The text filter stays
+        in Python; it also matches projects and tags, and changes per key.
+        """
+        if not self.show_completed:
+            return Query(False, None, None)
+        return Query(True, self.filter_project, self.filter_tag)
 
-        if self.filter_tag:
-            tasks = [t for t in tasks if self.filter_tag in (t["tags"] or [])]
+    def _filters(self):
+        return (self.filter_project, self.filter_tag, self.filter_text)
+
+    def apply_filters(self):
+        """Rebuild current_tasks, projects and tags from the task store"""
+        self._set_listing(select_tasks(self.store, *self._filters()))
+
+    def _set_listing(self, tasks):
+        """Replace current_tasks with an already sorted list"""
+        self._adopt_listing(build_listing(tasks))
+
+    def _adopt_listing(self, listing):
+        self.current_tasks = listing.tasks
+        self._sort_keys = listing.sort_keys
+        self._listed = listing.listed
+        self._project_counts = listing.project_counts
+        self._tag_counts = listing.tag_counts
+        self._lists_changed()
+
+    def completed_count(self):
+        """Number of completed tasks, counted by Taskwarrior on first use"""
+        if self._completed_count is None:
+            self._completed_count = self.reader.count("completed")
+        return self._completed_count
+
+    def pending_stats(self):
+        """Pending count, per-project and per-tag counts and due dates of the
+        pending tasks the filters let through"""
+        if not any(self._filters()):
+            store = self.store
+            return (
+                store.status_counts["pending"], store.pending_projects,
+                store.pending_tags, store.due.values(),
+            )
+        return self.memoize("pending_stats", self._count_listed_pending)
+
+    def _count_listed_pending(self):
+        pending = [task for task in self.current_tasks if task.status == "pending"]
+        projects = Counter(task.project for task in pending if task.project)
+        tags = Counter(tag for task in pending for tag in task.tags)
+        return len(pending), projects, tags, [task.due for task in pending if task.due]
+
+    @property
+    def project_counts(self):
+        """Number of listed tasks per project"""
+        return self._project_counts
+
+    @property
+    def tag_counts(self):
+        """Number of listed tasks per tag"""
+        return self._tag_counts
+
+    def _matches_filters(self, task):
+        """Check a single task against the project, tag and text filters"""
+        if self.filter_project and task["project"] != self.filter_project:
+            return False
+
+        if self.filter_tag and self.filter_tag not in (task["tags"] or []):
+            return False
 
         if self.filter_text and self.filter_text.strip():
-            filtered = []
-            search_text = self.filter_text.lower().strip()
-
-            for task in tasks:
-                # Check description
-                description = task["description"].lower() if task["description"] else ""
-                if search_text in description:
-                    filtered.append(task)
-                    continue
-
-                # Check project
-                project = task["project"].lower() if task["project"] else ""
-                if search_text in project:
-                    filtered.append(task)
-                    continue
-
-                # Check tags
-                tags = [t.lower() for t in (task["tags"] or [])]
-                if any(search_text in tag for tag in tags):
-                    filtered.append(task)
-                    continue
-
-            tasks = filtered
-
-        # Update the task lists
-        self.current_tasks = list(tasks)
-        self.current_tasks.sort(
-            key=lambda x: (x["status"] == "completed", -float(x["urgency"] or 0.0))
+            return self._matches_text(task)
+
+        return True
+
+    def _matches_text(self, task):
+        return matches_text(task, self.filter_text.lower().strip())
+
+    def _is_loaded(self, task):
+        """Whether a task belongs in the store given the current query"""
+        status = task["status"]
+        if status == "pending":
+            return True
+        query = self._query()
+        return (
+            status == "completed"
+            and query.show_completed
+            and (not query.project or task.project == query.project)
+            and (not query.tag or query.tag in task.tags)
+            # Outside the pages held: it arrives with its page
+            and not (
+                self.completed_more
+                and self.completed_before is not None
+                and task.end is not None
+                and task.end < self.completed_before
+            )
+            and not (
+                self.completed_after is not None
+                and task.end is not None
+                and task.end > self.completed_after
+            )
         )
 
-        # Update available projects and tags based on filtered tasks
-        self.projects = sorted(
-            set(task["project"] for task in self.current_tasks if task["project"])
+    def refresh(self):
+        """Merge tasks modified outside Tsakarori since the last load"""
+        since = self.store.last_modified
+        if since is None:
+            self.update_task_lists()
+            return len(self.store)
+
+        if self.loader:
+            self.loader.request("delta", self._query(), len(self._local_writes), since)
+            return 0
+
+        changed = self.reader.modified_since(since)
+        self._merge_modified(changed)
+        self._lists_changed()
+        return len(changed)
+
+    def poll_loader(self):
+        """Apply snapshots finished by the background loader, if any"""
+        if not self.loader:
+            return False
+
+        snapshots = self.loader.collect()
+        for snapshot in snapshots:
+            if snapshot.error:
+                self.load_error = snapshot.error
+                continue
+            # A toggle or filter change since the request already queued a
+            # matching reload
+            if snapshot.query != self._query():
+                continue
+
+            self.load_error = None
+            if snapshot.kind == "full":
+                # Indexed and listed on the loader thread; just switch over
+                self._adopt(snapshot.prepared)
+                self.stale = False
+                self._full_load_pending = False
+            elif snapshot.kind == "cache":
+                if self.stale:
+                    self._adopt(snapshot.prepared)
+            elif snapshot.kind == "page":
+                self._add_completed_page(snapshot.tasks)
+            elif snapshot.kind == "newer":
+                self._add_completed_page(snapshot.tasks, newer=True)
+            else:
+                self._merge_modified(snapshot.tasks)
+
+            # The export may predate writes we made while it ran, or ones
+            # made earlier that the writer has not persisted yet
+            for task in self._local_writes[snapshot.write_mark:]:
+                self._apply_task(task)
+            for _, task in self._unconfirmed.values():
+                self._apply_task(task)
+            self._lists_changed()
+
+        if not self.loader.busy:
+            self._local_writes = []
+        return bool(snapshots)
+
+    def load_completed_near(self, index):
+        """Read the next page of completed tasks once `index` nears either end
+        of those held; returns whether a page was read (or requested)"""
+        if (
+            not self.show_completed
+            # A full load in flight resets the pages; a page in flight is
+            # the one that would be asked for again
+            or self.loading
+        ):
+            return False
+
+        anchor = self.current_tasks[index].uuid if index < len(self.current_tasks) else None
+        if anchor != self._page_anchor:
+            self._page_anchor = anchor
+            self._page_stops = set()
+
+        # Start reading a quarter page before the last (first) row is reached
+        if (
+            self.completed_more
+            and "page" not in self._page_stops
+            and index >= len(self.current_tasks) - 1 - COMPLETED_PAGE // 4
+        ):
+            kind, bound = "page", self.completed_before
+        elif (
+            self.completed_after is not None
+            and "newer" not in self._page_stops
+            and index <= bisect.bisect_left(self._sort_keys, (True,)) + COMPLETED_PAGE // 4
+        ):
+            kind, bound = "newer", self.completed_after
+        else:
+            return False
+
+        if self.loader:
+            self.loader.request(kind, self._query(), len(self._local_writes), bound)
+            return True
+
+        if kind == "newer":
+            page = fetch_completed(self.reader, self._query(), after=bound)
+        else:
+            page = fetch_completed(self.reader, self._query(), bound)
+        self._add_completed_page(page, newer=kind == "newer")
+        self._lists_changed()
+        return True
+
+    def _completed_page_read(self, page, first=False):
+        """Note how far back a page of completed tasks reaches"""
+        if first:
+            self.completed_before = None
+            self.completed_after = None
+        self.completed_more = len(page) >= COMPLETED_PAGE
+        ends = [task.end for task in page if task.end]
+        if ends:
+            self.completed_before = min(ends)
+
+    def _add_completed_page(self, page, newer=False):
+        if newer:
+            # A short page reaches the newest completed task
+            ends = [task.end for task in page if task.end]
+            self.completed_after = max(ends) if ends and len(page) >= COMPLETED_PAGE else None
+        else:
+            self._completed_page_read(page)
+        # Pages never move the modification watermark: they are old tasks,
+        # and external changes not yet merged must not be skipped
+        listed = 0
+        for task in page:
+            if task.uuid not in self.store:
+                self._apply_task(task)
+                listed += task.uuid in self._listed
+        self._evict_completed(newest=not newer)
+        self._page_stops.add("page" if newer else "newer")
+        if not listed:
+            self._page_stops.add("newer" if newer else "page")
+
+    def _evict_completed(self, newest):
+        """Drop the newest (or oldest) completed tasks beyond COMPLETED_WINDOW.
+
+        Tasks sharing an end time are dropped together, since pages are read
+        strictly before or after an end time.
+        """
+        held = sorted(
+            (task for task in self.store if task.status == "completed" and task.end),
+            key=lambda task: task.end,
+            reverse=newest,
         )
-        self.tags = sorted(
-            set(tag for task in self.current_tasks for tag in (task["tags"] or []))
+        cut = len(held) - self.COMPLETED_WINDOW
+        if cut <= 0:
+            return
+        while cut < len(held) and held[cut].end == held[cut - 1].end:
+            cut += 1
+        if cut == len(held):
+            return
+
+        for task in held[:cut]:
+            self._drop_task(task.uuid)
+        if newest:
+            self.completed_after = held[cut].end
+        else:
+            self.completed_before = held[cut].end
+            self.completed_more = True
+
+    def apply_external(self, exported):
+        """Apply tasks another process added or modified, as sent by the hook.
+
+        Hook JSON has no id or urgency, so ids are kept from the rows held
+        and urgency is adjusted locally, as for our own unsaved edits. Call
+        it while no writes are in flight (see saving): the hook also reports
+        our own writes, and an add is only known by its real uuid once the
+        writer has confirmed it. The watermark is not moved, so a refresh
+        still reads these tasks back from Taskwarrior.
+        """
+        # The hook may report a task several times; the last one is current
+        latest = {}
+        for data in exported:
+            latest[data["uuid"]] = TaskRow.from_export(data)
+        tasks = []
+        for task in latest.values():
+            held = self.store.get(task.uuid)
+            if held is not None:
+                task = task.with_changes({"id": held.id, "urgency": held.urgency})
+            tasks.append(task)
+        if tasks:
+            self._store_tasks(tasks, exported=False)
+        return len(tasks)
+
+    def save_snapshot(self):
+        """Write the current pending tasks to the startup cache"""
+        if self.cache is not None and not self.stale:
+            self.cache.save(sorted(self.store, key=task_sort_key))
+
+    def _merge_modified(self, changed):
+        """Merge the result of a modified.after export into the store"""
+        for task in changed:
+            self._apply_task(task)
+
+        # Local writes never move the watermark, only what we read back here,
+        # so external changes older than our own writes are not skipped
+        self.store.advance(changed)
+
+    def _store_task(self, task, exported=True):
+        """Apply a task written by this manager to the store and task lists"""
+        self._store_tasks([task], exported)
+
+    def _store_tasks(self, tasks, exported=True):
+        """Apply several written tasks, updating the lists once"""
+        self._apply_ranked(tasks, exported)
+        self._lists_changed()
+
+    @property
+    def urgency_engine(self):
+        if self._urgency is None:
+            self._urgency = UrgencyEngine.for_taskwarrior(self.tw)
+        return self._urgency
+
+    def _apply_ranked(self, tasks, exported=True):
+        """Apply tasks changed by this manager and re-rank what they affect.
+
+        Taskwarrior recomputes urgency only for the tasks it hands back, so
+        tasks that became (un)blocked or (non-)blocking through the change
+        are adjusted here, as are rows it has not seen yet (exported=False),
+        which still carry their old urgency. Urgency is moved by the local
+        difference rather than replaced, so parts Tsakarori does not model
+        (UDA coefficients, say) are kept.
+        """
+        engine = self.urgency_engine
+        now = datetime.now().astimezone()
+        previous = {task.uuid: self.store.get(task.uuid) for task in tasks}
+        neighbours = set()
+        for task in tasks:
+            for row in (previous[task.uuid], task):
+                if row is not None:
+                    neighbours.update(row.depends)
+            neighbours.update(dependent.uuid for dependent in self.store.dependents_of(task))
+        neighbours.difference_update(previous)
+        flags_before = {}
+        for uuid in neighbours | previous.keys():
+            row = self.store.get(uuid)
+            if row is not None:
+                flags_before[uuid] = self._dependency_flags(row)
+
+        for task in tasks:
+            self._store_row(task)
+
+        for task in tasks:
+            if exported or self.store.get(task.uuid) is not task or task.status != "pending":
+                continue
+            flags = self._dependency_flags(task)
+            old = previous[task.uuid]
+            if old is None:
+                urgency = engine.compute(task, *flags, now=now)
+            else:
+                urgency = (
+                    task.urgency
+                    + engine.compute(task, *flags, now=now)
+                    - engine.compute(old, *flags_before[task.uuid], now=now)
+                )
+            self._rerank(task, urgency)
+
+        for uuid in neighbours:
+            task = self.store.get(uuid)
+            if task is None or uuid not in flags_before or task.status != "pending":
+                continue
+            flags = self._dependency_flags(task)
+            if flags != flags_before[uuid]:
+                urgency = (
+                    task.urgency
+                    + engine.compute(task, *flags, now=now)
+                    - engine.compute(task, *flags_before[uuid], now=now)
+                )
+                self._rerank(task, urgency)
+
+    def _dependency_flags(self, task):
+        """(blocking, blocked) for a task, as Taskwarrior's urgency sees them"""
+        blocking = any(
+            dependent.status == "pending" for dependent in self.store.dependents_of(task)
         )
+        blocked = any(self.store.status_of(uuid) == "pending" for uuid in task.depends)
+        return blocking, blocked
+
+    def _rerank(self, task, urgency):
+        """Store a copy of a task with a locally computed urgency"""
+        urgency = round(urgency, 4)
+        if urgency == task.urgency:
+            return
+        ranked = task.with_changes({"urgency": urgency})
+        # An optimistic row is also what gets replayed over new snapshots
+        entry = self._unconfirmed.get(task.uuid)
+        if entry is not None and entry[1] is task:
+            self._unconfirmed[task.uuid] = (entry[0], ranked)
+        self._store_row(ranked)
+
+    def _store_row(self, task):
+        if self.loading:
+            self._local_writes.append(task)
+        self._apply_task(task)
+
+    def _apply_task(self, task):
+        """Insert, replace or drop one task, including status flips"""
+        uuid = task["uuid"]
+        self._unlist(uuid)
+        self._count_status_change(self.store.status_of(uuid), task["status"])
+
+        if self._is_loaded(task):
+            self.store.put(task)
+            if self._matches_filters(task):
+                self._list(task)
+        else:
+            self.store.discard(uuid)
+
+    def _count_status_change(self, previous, status):
+        # Only tasks we already held can flip status; a completed task seen
+        # for the first time was already counted by Taskwarrior
+        if self._completed_count is None or previous is None or previous == status:
+            return
+        if previous == "completed":
+            self._completed_count -= 1
+        if status == "completed":
+            self._completed_count += 1
+
+    def _list(self, task):
+        """Insert a task into current_tasks at its sorted position"""
+        key = task_sort_key(task)
+        idx = bisect.bisect_right(self._sort_keys, key)
+        self._sort_keys.insert(idx, key)
+        self.current_tasks.insert(idx, task)
+        self._count_task(task, key)
+
+    def index_of(self, uuid):
+        """Position of a listed task in current_tasks, or None"""
+        entry = self._listed.get(uuid)
+        if entry is None:
+            return None
+        idx = bisect.bisect_left(self._sort_keys, entry[0])
+        while self.current_tasks[idx]["uuid"] != uuid:
+            idx += 1
+        return idx
+
+    def _unlist(self, uuid):
+        """Remove a task from current_tasks using the key it was listed under"""
+        idx = self.index_of(uuid)
+        if idx is None:
+            return
+
+        key, project, tags = self._listed.pop(uuid)
+        del self._sort_keys[idx]
+        del self.current_tasks[idx]
+
+        if project:
+            self._project_counts[project] -= 1
+            if not self._project_counts[project]:
+                del self._project_counts[project]
+        for tag in tags:
+            self._tag_counts[tag] -= 1
+            if not self._tag_counts[tag]:
+                del self._tag_counts[tag]
+
+    def _count_task(self, task, key):
+        project = task["project"]
+        tags = tuple(task["tags"] or ())
+        self._listed[task["uuid"]] = (key, project, tags)
+        if project:
+            self._project_counts[project] += 1
+        self._tag_counts.update(tags)
+
+    def _lists_changed(self):
+        """Update available projects and tags based on filtered tasks"""
+        self.projects = sorted(self._project_counts)
+        self.tags = sorted(self._tag_counts)
+        # Anything derived from current_tasks (or the tasks in it) is
+        # stale once the generation moves on
+        self.generation += 1
 
     def add_task(self, description, project=None, tags=None):
-        task = Task(self.tw)
-        task["description"] = description
+        changes = {"description": description}
         if project:
-            task["project"] = project
+            changes["project"] = project
         if tags:
-            task["tags"] = tags
-        task.save()
-        self.update_task_lists()
+            changes["tags"] = tags
+        self._write("save", None, changes)
 
     def edit_task(
         self,
@@ -91,35 +699,192 @@ class TaskManager:
             return
 
         task = self.current_tasks[task_idx]
+        changes = {}
         if description:
-            task["description"] = description
+            changes["description"] = description
         if project:
-            task["project"] = project
+            changes["project"] = project
         if tags is not None:
-            task["tags"] = tags
+            changes["tags"] = tags
         if priority and priority.upper() in ["H", "M", "L"]:
-            task["priority"] = priority.upper()
+            changes["priority"] = priority.upper()
         if due_date:
             try:
-                task["due"] = datetime.strptime(due_date, "%Y-%m-%d")
+                changes["due"] = datetime.strptime(due_date, "%Y-%m-%d")
             except ValueError:
                 pass
 
-        task.save()
-        self.update_task_lists()
+        self._write("save", task, changes)
 
     def delete_task(self, task_idx):
         if task_idx < len(self.current_tasks):
-            self.current_tasks[task_idx].delete()
-            self.update_task_lists()
+            self._write("delete", self.current_tasks[task_idx])
 
     def complete_task(self, task_idx):
         if task_idx < len(self.current_tasks):
-            self.current_tasks[task_idx].done()
-            self.update_task_lists()
+            self._write("done", self.current_tasks[task_idx])
+
+    def _write(self, action, task, changes=None):
+        """Set `changes` on a task (a row, or None to add one) and persist
+        them with tasklib's Task.<action>().
+
+        Without a background writer this blocks on Taskwarrior. With one, the
+        change is shown at once on a copy of the row and persisted in order
+        by the writer; poll_writer() confirms it or rolls it back.
+        """
+        changes = changes or {}
+        if self.writer is None:
+            written = task.to_task(self.tw) if task is not None else Task(self.tw)
+            set_fields(written, changes)
+            getattr(written, action)()
+            self._store_task(TaskRow.from_task(written))
+            return
+
+        data = task.to_export() if task is not None else None
+        # A new task is stored under a placeholder uuid until Taskwarrior
+        # assigns one
+        optimistic = (task or TaskRow(uuid=str(uuid4()))).with_changes(changes)
+        if action == "done":
+            optimistic.status = "completed"
+        elif action == "delete":
+            optimistic.status = "deleted"
+
+        self._write_seq += 1
+        uuid = optimistic.uuid
+        self._unconfirmed[uuid] = (self._write_seq, optimistic)
+        self._rollback[self._write_seq] = task
+        self.writer.submit(Write(self._write_seq, action, uuid, data, changes))
+        self._store_task(optimistic, exported=False)
+
+    def poll_writer(self):
+        """Confirm or roll back writes finished by the background writer"""
+        if not self.writer:
+            return False
+
+        results = self.writer.collect()
+        for result in results:
+            write = result.write
+            before = self._rollback.pop(write.seq)
+            if result.error:
+                self.write_error = result.error.splitlines()[0]
+                if write.data is None:
+                    self._failed_adds.add(write.uuid)
+            else:
+                self.write_error = None
+
+            # Only the newest write to a task decides what is shown for it;
+            # older results are already superseded by a later optimistic copy
+            latest = self._unconfirmed.get(write.uuid)
+            if latest is None or latest[0] != write.seq:
+                continue
+            del self._unconfirmed[write.uuid]
+
+            if result.error:
+                if before is None or write.uuid in self._failed_adds:
+                    self._drop_task(write.uuid)
+                else:
+                    self._apply_ranked([before])
+                continue
+
+            if result.task["uuid"] != write.uuid:
+                self._drop_task(write.uuid)
+            self._apply_task(result.task)
+
+        if results:
+            self._lists_changed()
+        return bool(results)
+
+    def wait_for_writes(self):
+        """Block until all queued writes are persisted and applied"""
+        if self.writer:
+            self.writer.wait()
+            self.poll_writer()
+
+    def _drop_task(self, uuid):
+        self._unlist(uuid)
+        self.store.discard(uuid)
+
+    def toggle_mark(self, task_idx):
+        """Mark or unmark a listed task for a bulk operation"""
+        if task_idx < len(self.current_tasks):
+            self.marked ^= {self.current_tasks[task_idx]["uuid"]}
+            self.mark_revision += 1
+
+    def clear_marks(self):
+        if self.marked:
+            self.marked = set()
+            self.mark_revision += 1
+
+    def marked_tasks(self):
+        """Marked tasks that are still listed, in list order"""
+        return [task for task in self.current_tasks if task["uuid"] in self.marked]
+
+    def bulk_complete(self):
+        return self._bulk_command(["done"])
+
+    def bulk_delete(self):
+        return self._bulk_command(["delete"])
+
+    def bulk_modify(self, project=None, tags=None, priority=None, due_date=None):
+        """Set project/priority/due and add tags on every marked task"""
+        args = []
+        if project:
+            args.append(f"project:{project}")
+        for tag in tags or ():
+            args.append(f"+{tag}")
+        if priority and priority.upper() in ["H", "M", "L"]:
+            args.append(f"priority:{priority.upper()}")
+        if due_date:
+            try:
+                datetime.strptime(due_date, "%Y-%m-%d")
+                args.append(f"due:{due_date}")
+            except ValueError:
+                pass
+
+        if not args:
+            return 0
+        return self._bulk_command(["modify"] + args)
+
+    def _bulk_command(self, args):
+        """Run one `task <uuids> <args>` over the marked tasks and read them back"""
+        # Queued single-task writes must land first, and with real uuids
+        self.wait_for_writes()
+        uuids = [task["uuid"] for task in self.marked_tasks()]
+        if not uuids:
+            return 0
+
+        try:
+            retry_locked(lambda: self.tw.execute_command(uuids + args), TaskWriter.RETRY_DELAYS)
+            self.write_error = None
+        except Exception as e:
+            # Shown in the header, as for single writes; the marks are kept
+            # so the command can be tried again
+            self.write_error = str(e).splitlines()[0]
+        # A single export of just the touched tasks brings the store up to
+        # date, including any Taskwarrior changed before it failed
+        self._store_tasks(self.reader.get_many(uuids))
+        if self.write_error:
+            return 0
+        self.clear_marks()
+        return len(uuids)
+
+    def memoize(self, name, build):
+        """Return build(), reusing the result until the generation changes"""
+        cached = self._memo.get(name)
+        if cached is None or cached[0] != self.generation:
+            cached = (self.generation, build())
+            self._memo[name] = cached
+        return cached[1]
 
     def get_tasks_by_project(self):
         """Return tasks organized by project"""
+        return self.memoize("by_project", self._group_by_project)
+
+    def get_tasks_by_tag(self):
+        """Return tasks organized by tag"""
+        return self.memoize("by_tag", self._group_by_tag)
+
+    def _group_by_project(self):
         by_project = {}
         no_project_tasks = []
 
@@ -138,16 +903,15 @@ class TaskManager:
         # Sort tasks within each project by urgency
         for project in by_project:
             by_project[project].sort(
-                key=lambda x: float(x["urgency"] or 0.0), reverse=True
+                key=lambda x: x.urgency, reverse=True
             )
 
         # Sort no-project tasks by urgency
-        no_project_tasks.sort(key=lambda x: float(x["urgency"] or 0.0), reverse=True)
+        no_project_tasks.sort(key=lambda x: x.urgency, reverse=True)
 
         return sorted_projects, by_project, no_project_tasks
 
-    def get_tasks_by_tag(self):
-        """Return tasks organized by tag"""
+    def _group_by_tag(self):
         by_tag = {}
         no_tag_tasks = []
 
@@ -166,27 +930,73 @@ class TaskManager:
 
         # Sort tasks within each tag by urgency
         for tag in by_tag:
-            by_tag[tag].sort(key=lambda x: float(x["urgency"] or 0.0), reverse=True)
+            by_tag[tag].sort(key=lambda x: x.urgency, reverse=True)
 
         # Sort no-tag tasks by urgency
-        no_tag_tasks.sort(key=lambda x: float(x["urgency"] or 0.0), reverse=True)
+        no_tag_tasks.sort(key=lambda x: x.urgency, reverse=True)
 
         return sorted_tags, by_tag, no_tag_tasks
 
     def set_filter(self, filter_text):
         """Set text filter and update lists"""
+        previous = self.filter_text
         if filter_text and filter_text.strip():
             self.filter_text = filter_text.strip()
         else:
             self.filter_text = None
-        self.update_task_lists()
+
+        if self.filter_text == previous:
+            return
+        self._page_stops = set()
+
+        # current_tasks is kept in sync with the filters, so a query that
+        # extends the previous one (as when typing) only needs to narrow it
+        if previous and self.filter_text and previous.lower() in self.filter_text.lower():
+            self._set_listing([task for task in self.current_tasks if self._matches_text(task)])
+        else:
+            self.apply_filters()
+
+    def set_project_filter(self, project):
+        """Show only tasks in `project` (None for all)"""
+        self.filter_project = project
+        self._query_changed()
+
+    def set_tag_filter(self, tag):
+        """Show only tasks with `tag` (None for all)"""
+        self.filter_tag = tag
+        self._query_changed()
 
     def clear_filters(self):
         """Clear all filters"""
         self.filter_project = None
         self.filter_tag = None
         self.filter_text = None
-        self.update_task_lists()
+        self._query_changed()
+
+    def _query_changed(self):
+        # Pending tasks are filtered from the store right away; completed
+        # ones were exported for the previous filters, so they are dropped
+        # and the first page for the new ones is read
+        if self.show_completed:
+            for task in [task for task in self.store if task.status == "completed"]:
+                self.store.discard(task.uuid)
+            self.completed_before = None
+            self.completed_after = None
+            self.completed_more = False
+        self._page_stops = set()
+        self.apply_filters()
+        if not self.show_completed:
+            return
+
+        if self._full_load_pending:
+            # Its snapshot will not match the new query; it has to be
+            # requested again, and brings the first page with it
+            self.update_task_lists()
+        elif self.loader:
+            self.loader.request("page", self._query(), len(self._local_writes))
+        else:
+            self._add_completed_page(fetch_completed(self.reader, self._query()))
+            self._lists_changed()
 
     def debug_filters(self):
         """Return current filter state"""
@@ -205,21 +1015,8 @@ class TaskManager:
             return False
 
         task = self.current_tasks[task_idx]
-
-        # Initialize dependencies as a set
-        if "depends" not in task:
-            task["depends"] = set()
-        elif not isinstance(task["depends"], set):
-            # Convert existing dependencies to a set if they're not already
-            current_deps = task["depends"]
-            if not isinstance(current_deps, list):
-                current_deps = [current_deps]
-            task["depends"] = set(current_deps)
-
-        # Add the new dependency
-        task["depends"].add(depends_on_task)
-        task.save()
-        self.update_task_lists()
+        uuids = list(task.depends) + [depends_on_task["uuid"]]
+        self._write("save", task, {"depends": uuids})
         return True
 
     def toggle_completed(self):
@@ -0,0 +1,249 @@
+import json
+import platform
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from ui_components import UIComponents
+
+
+# Where frame time goes. Each section's time excludes the sections nested
+# inside it, so grouping done during a refresh counts as grouping only
+SECTIONS = ("data", "grouping", "formatting", "output")
+
+# TaskManager methods the TUI calls; their time (and the reads they make,
+# when not in the background) is data refresh
+DATA_METHODS = (
+    "update_task_lists", "refresh", "poll_loader", "poll_writer", "load_completed_near",
+    "apply_filters", "set_filter", "set_project_filter", "set_tag_filter", "clear_filters",
+    "toggle_completed", "add_task", "edit_task", "delete_task", "complete_task",
+    "set_dependency", "toggle_mark", "clear_marks", "bulk_complete", "bulk_delete",
+    "bulk_modify", "apply_external",
+)
+GROUPING_METHODS = ("_group_by_project", "_group_by_tag")
+READER_METHODS = ("pending", "completed_page", "modified_since", "get_many")
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def rounded(counters):
+    return {name: round(value, 3) for name, value in counters.items()}
+
+
+def key_name(key):
+    if key is None:
+        return "start"
+    if key == -1:
+        return "poll"
+    if 32 <= key < 127:
+        return chr(key)
+    return str(key)
+
+
+class Frame:
+    """Work done for one key press (or background update) and its redraw"""
+
+    __slots__ = ("key", "interactive", "seconds", "sections", "counters")
+
+    def __init__(self, key, interactive=False):
+        self.key = key
+        # Dialog keys wait for input inside the frame, so their total time
+        # is not a measure of Tsakarori's speed
+        self.interactive = interactive
+        self.seconds = 0.0
+        self.sections = dict.fromkeys(SECTIONS, 0.0)
+        self.counters = Counter()
+
+    def to_json(self):
+        data = {
+            "key": key_name(self.key),
+            "ms": round(self.seconds * 1000.0, 3),
+            "sections_ms": {
+                name: round(seconds * 1000.0, 3) for name, seconds in self.sections.items()
+            },
+        }
+        if self.interactive:
+            data["interactive"] = True
+        if self.counters:
+            data["counters"] = rounded(self.counters)
+        return data
+
+
+class Profiler:
+    """Per-frame timings and Taskwarrior I/O counters for `tsakarori.py --profile`.
+
+    attach() wraps the TaskManager, UIComponents and TUI methods that make
+    up a frame, and tw.execute_command, so nothing is measured (or slowed
+    down) unless profiling was asked for. The TUI marks where frames start
+    and end; report() summarises them.
+    """
+
+    def __init__(self, overlay=False):
+        self.overlay = overlay
+        self.frames = []
+        self.frame = None
+        # Totals since attach(); subprocesses also run on the loader and
+        # writer threads, hence the lock
+        self.counters = Counter()
+        self.reader = None
+        self._lock = threading.Lock()
+        self._counters_at_start = Counter()
+        self._frame_start = 0.0
+        # Time spent in sections nested inside the ones running
+        self._nested = []
+        self._thread = threading.get_ident()
+        self._started = time.perf_counter()
+        self._patched = []
+
+    def attach(self, app):
+        """Instrument a TsakaroriTUI, its TaskManager and their Taskwarrior access"""
+        task_manager = app.task_manager
+        self.reader = type(task_manager.reader).__name__
+        for name in DATA_METHODS:
+            self._wrap(task_manager, name, self.timed("data", getattr(task_manager, name)))
+        for name in GROUPING_METHODS:
+            self._wrap(task_manager, name, self.timed("grouping", getattr(task_manager, name)))
+        self._wrap(app, "draw", self.timed("output", app.draw))
+        self._wrap_static("group_layout", "grouping")
+        self._wrap_static("format_task_row", "formatting")
+
+        reader = task_manager.reader
+        for name in READER_METHODS:
+            if hasattr(reader, name):
+                self._wrap(reader, name, self.counted_reads(getattr(reader, name)))
+        if hasattr(task_manager.tw, "execute_command"):
+            self._wrap(
+                task_manager.tw, "execute_command",
+                self.counted_command(task_manager.tw.execute_command),
+            )
+
+    def detach(self):
+        """Undo attach()"""
+        for owner, name, original in reversed(self._patched):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._patched = []
+
+    def _wrap(self, obj, name, wrapper):
+        # Instance attributes shadow the methods until detach() removes them
+        self._patched.append((obj, name, None))
+        setattr(obj, name, wrapper)
+
+    def _wrap_static(self, name, section):
+        original = UIComponents.__dict__[name]
+        self._patched.append((UIComponents, name, original))
+        setattr(UIComponents, name, staticmethod(self.timed(section, original.__func__)))
+
+    def timed(self, section, fn):
+        """Wrap fn so its time, less nested sections, counts towards `section`"""
+        def wrapper(*args, **kwargs):
+            if self.frame is None or threading.get_ident() != self._thread:
+                return fn(*args, **kwargs)
+            self._nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.frame.sections[section] += elapsed - self._nested.pop()
+                if self._nested:
+                    self._nested[-1] += elapsed
+        return wrapper
+
+    def count(self, **counts):
+        with self._lock:
+            self.counters.update(counts)
+
+    def counted_command(self, execute_command):
+        """Wrap tw.execute_command to count `task` runs and the output read back"""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            output = execute_command(*args, **kwargs)
+            # With return_all=True it returns (stdout, stderr, returncode)
+            lines = output[0] if isinstance(output, tuple) else output
+            self.count(
+                task_runs=1,
+                task_bytes=sum(len(line.encode("utf-8")) + 1 for line in lines),
+                task_ms=(time.perf_counter() - start) * 1000.0,
+            )
+            return output
+        return wrapper
+
+    def counted_reads(self, read):
+        def wrapper(*args, **kwargs):
+            tasks = read(*args, **kwargs)
+            self.count(reads=1, rows_read=len(tasks))
+            return tasks
+        return wrapper
+
+    def start_frame(self, key, interactive=False):
+        self.frame = Frame(key, interactive)
+        with self._lock:
+            self._counters_at_start = Counter(self.counters)
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self, keep=True):
+        """Close the current frame; frames that drew nothing are dropped unless `keep`"""
+        frame = self.frame
+        if frame is None:
+            return
+        frame.seconds = time.perf_counter() - self._frame_start
+        with self._lock:
+            frame.counters = self.counters - self._counters_at_start
+        self.frame = None
+        if keep:
+            self.frames.append(frame)
+
+    def overlay_text(self):
+        """The last frame's timings, for the footer"""
+        if not self.frames:
+            return ""
+        frame = self.frames[-1]
+        sections = " ".join(
+            f"{name[:4]} {seconds * 1000.0:.1f}" for name, seconds in frame.sections.items()
+        )
+        text = f" {frame.seconds * 1000.0:.1f}ms: {sections}"
+        if frame.counters["task_runs"]:
+            text += f" | task x{frame.counters['task_runs']} {frame.counters['task_bytes'] // 1024}KB"
+        return text + " "
+
+    def report(self):
+        """Summary of every frame recorded, as a JSON-serialisable dict"""
+        frames = [frame for frame in self.frames if not frame.interactive]
+        times = [frame.seconds * 1000.0 for frame in frames] or [0.0]
+        sections = {}
+        for name in SECTIONS:
+            values = [frame.sections[name] * 1000.0 for frame in self.frames] or [0.0]
+            sections[name] = {
+                "total_ms": round(sum(values), 3),
+                "median_ms": round(statistics.median(values), 3),
+                "p95_ms": round(percentile(values, 0.95), 3),
+                "max_ms": round(max(values), 3),
+            }
+        slowest = sorted(frames, key=lambda frame: frame.seconds, reverse=True)[:10]
+        return {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "reader": self.reader,
+            "duration_s": round(time.perf_counter() - self._started, 3),
+            "frame_count": len(self.frames),
+            "frame_ms": {
+                "median": round(statistics.median(times), 3),
+                "p95": round(percentile(times, 0.95), 3),
+                "max": round(max(times), 3),
+            },
+            "sections": sections,
+            "counters": rounded(self.counters),
+            "slowest": [frame.to_json() for frame in slowest],
+            "frames": [frame.to_json() for frame in self.frames],
+        }
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
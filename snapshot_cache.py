@@ -0,0 +1,48 @@
+import json
+import os
+from itertools import islice
+from task_row import TaskRow
+
+
+class SnapshotCache:
+    """On-disk copy of the last loaded pending tasks, for instant startup"""
+
+    # Version 2 keeps tasks in list order
+    VERSION = 2
+
+    def __init__(self, cache_file=None):
+        if cache_file is None:
+            cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+            cache_file = os.path.join(cache_dir, "tsakarori", "tasks.json")
+        self.cache_file = cache_file
+
+    def _source(self):
+        """Identify the Taskwarrior database the snapshot was taken from"""
+        return {
+            "taskrc": os.environ.get("TASKRC", ""),
+            "taskdata": os.environ.get("TASKDATA", ""),
+        }
+
+    def load(self, limit=None):
+        """Return the cached tasks (the first `limit` of them) as TaskRows, or
+        None if there is no usable cache"""
+        try:
+            with open(self.cache_file, "r") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != self.VERSION or header.get("source") != self._source():
+                    return None
+
+                return [TaskRow.from_export(json.loads(line)) for line in islice(f, limit)]
+        except (OSError, ValueError):
+            return None
+
+    def save(self, tasks):
+        """Write pending tasks, in the order given, as one compact JSON export per line"""
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        tmp_file = self.cache_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            f.write(json.dumps({"version": self.VERSION, "source": self._source()}) + "\n")
+            for task in tasks:
+                if task.status == "pending":
+                    f.write(json.dumps(task.to_export(), separators=(",", ":")) + "\n")
+        os.replace(tmp_file, self.cache_file)
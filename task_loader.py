@@ -0,0 +1,100 @@
+import queue
+import threading
+from collections import namedtuple
+
+
+# Completed tasks are read this many at a time, newest first
+COMPLETED_PAGE = 200
+
+# What a full load reads: every pending task and, when completed tasks are
+# shown, the first page of completed ones in the given project and with the
+# given tag
+Query = namedtuple("Query", ["show_completed", "project", "tag"])
+
+# Result of one background load: a "full" load, the whole startup "cache",
+# a "delta" of modified tasks, or a "page" of older or "newer" completed
+# tasks. `tasks` is a tuple owned by the receiver; `write_mark` records how
+# many local writes had happened when the load was requested so they can be
+# replayed on top of the (possibly older) export. `prepared` is what the
+# loader's `prepare` callable made of a full load on the worker thread, so
+# the UI thread only has to adopt it.
+Snapshot = namedtuple(
+    "Snapshot", ["kind", "query", "tasks", "write_mark", "error", "prepared"]
+)
+
+
+def fetch_tasks(reader, query):
+    """Read the tasks TaskManager keeps: pending, plus completed if shown"""
+    if query.show_completed:
+        return reader.pending() + fetch_completed(reader, query)
+    return reader.pending()
+
+
+def fetch_completed(reader, query, before=None, after=None):
+    """Read the page of completed tasks that ended just before `before`, or
+    just after `after`"""
+    return reader.completed_page(query.project, query.tag, before, COMPLETED_PAGE, after)
+
+
+class TaskLoader:
+    """Runs Taskwarrior exports on a worker thread and hands back snapshots"""
+
+    def __init__(self, reader, prepare=None, cache=None):
+        self.reader = reader
+        # prepare(tasks, filters) is run on the worker thread for full and
+        # cache loads
+        self.prepare = prepare
+        self.cache = cache
+        self.in_flight = 0
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        """Whether a requested load has not been collected yet"""
+        return self.in_flight > 0
+
+    def request(self, kind, query, write_mark, since=None, filters=None):
+        """Queue a "full" or "cache" load (prepared for `filters`), a "delta"
+        of tasks modified after `since`, or a "page" ("newer" page) of
+        completed tasks that ended before (after) `since`"""
+        self.in_flight += 1
+        self._requests.put((kind, query, write_mark, since, filters))
+
+    def collect(self):
+        """Return every snapshot finished since the last call, without blocking"""
+        snapshots = []
+        while True:
+            try:
+                snapshots.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        self.in_flight -= len(snapshots)
+        return snapshots
+
+    def _run(self):
+        while True:
+            kind, query, write_mark, since, filters = self._requests.get()
+            prepared = None
+            try:
+                tasks = tuple(self._fetch(kind, query, since))
+                if kind in ("full", "cache") and self.prepare:
+                    prepared = self.prepare(tasks, filters)
+                error = None
+            except Exception as e:
+                tasks = ()
+                error = str(e)
+            self._results.put(Snapshot(kind, query, tasks, write_mark, error, prepared))
+
+    def _fetch(self, kind, query, since):
+        if kind == "cache":
+            return self.cache.load() or ()
+        if kind == "full":
+            return fetch_tasks(self.reader, query)
+        if kind == "page":
+            return fetch_completed(self.reader, query, since)
+        if kind == "newer":
+            return fetch_completed(self.reader, query, after=since)
+        return self.reader.modified_since(since)
@@ -0,0 +1,328 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from task_row import TaskRow
+from urgency import UrgencyEngine
+
+
+def end_key(task):
+    """Sort key for completed tasks by end date; tasks without one sort oldest"""
+    return task.end.timestamp() if task.end else 0.0
+
+
+def nearest_ends(tasks, limit, newest=True):
+    """The `limit` newest (or oldest) tasks plus any sharing the last one's
+    end time, newest first"""
+    tasks = sorted(tasks, key=end_key, reverse=newest)
+    cut = limit
+    while 0 < cut < len(tasks) and end_key(tasks[cut]) == end_key(tasks[cut - 1]):
+        cut += 1
+    tasks = tasks[:cut]
+    if not newest:
+        tasks.reverse()
+    return tasks
+
+
+class TaskwarriorReader:
+    """Reads tasks by running `task ... export`, into TaskRows"""
+
+    # Span of end dates read first for a page of completed tasks, and the
+    # most a window grows to, so no single export reads the whole history
+    FIRST_WINDOW = timedelta(days=30)
+    MAX_WINDOW = timedelta(days=30 * 8 ** 2)
+
+    def __init__(self, tw):
+        self.tw = tw
+
+    def _export_lines(self, query):
+        # tasklib builds the filter arguments, but its Task objects (and
+        # their per-field deserialisation) are skipped for plain rows
+        args = query.filter_obj.get_filter_params() + ["export"]
+        lines = (line.strip(",") for line in self.tw.execute_command(args))
+        return [line for line in lines if line]
+
+    def _export(self, query):
+        return [TaskRow.from_export(json.loads(line)) for line in self._export_lines(query)]
+
+    def pending(self):
+        return self._export(self.tw.tasks.pending())
+
+    def _count(self, query):
+        # `task count` prints just the number instead of exporting every task
+        return int(self.tw.execute_command(query.filter_obj.get_filter_params() + ["count"])[0])
+
+    def completed_page(self, project=None, tag=None, before=None, limit=200, after=None):
+        """Completed tasks that ended before `before` (None for now), newest first,
+        or with `after`, the oldest ones that ended after it.
+
+        Returns the `limit` tasks nearest the bound plus any sharing the last
+        one's end time, as SqliteReader does. Export cannot be limited, so
+        windows of end dates, growing up to MAX_WINDOW as they come up short,
+        are read until enough tasks have been found.
+        """
+        query = self.tw.tasks.completed()
+        if project:
+            query = query.filter(project__is=project)
+        if tag:
+            query = query.filter(f"+{tag}")
+        if after is not None:
+            return self._completed_after(query, after, limit)
+
+        tasks = []
+        upper = before
+        window = self.FIRST_WINDOW
+        while len(tasks) < limit:
+            window_query = query
+            if upper is not None:
+                window_query = window_query.filter(end__before=upper)
+            lower = (upper or datetime.now().astimezone()) - window
+            found = self._export(window_query.filter(end__after=lower))
+            tasks += found
+            # end.after is strict and timestamps have one second resolution
+            upper = lower + timedelta(seconds=1)
+            if not found and window == self.MAX_WINDOW:
+                # A long gap, or the start of the history
+                if not self._count(query.filter(end__before=upper)):
+                    break
+            window = min(window * 8, self.MAX_WINDOW)
+
+        return nearest_ends(tasks, limit)
+
+    def _completed_after(self, query, after, limit):
+        tasks = []
+        lower = after
+        now = datetime.now().astimezone()
+        window = self.FIRST_WINDOW
+        while len(tasks) < limit:
+            upper = lower + window
+            if upper > now:
+                # Nothing has ended in the future; read up to the newest
+                tasks += self._export(query.filter(end__after=lower))
+                break
+            tasks += self._export(query.filter(end__after=lower, end__before=upper))
+            lower = upper - timedelta(seconds=1)
+            window = min(window * 8, self.MAX_WINDOW)
+
+        return nearest_ends(tasks, limit, newest=False)
+
+    def modified_since(self, since):
+        """Every task modified after `since`, whatever its status"""
+        # modified.after is strict and timestamps have one second resolution,
+        # so step back a second to catch writes made in the same second
+        return self._export(self.tw.tasks.filter(modified__after=since - timedelta(seconds=1)))
+
+    def get_many(self, uuids):
+        """The tasks with the given uuids, in one export"""
+        if not uuids:
+            return []
+        return self._export(self.tw.tasks.filter(*uuids))
+
+    def count(self, status):
+        return self._count(self.tw.tasks.filter(status=status))
+
+
+class SqliteReader:
+    """Reads a Taskwarrior 3 `taskchampion.sqlite3` replica in-process.
+
+    Tasks are decoded into TaskRows; writes still go through the `task`
+    binary via `tw`. Urgency is not stored in the replica and is computed
+    locally, with the coefficients from tw's configuration.
+    """
+
+    DATE_FIELDS = ("entry", "modified", "due", "end", "wait", "start", "scheduled", "until")
+
+    def __init__(self, tw, db_path):
+        self.tw = tw
+        self.db_path = db_path
+        self._urgency = None
+        # Dependencies of every pending task (uuid -> depended-on uuids) and
+        # the reverse, for the blocked/blocking urgency terms. Built by a
+        # full read and kept current by the rows later reads return, so a
+        # delta read costs only its own rows. The loader thread and the UI
+        # thread (bulk writes read back) both read, hence the lock
+        self._depends = None
+        self._dependents = {}
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # A connection per call keeps the reader usable from the loader thread
+        return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def _query(self, where="", params=(), every_pending=False):
+        """Decode the matching tasks. `every_pending` says the query returns
+        all pending tasks, so the dependency map is rebuilt from them"""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT uuid, data FROM tasks {where}", params).fetchall()
+            ids = dict((uuid, id_) for id_, uuid in conn.execute("SELECT id, uuid FROM working_set"))
+            if self._depends is None and not every_pending:
+                scanned = self._scan_dependencies(conn)
+        conn.close()
+
+        tasks = [TaskRow.from_export(self._decode(uuid, json.loads(data), ids)) for uuid, data in rows]
+        if self._urgency is None:
+            self._urgency = UrgencyEngine.for_taskwarrior(self.tw)
+        now = datetime.now().astimezone()
+        with self._lock:
+            if every_pending:
+                self._set_dependencies(
+                    {task.uuid: task.depends for task in tasks if task.status == "pending"}
+                )
+            else:
+                if self._depends is None:
+                    self._set_dependencies(scanned)
+                self._update_dependencies(tasks)
+            for task in tasks:
+                task.urgency = self._urgency.compute(
+                    task,
+                    blocking=bool(self._dependents.get(task.uuid)),
+                    blocked=any(dep in self._depends for dep in task.depends),
+                    now=now,
+                )
+        return tasks
+
+    def _scan_dependencies(self, conn):
+        """Every pending task's dependencies, read without decoding the tasks"""
+        depends = dict(
+            (uuid, []) for (uuid,) in conn.execute(
+                "SELECT uuid FROM tasks WHERE json_extract(data, '$.status') = 'pending'"
+            )
+        )
+        for uuid, key in conn.execute(
+            "SELECT tasks.uuid, j.key FROM tasks, json_each(tasks.data) AS j"
+            " WHERE json_extract(tasks.data, '$.status') = 'pending'"
+            " AND j.key LIKE 'dep\\_%' ESCAPE '\\'"
+        ):
+            depends[uuid].append(key[len("dep_"):])
+        return depends
+
+    def _set_dependencies(self, depends):
+        self._depends = {}
+        self._dependents = {}
+        self._update_dependencies(
+            TaskRow(uuid=uuid, depends=tuple(deps)) for uuid, deps in depends.items()
+        )
+
+    def _update_dependencies(self, tasks):
+        """Replace the dependency map entries of freshly read tasks"""
+        for task in tasks:
+            for dependency in self._depends.pop(task.uuid, ()):
+                dependents = self._dependents[dependency]
+                dependents.discard(task.uuid)
+                if not dependents:
+                    del self._dependents[dependency]
+            if task.status == "pending":
+                self._depends[task.uuid] = task.depends
+                for dependency in task.depends:
+                    self._dependents.setdefault(dependency, set()).add(task.uuid)
+
+    def _decode(self, uuid, data, ids):
+        """Turn a taskchampion property map into Taskwarrior export format"""
+        exported = {"uuid": uuid, "id": ids.get(uuid, 0)}
+        tags = []
+        depends = []
+        annotations = []
+        for key, value in data.items():
+            if key.startswith("tag_"):
+                tags.append(key[len("tag_"):])
+            elif key.startswith("dep_"):
+                depends.append(key[len("dep_"):])
+            elif key.startswith("annotation_"):
+                annotations.append({
+                    "entry": self._timestamp(key[len("annotation_"):]),
+                    "description": value,
+                })
+            elif key in self.DATE_FIELDS:
+                exported[key] = self._timestamp(value)
+            else:
+                exported[key] = value
+        if tags:
+            exported["tags"] = tags
+        if depends:
+            exported["depends"] = depends
+        if annotations:
+            exported["annotations"] = annotations
+        return exported
+
+    def _timestamp(self, epoch):
+        moment = datetime.fromtimestamp(int(epoch), timezone.utc)
+        return moment.strftime("%Y%m%dT%H%M%SZ")
+
+    def pending(self):
+        return self._query("WHERE json_extract(data, '$.status') = 'pending'", every_pending=True)
+
+    def completed_page(self, project=None, tag=None, before=None, limit=200, after=None):
+        """Completed tasks that ended before `before` (None for now), newest first,
+        or with `after`, the oldest ones that ended after it.
+
+        Returns the `limit` tasks nearest the bound plus any sharing the last
+        one's end time, so that the next page can start strictly past it.
+        """
+        end = "COALESCE(CAST(json_extract(data, '$.end') AS INTEGER), 0)"
+        where = "WHERE json_extract(data, '$.status') = 'completed'"
+        params = []
+        if project:
+            where += " AND json_extract(data, '$.project') = ?"
+            params.append(project)
+        if tag:
+            where += " AND json_extract(data, ?) IS NOT NULL"
+            params.append(f'$."tag_{tag}"')
+        if before is not None:
+            where += f" AND {end} < ?"
+            params.append(int(before.timestamp()))
+        if after is not None:
+            where += f" AND {end} > ?"
+            params.append(int(after.timestamp()))
+
+        # End time of the limit-th task from the bound; every task if there
+        # are fewer
+        order, within = ("DESC", ">=") if after is None else ("ASC", "<=")
+        cutoff = f"SELECT {end} FROM tasks {where} ORDER BY 1 {order} LIMIT 1 OFFSET ?"
+        tasks = self._query(
+            f"{where} AND {end} {within} COALESCE(({cutoff}), {end})",
+            tuple(params) + tuple(params) + (limit - 1,),
+        )
+        tasks.sort(key=end_key, reverse=True)
+        return tasks
+
+    def modified_since(self, since):
+        """Every task modified after `since`, whatever its status"""
+        # Include the watermark's own second, as the CLI reader does
+        epoch = int(since.timestamp()) - 1
+        return self._query(
+            "WHERE CAST(json_extract(data, '$.modified') AS INTEGER) > ?", (epoch,)
+        )
+
+    def get_many(self, uuids):
+        """The tasks with the given uuids"""
+        if not uuids:
+            return []
+        placeholders = ",".join("?" * len(uuids))
+        return self._query(f"WHERE uuid IN ({placeholders})", tuple(uuids))
+
+    def count(self, status):
+        with self._connect() as conn:
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE json_extract(data, '$.status') = ?",
+                (status,),
+            ).fetchone()
+        conn.close()
+        return count
+
+
+def make_reader(tw):
+    """Pick the fastest read backend available for this Taskwarrior"""
+    try:
+        major = int(str(tw.version).split(".")[0])
+    except ValueError:
+        major = 0
+
+    if major >= 3:
+        data_location = os.environ.get("TASKDATA") or tw.config.get("data.location")
+        if data_location:
+            db_path = os.path.join(os.path.expanduser(data_location), "taskchampion.sqlite3")
+            if os.path.exists(db_path):
+                return SqliteReader(tw, db_path)
+
+    return TaskwarriorReader(tw)
@@ -0,0 +1,156 @@
+import json
+from datetime import datetime, timezone
+from tasklib import Task
+from tasklib.lazy import LazyUUIDTaskSet
+
+
+DATE_FIELDS = ("due", "entry", "modified", "start", "scheduled", "wait", "end")
+
+
+def parse_timestamp(value):
+    """Parse Taskwarrior's 20240101T120000Z into an aware local datetime"""
+    if not value:
+        return None
+    # Slicing is several times faster than strptime, and loads parse a lot
+    moment = datetime(
+        int(value[0:4]), int(value[4:6]), int(value[6:8]),
+        int(value[9:11]), int(value[11:13]), int(value[13:15]),
+        tzinfo=timezone.utc,
+    )
+    return moment.astimezone()
+
+
+def split_list(value):
+    """A list field from export JSON; tasklib and old Taskwarrior join them with commas"""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return value.split(",")
+    return value
+
+
+def format_timestamp(value):
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+class TaskRow:
+    """Compact copy of the task fields Tsakarori reads.
+
+    Rows are what the store and task lists hold. They are built straight
+    from Taskwarrior's export JSON; a tasklib Task is only materialised
+    (see to_task) when a change has to be written.
+    """
+
+    __slots__ = (
+        "uuid", "id", "description", "project", "tags", "urgency", "priority",
+        "due", "status", "depends", "entry", "modified", "start", "scheduled",
+        "wait", "end", "annotations",
+    )
+
+    def __init__(self, uuid=None, id=0, description="", project=None, tags=frozenset(),
+                 urgency=0.0, priority=None, due=None, status="pending", depends=(),
+                 entry=None, modified=None, start=None, scheduled=None, wait=None,
+                 end=None, annotations=()):
+        self.uuid = uuid
+        self.id = id
+        self.description = description
+        self.project = project
+        self.tags = tags
+        self.urgency = urgency
+        self.priority = priority
+        self.due = due
+        self.status = status
+        self.depends = depends
+        self.entry = entry
+        self.modified = modified
+        self.start = start
+        self.scheduled = scheduled
+        self.wait = wait
+        self.end = end
+        self.annotations = annotations
+
+    def __getitem__(self, key):
+        # Lets rows stand in for tasklib Tasks: unknown fields read as None
+        if key in self.__slots__:
+            return getattr(self, key)
+        return None
+
+    def __repr__(self):
+        return f"TaskRow({self.uuid!r}, {self.description!r})"
+
+    @classmethod
+    def from_export(cls, data):
+        """Build a row from one task of `task export` JSON"""
+        return cls(
+            uuid=data.get("uuid"),
+            id=data.get("id", 0),
+            description=data.get("description", ""),
+            project=data.get("project"),
+            tags=frozenset(split_list(data.get("tags"))),
+            urgency=float(data.get("urgency") or 0.0),
+            priority=data.get("priority"),
+            due=parse_timestamp(data.get("due")),
+            status=data.get("status", "pending"),
+            depends=tuple(split_list(data.get("depends"))),
+            entry=parse_timestamp(data.get("entry")),
+            modified=parse_timestamp(data.get("modified")),
+            start=parse_timestamp(data.get("start")),
+            scheduled=parse_timestamp(data.get("scheduled")),
+            wait=parse_timestamp(data.get("wait")),
+            end=parse_timestamp(data.get("end")),
+            annotations=tuple(a.get("description", "") for a in data.get("annotations") or ()),
+        )
+
+    @classmethod
+    def from_task(cls, task):
+        """Build a row from a tasklib Task, e.g. one returned by a save"""
+        return cls.from_export(json.loads(task.export_data()))
+
+    def to_export(self):
+        """The row's fields in `task export` format"""
+        data = {"uuid": self.uuid, "id": self.id, "description": self.description,
+                "status": self.status, "urgency": self.urgency}
+        if self.project:
+            data["project"] = self.project
+        if self.tags:
+            data["tags"] = sorted(self.tags)
+        if self.priority:
+            data["priority"] = self.priority
+        if self.depends:
+            data["depends"] = list(self.depends)
+        if self.annotations:
+            data["annotations"] = [{"description": text} for text in self.annotations]
+        for field in DATE_FIELDS:
+            value = getattr(self, field)
+            if value:
+                data[field] = format_timestamp(value)
+        return data
+
+    def to_task(self, tw):
+        """Materialise a tasklib Task for writing changes to this task"""
+        task = Task(tw)
+        task._load_data(self.to_export())
+        return task
+
+    def with_changes(self, changes):
+        """A copy of the row with `changes` (as given to set_fields) applied"""
+        row = TaskRow.__new__(TaskRow)
+        for field in self.__slots__:
+            setattr(row, field, getattr(self, field))
+        for field, value in changes.items():
+            if field == "tags":
+                value = frozenset(value or ())
+            elif field == "depends":
+                value = tuple(value or ())
+            elif field in DATE_FIELDS and value is not None:
+                value = value.astimezone()
+            setattr(row, field, value)
+        return row
+
+
+def set_fields(task, changes):
+    """Set row-style changes (plain lists of tags and dependency uuids) on a tasklib Task"""
+    for field, value in changes.items():
+        if field == "depends":
+            value = LazyUUIDTaskSet(task.backend, value)
+        task[field] = value
@@ -0,0 +1,200 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from text_index import TextIndex
+
+# Taskwarrior treats tasks due within a week as "due soon" (rc.due)
+DUE_SOON = timedelta(days=7)
+
+
+def count_due(dates, now=None, horizon=DUE_SOON):
+    """Number of due dates that are overdue and that are due soon"""
+    now = now or datetime.now().astimezone()
+    overdue = due_soon = 0
+    for due in dates:
+        if due < now:
+            overdue += 1
+        elif due < now + horizon:
+            due_soon += 1
+    return overdue, due_soon
+
+
+class TaskStore:
+    """Uuid-keyed in-memory copy (as TaskRows) of the tasks loaded from Taskwarrior"""
+
+    def __init__(self):
+        self.tasks = {}
+        # Secondary indexes: project/tag -> {uuid: task}. Tasks are edited in
+        # place, so the keys each uuid was indexed under are kept separately
+        self.by_project = {}
+        self.by_tag = {}
+        # Reverse dependencies: uuid -> {uuid: task} of tasks depending on it
+        self.dependents = {}
+        self._indexed = {}
+        self.text_index = TextIndex()
+        # Statistics kept up to date as tasks come and go: stored tasks per
+        # status, pending tasks per project/tag and pending due dates
+        self.status_counts = Counter()
+        self.pending_projects = Counter()
+        self.pending_tags = Counter()
+        self.due = {}
+        # Newest `modified` timestamp seen in a load from Taskwarrior, used
+        # as the watermark for delta refreshes
+        self.last_modified = None
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __iter__(self):
+        return iter(self.tasks.values())
+
+    def __contains__(self, uuid):
+        return uuid in self.tasks
+
+    def get(self, uuid):
+        """Return the stored task for a uuid, or None"""
+        return self.tasks.get(uuid)
+
+    def load(self, tasks):
+        """Replace the whole store with a freshly exported task set"""
+        self.tasks = {task.uuid: task for task in tasks}
+        self.by_project = {}
+        self.by_tag = {}
+        self.dependents = {}
+        self._indexed = {}
+        self.text_index = TextIndex()
+        self.status_counts = Counter()
+        self.pending_projects = Counter()
+        self.pending_tags = Counter()
+        self.due = {}
+        for task in self.tasks.values():
+            self._index(task)
+        self.last_modified = None
+        self.advance(self.tasks.values())
+
+    def put(self, task):
+        """Insert or replace a single task, returning the previous one"""
+        uuid = task.uuid
+        previous = self.tasks.get(uuid)
+        self._unindex(uuid)
+        self.tasks[uuid] = task
+        self._index(task)
+        return previous
+
+    def discard(self, uuid):
+        """Remove a task if present, returning it"""
+        self._unindex(uuid)
+        return self.tasks.pop(uuid, None)
+
+    def advance(self, tasks):
+        """Move the modification watermark past the given loaded tasks"""
+        for task in tasks:
+            modified = task.modified
+            if modified and (self.last_modified is None or modified > self.last_modified):
+                self.last_modified = modified
+
+    def select(self, project=None, tag=None, text=None):
+        """Tasks matching the project, tag and text filters, via the indexes.
+
+        Text matches are candidates only; check the exact substring on them.
+        """
+        tasks = self._select_facets(project, tag)
+        if not text:
+            return tasks
+
+        found = self.text_index.candidates(text)
+        if found is None:
+            return tasks
+        if not project and not tag:
+            return list(found.values())
+        return [task for task in tasks if task.uuid in found]
+
+    def _select_facets(self, project, tag):
+        if not project and not tag:
+            return list(self.tasks.values())
+        if not tag:
+            return list(self.by_project.get(project, {}).values())
+        if not project:
+            return list(self.by_tag.get(tag, {}).values())
+
+        in_project = self.by_project.get(project, {})
+        with_tag = self.by_tag.get(tag, {})
+        # Walk the smaller posting and probe the larger one
+        if len(in_project) > len(with_tag):
+            in_project, with_tag = with_tag, in_project
+        return [task for uuid, task in in_project.items() if uuid in with_tag]
+
+    def dependencies_of(self, task):
+        """Stored tasks the given task depends on"""
+        found = (self.tasks.get(uuid) for uuid in task.depends)
+        return [dependency for dependency in found if dependency is not None]
+
+    def dependents_of(self, task):
+        """Stored tasks that depend on (are blocked by) the given task"""
+        return list(self.dependents.get(task.uuid, {}).values())
+
+    def status_of(self, uuid):
+        """Status a task had when it was stored, or None if it is not stored"""
+        entry = self._indexed.get(uuid)
+        return entry[3] if entry else None
+
+    def due_counts(self, now=None, horizon=DUE_SOON):
+        """Number of pending tasks that are overdue and that are due soon"""
+        return count_due(self.due.values(), now, horizon)
+
+    def _index(self, task):
+        uuid = task.uuid
+        project = task.project
+        tags = tuple(task.tags)
+        depends = tuple(task.depends)
+        status = task.status
+        self._indexed[uuid] = (project, tags, depends, status)
+        if project:
+            self.by_project.setdefault(project, {})[uuid] = task
+        for tag in tags:
+            self.by_tag.setdefault(tag, {})[uuid] = task
+        for dependency in depends:
+            self.dependents.setdefault(dependency, {})[uuid] = task
+        self.text_index.add(task)
+
+        self.status_counts[status] += 1
+        if status == "pending":
+            if project:
+                self.pending_projects[project] += 1
+            self.pending_tags.update(tags)
+            if task.due:
+                self.due[uuid] = task.due
+
+    def _unindex(self, uuid):
+        entry = self._indexed.pop(uuid, None)
+        if entry is None:
+            return
+
+        self.text_index.remove(uuid)
+        project, tags, depends, status = entry
+        if project:
+            self._drop_posting(self.by_project, project, uuid)
+        for tag in tags:
+            self._drop_posting(self.by_tag, tag, uuid)
+        for dependency in depends:
+            self._drop_posting(self.dependents, dependency, uuid)
+
+        self._drop_count(self.status_counts, status)
+        if status == "pending":
+            if project:
+                self._drop_count(self.pending_projects, project)
+            for tag in tags:
+                self._drop_count(self.pending_tags, tag)
+            self.due.pop(uuid, None)
+
+    @staticmethod
+    def _drop_posting(index, key, uuid):
+        postings = index[key]
+        del postings[uuid]
+        if not postings:
+            del index[key]
+
+    @staticmethod
+    def _drop_count(counter, key):
+        counter[key] -= 1
+        if not counter[key]:
+            del counter[key]
@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from tasklib import Task
+from task_row import TaskRow, set_fields
+
+
+# One write to persist. `data` is the exported task as it stood before the
+# write (None for a new task) and `changes` the fields to set on it; `action`
+# is the tasklib method to finish with: "save", "done" or "delete". `uuid` is
+# the key the task is stored under, a placeholder for tasks not yet added.
+Write = namedtuple("Write", ["seq", "action", "uuid", "data", "changes"])
+
+# Outcome of a write: the task (as a TaskRow) as Taskwarrior stored it, or an
+# error message
+WriteResult = namedtuple("WriteResult", ["write", "task", "error"])
+
+
+def is_lock_error(error):
+    """Whether a Taskwarrior failure was contention for its database"""
+    message = str(error).lower()
+    return "lock" in message or "busy" in message
+
+
+def retry_locked(action, delays):
+    """Run action(), retrying after each delay while the database is locked"""
+    for delay in delays:
+        try:
+            return action()
+        except Exception as e:
+            if not is_lock_error(e):
+                raise
+        time.sleep(delay)
+    return action()
+
+
+class TaskWriter:
+    """Persists task writes on a worker thread, in the order they were made"""
+
+    # Seconds to wait before each retry of a write that found the database
+    # locked; the write fails for good after the last one
+    RETRY_DELAYS = (0.1, 0.25, 0.5, 1.0, 2.0)
+
+    def __init__(self, tw):
+        self.tw = tw
+        self.in_flight = 0
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        # Placeholder uuid of a task added through this writer -> real uuid,
+        # so writes queued before the add finished reach the right task
+        self._aliases = {}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        """Whether a submitted write has not been collected yet"""
+        return self.in_flight > 0
+
+    def submit(self, write):
+        self.in_flight += 1
+        self._requests.put(write)
+
+    def wait(self):
+        """Block until every submitted write has been attempted"""
+        self._requests.join()
+
+    def collect(self):
+        """Return every write result finished since the last call, without blocking"""
+        results = []
+        while True:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        self.in_flight -= len(results)
+        return results
+
+    def _run(self):
+        while True:
+            write = self._requests.get()
+            try:
+                task = self._persist(write)
+                error = None
+            except Exception as e:
+                task = None
+                error = str(e)
+            self._results.put(WriteResult(write, task, error))
+            self._requests.task_done()
+
+    def _persist(self, write):
+        return retry_locked(lambda: self._perform(write), self.RETRY_DELAYS)
+
+    def _perform(self, write):
+        task = Task(self.tw)
+        if write.data is not None:
+            data = dict(write.data)
+            data["uuid"] = self._resolve(data["uuid"])
+            task._load_data(data)
+
+        changes = dict(write.changes)
+        if "depends" in changes:
+            changes["depends"] = [self._resolve(uuid) for uuid in changes["depends"]]
+        set_fields(task, changes)
+
+        getattr(task, write.action)()
+
+        if write.data is None:
+            self._aliases[write.uuid] = task["uuid"]
+        return TaskRow.from_task(task)
+
+    def _resolve(self, uuid):
+        return self._aliases.get(uuid, uuid)
@@ -1,10 +1,19 @@
+import copy
+import json
 import pytest
 import sys
+import uuid
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from tasklib.backends import Backend
+from tasklib.filters import TaskWarriorFilter
+from tasklib.task import Task, TaskQuerySet
+
 # Add project root to Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / "benchmarks"))
 
 @pytest.fixture
 def sample_task():
@@ -26,4 +35,174 @@ def sample_project():
             {"description": "Task 1", "priority": "H"},
             {"description": "Task 2", "priority": "M"}
         ]
-    } 
\ No newline at end of file
+    } 
+
+class FakeTaskWarrior(Backend):
+    """In-memory stand-in for tasklib's TaskWarrior backend.
+
+    Understands just enough of the filter syntax tasklib generates
+    (attributes, +tag and uuid) to serve TaskManager without a `task` binary.
+    """
+
+    VERSION_2_4_5 = "2.4.5"
+
+    def __init__(self, tasks=None):
+        self.version = "2.6.0"
+        self.config = {}
+        self.db = {}
+        self.commands = []
+        self.clock = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.tasks = TaskQuerySet(self)
+        for data in tasks or []:
+            self.insert(data)
+
+    def insert(self, data):
+        """Add raw exported task data, filling in the fields Taskwarrior would"""
+        data = dict(data)
+        data.setdefault("uuid", str(uuid.uuid4()))
+        data.setdefault("status", "pending")
+        data.setdefault("urgency", 0.0)
+        data.setdefault("entry", self.tick())
+        data.setdefault("modified", data["entry"])
+        if data["status"] == "pending":
+            data.setdefault("id", len(self.db) + 1)
+        else:
+            data.setdefault("id", 0)
+            data.setdefault("end", data["modified"])
+        self.db[data["uuid"]] = data
+        return data
+
+    def tick(self):
+        """Advance the fake clock by a second and return it as a TW timestamp"""
+        self.clock += timedelta(seconds=1)
+        return self.clock.strftime("%Y%m%dT%H%M%SZ")
+
+    def touch(self, task_uuid, **changes):
+        """Simulate another process modifying a task"""
+        data = self.db[task_uuid]
+        data.update(changes)
+        data["modified"] = self.tick()
+        return data
+
+    @property
+    def filter_class(self):
+        return TaskWarriorFilter
+
+    def filter_tasks(self, filter_obj):
+        result = []
+        for data in self._select(filter_obj.get_filter_params()):
+            task = Task(self)
+            task._load_data(copy.deepcopy(data))
+            result.append(task)
+        return result
+
+    def _select(self, params, command="export"):
+        self.commands.append(params + [command])
+        # Like Taskwarrior, a list of bare uuids selects any of them
+        uuids = {param for param in params if ":" not in param and param[:1] != "+"}
+        params = [param for param in params if param not in uuids]
+        return [
+            data for data in self.db.values()
+            if (not uuids or data["uuid"] in uuids)
+            and all(self._matches(data, param) for param in params)
+        ]
+
+    def _matches(self, data, param):
+        if param.startswith("+"):
+            return param[1:] in data.get("tags", [])
+        key, value = param.split(":", 1)
+        value = value.strip("'")
+        if key.endswith(".is"):
+            key = key[: -len(".is")]
+        if key.endswith(".after"):
+            return data.get(key[: -len(".after")], "") > value
+        if key.endswith(".before"):
+            return key[: -len(".before")] in data and data[key[: -len(".before")]] < value
+        return str(data.get(key)) == value
+
+    def save_task(self, task):
+        exported = json.loads(task.export_data())
+        # tasklib joins tags and dependencies with commas; export lists them
+        for key in ("tags", "depends"):
+            if isinstance(exported.get(key), str):
+                exported[key] = exported[key].split(",")
+        if task.saved:
+            self.commands.append([task["uuid"], "modify"])
+            data = self.db[task["uuid"]]
+            for key in task._modified_fields:
+                if key in exported:
+                    data[key] = exported[key]
+                else:
+                    data.pop(key, None)
+            data["modified"] = self.tick()
+        else:
+            self.commands.append(["add"])
+            data = self.insert(exported)
+            task._data["uuid"] = data["uuid"]
+        task.refresh(after_save=True)
+
+    def delete_task(self, task):
+        self.commands.append([task["uuid"], "delete"])
+        self.touch(task["uuid"], status="deleted")
+
+    def complete_task(self, task):
+        self.commands.append([task["uuid"], "done"])
+        data = self.touch(task["uuid"], status="completed")
+        data["end"] = data["modified"]
+
+    def execute_command(self, args, config_override=None, allow_failure=True,
+                        return_all=False):
+        """Run `<filter> export|count` or `<uuids> done|delete|modify <mods>` against the fake db"""
+        if args[-1] == "export":
+            return [json.dumps(data) for data in self._select(list(args[:-1]))]
+        if args[-1] == "count":
+            return [str(len(self._select(list(args[:-1]), "count")))]
+
+        self.commands.append(list(args))
+        commands = {"done": "completed", "delete": "deleted", "modify": None}
+        split = next(i for i, arg in enumerate(args) if arg in commands)
+        uuids, command, mods = args[:split], args[split], args[split + 1:]
+
+        for task_uuid in uuids:
+            changes = {}
+            if commands[command]:
+                changes["status"] = commands[command]
+            data = self.db[task_uuid]
+            for mod in mods:
+                if mod.startswith("+"):
+                    changes["tags"] = changes.get("tags", data.get("tags", [])) + [mod[1:]]
+                else:
+                    key, value = mod.split(":", 1)
+                    changes[key] = value
+            self.touch(task_uuid, **changes)
+        return []
+
+    def refresh_task(self, task, after_save=False):
+        return copy.deepcopy(self.db[task["uuid"]])
+
+    def start_task(self, task):
+        raise NotImplementedError
+
+    def stop_task(self, task):
+        raise NotImplementedError
+
+    def annotate_task(self, task, annotation):
+        raise NotImplementedError
+
+    def denotate_task(self, task, annotation):
+        raise NotImplementedError
+
+    def sync(self):
+        raise NotImplementedError
+
+
+@pytest.fixture
+def fake_tw():
+    """Fixture providing an in-memory Taskwarrior backend with a few tasks"""
+    return FakeTaskWarrior([
+        {"description": "Write report", "project": "Work", "tags": ["urgent"], "urgency": 5.0},
+        {"description": "Review PR", "project": "Work", "tags": ["code"], "urgency": 3.0},
+        {"description": "Buy milk", "project": "Home", "urgency": 1.0},
+        {"description": "Call mum", "urgency": 2.0},
+        {"description": "Old chore", "project": "Home", "status": "completed", "urgency": 0.5},
+    ])
@@ -0,0 +1,70 @@
+import io
+import json
+import os
+import socket
+import stat
+
+from live_updates import UpdateListener, hook_main, is_private, notify
+
+
+def stale_socket(path, mode=0o600):
+    """A socket file whose process has gone"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(str(path))
+    sock.close()
+    os.chmod(path, mode)
+
+
+def test_listeners_receive_notified_tasks(tmp_path):
+    stale_socket(tmp_path / "1.sock")
+    listener = UpdateListener(str(tmp_path))
+    try:
+        assert listener.receive() == []
+        line = json.dumps({"uuid": "u-1", "description": "Buy milk"})
+        assert notify(line, str(tmp_path)) == 1
+        notify("not json", str(tmp_path))
+        assert listener.receive() == [{"uuid": "u-1", "description": "Buy milk"}]
+    finally:
+        listener.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_only_private_sockets_get_tasks(tmp_path):
+    listener = UpdateListener(str(tmp_path))
+    try:
+        assert is_private(listener.path, stat.S_ISSOCK)
+        # Writable by others: not one a Tsakarori of ours made
+        stale_socket(tmp_path / "1.sock", mode=0o666)
+        os.symlink(listener.path, tmp_path / "2.sock")
+        assert notify(json.dumps({"uuid": "u-1"}), str(tmp_path)) == 1
+        assert sorted(os.listdir(tmp_path)) == sorted(["1.sock", "2.sock", f"{os.getpid()}.sock"])
+
+        os.chmod(tmp_path, 0o755)
+        assert notify(json.dumps({"uuid": "u-2"}), str(tmp_path)) == 0
+        assert UpdateListener.open(str(tmp_path)) is None
+        assert [task["uuid"] for task in listener.receive()] == ["u-1"]
+    finally:
+        os.chmod(tmp_path, 0o700)
+        listener.close()
+
+
+def test_hook_echoes_the_modified_task(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    listener = UpdateListener()
+    original = json.dumps({"uuid": "u-1", "description": "Buy milk"})
+    modified = json.dumps({"uuid": "u-1", "description": "Buy oat milk"})
+    stdout = io.StringIO()
+    try:
+        assert hook_main(io.StringIO(original + "\n" + modified + "\n"), stdout) == 0
+        assert stdout.getvalue() == modified + "\n"
+        assert [task["description"] for task in listener.receive()] == ["Buy oat milk"]
+    finally:
+        listener.close()
+
+
+def test_hook_works_without_listeners(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "missing"))
+    added = json.dumps({"uuid": "u-2", "description": "Call mum"})
+    stdout = io.StringIO()
+    assert hook_main(io.StringIO(added + "\n"), stdout) == 0
+    assert stdout.getvalue() == added + "\n"
@@ -0,0 +1,62 @@
+from models import TaskManager
+from profiler import Profiler
+from tsakarori import TsakaroriTUI
+from ui_components import UIComponents
+from virtual_screen import VirtualScreen, memory_task_manager
+
+TASKS = [
+    {"uuid": "u-1", "id": 1, "description": "Write report", "project": "Work",
+     "tags": ["urgent"], "urgency": 5.0, "status": "pending"},
+    {"uuid": "u-2", "id": 2, "description": "Buy milk", "project": "Home",
+     "urgency": 1.0, "status": "pending"},
+]
+
+
+def test_frames_are_timed_by_section(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    format_task_row = UIComponents.__dict__["format_task_row"]
+    app = TsakaroriTUI(memory_task_manager(TASKS), Profiler(overlay=True))
+    app.profiler.attach(app)
+    with VirtualScreen(24, 80, "jvrq") as screen:
+        app.main(screen.stdscr)
+    app.profiler.detach()
+
+    frames = app.profiler.frames
+    assert [frame.key for frame in frames] == [None, ord("j"), ord("v"), ord("r")]
+    first, move, view, refresh = frames
+    assert first.sections["formatting"] > 0
+    assert first.sections["output"] > 0
+    assert view.sections["grouping"] > 0
+    assert refresh.sections["data"] > 0
+    assert refresh.counters["reads"] == 1
+    for frame in frames:
+        assert sum(frame.sections.values()) <= frame.seconds
+    # The footer shows the previous frame's timings
+    assert "ms: data" in screen.text()[-1]
+    assert UIComponents.__dict__["format_task_row"] is format_task_row
+    assert "format_task_row" not in vars(app.task_manager)
+
+    report = app.profiler.report()
+    assert report["frame_count"] == 4
+    assert report["reader"] == "MemoryReader"
+    assert set(report["sections"]) == {"data", "grouping", "formatting", "output"}
+    assert report["frames"][2]["key"] == "v"
+
+
+def test_task_runs_are_counted(fake_tw, monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    app = TsakaroriTUI(TaskManager(tw=fake_tw), Profiler())
+    app.profiler.attach(app)
+
+    app.profiler.start_frame(ord("r"))
+    app.task_manager.update_task_lists()
+    app.profiler.end_frame()
+
+    counters = app.profiler.frames[0].counters
+    assert counters["task_runs"] == 1
+    assert counters["task_bytes"] > 0
+    assert counters["rows_read"] == len(app.task_manager.current_tasks)
+    # Interactive frames are left out of the frame time summary
+    app.profiler.start_frame(ord("a"), interactive=True)
+    app.profiler.end_frame()
+    assert app.profiler.report()["frames"][1]["interactive"]
@@ -0,0 +1,49 @@
+from models import TaskManager
+from snapshot_cache import SnapshotCache
+from test_task_manager import descriptions, wait_for_loader
+
+
+def test_cache_round_trip(fake_tw, tmp_path):
+    cache = SnapshotCache(str(tmp_path / "tasks.json"))
+    TaskManager(tw=fake_tw, cache=cache).save_snapshot()
+
+    tasks = cache.load()
+    assert sorted(descriptions(tasks)) == ["Buy milk", "Call mum", "Review PR", "Write report"]
+    review = next(t for t in tasks if t["description"] == "Review PR")
+    assert review["project"] == "Work"
+    assert review["tags"] == {"code"}
+    assert review["urgency"] == 3.0
+
+
+def test_missing_cache_is_ignored(fake_tw, tmp_path):
+    assert SnapshotCache(str(tmp_path / "nope.json")).load() is None
+
+
+def test_startup_renders_cache_then_reconciles(fake_tw, tmp_path):
+    cache = SnapshotCache(str(tmp_path / "tasks.json"))
+    TaskManager(tw=fake_tw, cache=cache).save_snapshot()
+    fake_tw.insert({"description": "Added elsewhere", "urgency": 10.0})
+
+    task_manager = TaskManager(tw=fake_tw, background=True, cache=cache)
+    assert task_manager.stale
+    assert len(task_manager.current_tasks) == 4
+
+    wait_for_loader(task_manager)
+    assert not task_manager.stale
+    assert task_manager.current_tasks[0]["description"] == "Added elsewhere"
+
+
+def test_startup_shows_first_cached_page_before_indexing(fake_tw, tmp_path, monkeypatch):
+    cache = SnapshotCache(str(tmp_path / "tasks.json"))
+    TaskManager(tw=fake_tw, cache=cache).save_snapshot()
+    assert descriptions(cache.load()) == ["Write report", "Review PR", "Call mum", "Buy milk"]
+
+    monkeypatch.setattr(TaskManager, "FIRST_PAGE", 2)
+    task_manager = TaskManager(tw=fake_tw, background=True, cache=cache)
+    assert descriptions(task_manager.current_tasks) == ["Write report", "Review PR"]
+    # The rest of the snapshot is read and indexed by the loader
+    assert len(task_manager.store) == 0
+
+    wait_for_loader(task_manager)
+    assert len(task_manager.store) == 4
+    assert len(task_manager.current_tasks) == 4
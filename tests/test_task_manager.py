@@ -0,0 +1,356 @@
+import time
+import pytest
+from tasklib.backends import TaskWarriorException
+from models import TaskManager
+from task_writer import TaskWriter
+
+
+@pytest.fixture
+def task_manager(fake_tw):
+    return TaskManager(tw=fake_tw)
+
+
+def descriptions(tasks):
+    return [t["description"] for t in tasks]
+
+
+def test_initial_load(task_manager):
+    assert descriptions(task_manager.current_tasks) == [
+        "Write report", "Review PR", "Call mum", "Buy milk"
+    ]
+    assert task_manager.projects == ["Home", "Work"]
+    assert task_manager.tags == ["code", "urgent"]
+    assert len(task_manager.store) == 4
+
+
+def test_mutations_do_not_reexport(task_manager, fake_tw):
+    exports = len(fake_tw.commands)
+
+    task_manager.add_task("New thing", project="Garden", tags=["outside"])
+    assert "New thing" in descriptions(task_manager.current_tasks)
+    assert task_manager.projects == ["Garden", "Home", "Work"]
+    assert "outside" in task_manager.tags
+
+    task_manager.complete_task(0)
+    assert "Write report" not in descriptions(task_manager.current_tasks)
+    assert "urgent" not in task_manager.tags
+
+    task_manager.delete_task(descriptions(task_manager.current_tasks).index("Buy milk"))
+    assert "Buy milk" not in descriptions(task_manager.current_tasks)
+
+    full_exports = [c for c in fake_tw.commands[exports:] if c[:1] == ["status:'pending'"]]
+    assert full_exports == []
+
+
+def test_edit_moves_task_between_facets(task_manager):
+    idx = descriptions(task_manager.current_tasks).index("Call mum")
+    task_manager.edit_task(idx, project="Family", tags=["phone"])
+
+    assert task_manager.projects == ["Family", "Home", "Work"]
+    assert task_manager.tags == ["code", "phone", "urgent"]
+    assert len(task_manager.current_tasks) == 4
+
+
+def test_store_matches_full_reload(task_manager):
+    task_manager.add_task("Another", project="Work")
+    task_manager.complete_task(1)
+    task_manager.filter_project = "Work"
+    task_manager.apply_filters()
+    incremental = descriptions(task_manager.current_tasks)
+
+    task_manager.update_task_lists()
+    assert descriptions(task_manager.current_tasks) == incremental
+
+
+def test_completed_tasks_stay_listed_when_shown(task_manager):
+    task_manager.toggle_completed()
+    assert "Old chore" in descriptions(task_manager.current_tasks)
+
+    task_manager.complete_task(0)
+    statuses = [t["status"] for t in task_manager.current_tasks]
+    assert statuses == ["pending"] * 3 + ["completed"] * 2
+    assert "Write report" in descriptions(task_manager.current_tasks[3:])
+
+
+def test_completed_tasks_are_filtered_by_taskwarrior(fake_tw):
+    fake_tw.insert({"description": "Old report", "project": "Work", "status": "completed"})
+    task_manager = TaskManager(tw=fake_tw)
+    task_manager.toggle_completed()
+    assert len(task_manager.store) == 6
+
+    task_manager.set_project_filter("Work")
+    assert fake_tw.commands[-1][:2] == ["status:'completed'", "project.is:'Work'"]
+    assert descriptions(task_manager.current_tasks) == ["Write report", "Review PR", "Old report"]
+    # Pending tasks are still all held, for other filters and the statistics
+    assert len(task_manager.store) == 5
+
+    task_manager.set_tag_filter("urgent")
+    assert fake_tw.commands[-1][:3] == ["status:'completed'", "project.is:'Work'", "+urgent"]
+    assert descriptions(task_manager.current_tasks) == ["Write report"]
+
+    task_manager.clear_filters()
+    assert "Old chore" in descriptions(task_manager.current_tasks)
+
+
+def test_filter_changes_reread_only_completed_tasks(fake_tw):
+    fake_tw.insert({"description": "Old report", "project": "Work", "status": "completed"})
+    task_manager = TaskManager(tw=fake_tw, background=True)
+    task_manager.toggle_completed()
+    wait_for_loader(task_manager)
+    commands = len(fake_tw.commands)
+
+    task_manager.set_project_filter("Work")
+    # Pending tasks are filtered in memory before the page arrives
+    assert descriptions(task_manager.current_tasks) == ["Write report", "Review PR"]
+    wait_for_loader(task_manager)
+    reads = fake_tw.commands[commands:]
+    assert reads and all(c[:2] == ["status:'completed'", "project.is:'Work'"] for c in reads)
+    assert descriptions(task_manager.current_tasks) == ["Write report", "Review PR", "Old report"]
+
+
+def test_dependency_changes_rerank_locally(task_manager):
+    tasks = {t["description"]: t for t in task_manager.current_tasks}
+    task_manager.set_dependency(0, tasks["Call mum"])
+
+    # Call mum became blocking (+8.0); Write report's own urgency comes
+    # from Taskwarrior, which the fake does not recompute
+    assert descriptions(task_manager.current_tasks)[:2] == ["Call mum", "Write report"]
+    assert task_manager.current_tasks[0]["urgency"] == 10.0
+
+    task_manager.complete_task(1)
+    assert task_manager.store.select(text="mum")[0]["urgency"] == 2.0
+
+
+def test_refresh_merges_external_changes(task_manager, fake_tw):
+    by_desc = {d["description"]: d["uuid"] for d in fake_tw.db.values()}
+    fake_tw.touch(by_desc["Buy milk"], status="completed")
+    fake_tw.touch(by_desc["Review PR"], description="Review big PR", urgency=9.0)
+    fake_tw.insert({"description": "From cron", "tags": ["cron"], "modified": fake_tw.tick()})
+
+    task_manager.refresh()
+    assert descriptions(task_manager.current_tasks) == [
+        "Review big PR", "Write report", "Call mum", "From cron"
+    ]
+    assert "cron" in task_manager.tags
+    assert fake_tw.commands[-1][0].startswith("modified.after:")
+
+
+def test_refresh_without_changes_is_cheap(task_manager, fake_tw):
+    before = descriptions(task_manager.current_tasks)
+    # Only tasks from around the watermark come back, not the whole database
+    assert task_manager.refresh() < len(fake_tw.db)
+    assert descriptions(task_manager.current_tasks) == before
+
+
+def wait_for_loader(task_manager, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while task_manager.loading and time.monotonic() < deadline:
+        task_manager.poll_loader()
+        time.sleep(0.01)
+    assert not task_manager.loading
+
+
+def test_background_load_publishes_snapshot(fake_tw):
+    task_manager = TaskManager(tw=fake_tw, background=True)
+    assert task_manager.loading
+    assert task_manager.current_tasks == []
+
+    wait_for_loader(task_manager)
+    assert descriptions(task_manager.current_tasks) == [
+        "Write report", "Review PR", "Call mum", "Buy milk"
+    ]
+
+
+def test_background_load_is_indexed_off_the_ui_thread(fake_tw, monkeypatch):
+    task_manager = TaskManager(tw=fake_tw, background=True)
+    wait_for_loader(task_manager)
+    old_store = task_manager.store
+
+    def fail(*args):
+        raise AssertionError("the UI thread should only adopt the prepared load")
+
+    monkeypatch.setattr(task_manager, "apply_filters", fail)
+    monkeypatch.setattr(old_store, "load", fail)
+    fake_tw.insert({"description": "Added elsewhere", "urgency": 4.0})
+    task_manager.update_task_lists()
+    wait_for_loader(task_manager)
+
+    assert task_manager.store is not old_store
+    assert descriptions(task_manager.current_tasks)[:2] == ["Write report", "Added elsewhere"]
+    assert task_manager.index_of(task_manager.current_tasks[1].uuid) == 1
+
+
+def test_local_writes_survive_older_snapshot(fake_tw):
+    task_manager = TaskManager(tw=fake_tw, background=True)
+    wait_for_loader(task_manager)
+
+    task_manager.update_task_lists()
+    task_manager.add_task("Written during load")
+    wait_for_loader(task_manager)
+    assert "Written during load" in descriptions(task_manager.current_tasks)
+
+
+def test_project_and_tag_filters_use_indexes(task_manager):
+    task_manager.filter_project = "Work"
+    task_manager.apply_filters()
+    assert descriptions(task_manager.current_tasks) == ["Write report", "Review PR"]
+    assert task_manager.project_counts == {"Work": 2}
+
+    task_manager.filter_tag = "code"
+    task_manager.apply_filters()
+    assert descriptions(task_manager.current_tasks) == ["Review PR"]
+    assert task_manager.tags == ["code"]
+
+
+def test_stats_follow_the_filters(task_manager):
+    pending, projects, tags, _ = task_manager.pending_stats()
+    assert (pending, projects) == (4, {"Work": 2, "Home": 1})
+
+    task_manager.filter_tag = "code"
+    task_manager.apply_filters()
+    pending, projects, tags, _ = task_manager.pending_stats()
+    assert (pending, projects, tags) == (1, {"Work": 1}, {"code": 1})
+
+
+@pytest.mark.parametrize("text", ["re", "PR", "work", "urg", "buy mi", "m", "-", "nothing"])
+def test_text_filter_matches_full_scan(task_manager, text):
+    task_manager.set_filter(text)
+    expected = [
+        t for t in task_manager.store if task_manager._matches_filters(t)
+    ]
+    assert sorted(descriptions(task_manager.current_tasks)) == sorted(descriptions(expected))
+
+
+def test_extending_text_filter_narrows_without_index(task_manager, monkeypatch):
+    task_manager.set_filter("r")
+    assert descriptions(task_manager.current_tasks) == ["Write report", "Review PR"]
+
+    def fail(*args):
+        raise AssertionError("narrowing should not query the store")
+
+    monkeypatch.setattr(task_manager.store, "select", fail)
+    task_manager.set_filter("re")
+    task_manager.set_filter("rep")
+    assert descriptions(task_manager.current_tasks) == ["Write report"]
+    assert task_manager.projects == ["Work"]
+
+    monkeypatch.undo()
+    task_manager.set_filter("re")
+    assert descriptions(task_manager.current_tasks) == ["Write report", "Review PR"]
+
+
+def test_generation_moves_on_every_list_change(task_manager):
+    generation = task_manager.generation
+    task_manager.add_task("Another")
+    assert task_manager.generation > generation
+
+    generation = task_manager.generation
+    task_manager.refresh()
+    assert task_manager.generation > generation
+
+
+def test_grouping_is_reused_until_lists_change(task_manager):
+    grouped = task_manager.get_tasks_by_project()
+    assert task_manager.get_tasks_by_project() is grouped
+    assert grouped[0] == ["Home", "Work"]
+
+    task_manager.add_task("Plant tree", project="Garden")
+    regrouped = task_manager.get_tasks_by_project()
+    assert regrouped is not grouped
+    assert regrouped[0] == ["Garden", "Home", "Work"]
+
+    task_manager.filter_tag = "code"
+    task_manager.apply_filters()
+    tags, by_tag, _ = task_manager.get_tasks_by_tag()
+    assert tags == ["code"]
+    assert descriptions(by_tag["code"]) == ["Review PR"]
+
+
+def test_completed_count_is_fetched_once(task_manager, fake_tw):
+    assert task_manager.completed_count() == 1
+    counts = len(fake_tw.commands)
+
+    task_manager.complete_task(0)
+    task_manager.complete_task(0)
+    assert task_manager.completed_count() == 3
+    assert [c for c in fake_tw.commands[counts:] if c[-1] == "count"] == []
+
+
+def test_bulk_operations_run_one_command(task_manager, fake_tw):
+    for idx in (0, 1, 3):
+        task_manager.toggle_mark(idx)
+    task_manager.toggle_mark(3)
+    assert descriptions(task_manager.marked_tasks()) == ["Write report", "Review PR"]
+
+    commands = len(fake_tw.commands)
+    assert task_manager.bulk_modify(project="Office", tags=["q1", "late"], priority="h") == 2
+    modify, export = fake_tw.commands[commands:]
+    assert modify[2:] == ["modify", "project:Office", "+q1", "+late", "priority:H"]
+    assert export[-1] == "export"
+    assert task_manager.marked == set()
+    assert task_manager.projects == ["Home", "Office"]
+    assert "late" in task_manager.tags
+
+    task_manager.toggle_mark(0)
+    task_manager.toggle_mark(1)
+    assert task_manager.bulk_complete() == 2
+    assert descriptions(task_manager.current_tasks) == ["Call mum", "Buy milk"]
+    assert task_manager.completed_count() == 3
+
+
+def test_failed_bulk_command_is_reported_and_read_back(task_manager, fake_tw, monkeypatch):
+    monkeypatch.setattr(TaskWriter, "RETRY_DELAYS", (0.01,))
+    execute_command = fake_tw.execute_command
+    attempts = []
+
+    def failing(args, **kwargs):
+        if "done" not in args:
+            return execute_command(args, **kwargs)
+        attempts.append(args)
+        if len(attempts) == 1:
+            raise TaskWarriorException("database is locked")
+        # Taskwarrior completes the first task, then a hook rejects the second
+        execute_command([args[0], "done"], **kwargs)
+        raise TaskWarriorException("Hook rejected the change\nCommand used: task done")
+
+    monkeypatch.setattr(fake_tw, "execute_command", failing)
+    task_manager.toggle_mark(0)
+    task_manager.toggle_mark(1)
+    assert task_manager.bulk_complete() == 0
+
+    assert len(attempts) == 2
+    assert task_manager.write_error == "Hook rejected the change"
+    assert descriptions(task_manager.current_tasks) == ["Review PR", "Call mum", "Buy milk"]
+    assert len(task_manager.marked) == 2
+
+
+def test_set_dependency_keeps_existing_ones(task_manager, fake_tw):
+    tasks = {t["description"]: t for t in task_manager.current_tasks}
+    task_manager.set_dependency(0, tasks["Buy milk"])
+    # Buy milk is now blocking, so it ranks above Write report
+    idx = descriptions(task_manager.current_tasks).index("Write report")
+    task_manager.set_dependency(idx, tasks["Call mum"])
+
+    report = task_manager.store.select(text="report")[0]
+    dependencies = descriptions(task_manager.store.dependencies_of(report))
+    assert sorted(dependencies) == ["Buy milk", "Call mum"]
+
+
+def test_hook_updates_apply_without_exports(task_manager, fake_tw):
+    exports = len(fake_tw.commands)
+    report = next(t for t in task_manager.current_tasks if t.description == "Write report")
+    milk = next(t for t in task_manager.current_tasks if t.description == "Buy milk")
+
+    changed = {k: v for k, v in fake_tw.db[report.uuid].items() if k not in ("id", "urgency")}
+    changed["description"] = "Write summary"
+    deleted = dict(fake_tw.db[milk.uuid], status="deleted")
+    added = {"uuid": "new-uuid", "description": "From elsewhere", "status": "pending",
+             "entry": "20240101T000000Z", "project": "Garden"}
+    assert task_manager.apply_external([changed, deleted, added]) == 3
+
+    assert fake_tw.commands[exports:] == []
+    summary = next(t for t in task_manager.current_tasks if t.uuid == report.uuid)
+    assert (summary.description, summary.id, summary.urgency) == ("Write summary", report.id, 5.0)
+    assert "Buy milk" not in descriptions(task_manager.current_tasks)
+    assert "From elsewhere" in descriptions(task_manager.current_tasks)
+    assert "Garden" in task_manager.projects
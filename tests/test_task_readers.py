@@ -0,0 +1,249 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import models
+import task_loader
+from models import TaskManager
+from task_readers import SqliteReader, TaskwarriorReader, make_reader
+
+
+def epoch(*args):
+    return str(int(datetime(*args, tzinfo=timezone.utc).timestamp()))
+
+
+def make_replica(path, rows, working_set):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE tasks (uuid STRING PRIMARY KEY, data STRING)")
+    conn.execute("CREATE TABLE working_set (id INTEGER PRIMARY KEY, uuid STRING)")
+    for uuid, data in rows.items():
+        conn.execute("INSERT INTO tasks VALUES (?, ?)", (uuid, json.dumps(data)))
+    for id_, uuid in enumerate(working_set, 1):
+        conn.execute("INSERT INTO working_set VALUES (?, ?)", (id_, uuid))
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+@pytest.fixture
+def replica(tmp_path):
+    """A minimal taskchampion.sqlite3 with three tasks"""
+    rows = {
+        "u-1": {
+            "status": "pending", "description": "Ship release", "project": "Work",
+            "tag_urgent": "", "tag_next": "", "dep_u-2": "x", "priority": "H",
+            "entry": epoch(2024, 1, 1), "modified": epoch(2024, 1, 2),
+            "annotation_" + epoch(2024, 1, 3): "remember changelog",
+        },
+        "u-2": {
+            "status": "pending", "description": "Write tests",
+            "entry": epoch(2024, 1, 1), "modified": epoch(2024, 1, 5),
+        },
+        "u-3": {
+            "status": "completed", "description": "Plan", "project": "Home", "tag_next": "",
+            "entry": epoch(2024, 1, 1), "modified": epoch(2024, 1, 1), "end": epoch(2024, 1, 1),
+        },
+    }
+    return make_replica(tmp_path / "taskchampion.sqlite3", rows, ["u-1", "u-2"])
+
+
+def test_sqlite_reader_decodes_rows(fake_tw, replica):
+    reader = SqliteReader(fake_tw, replica)
+    tasks = {t["uuid"]: t for t in reader.pending()}
+
+    assert set(tasks) == {"u-1", "u-2"}
+    ship = tasks["u-1"]
+    assert ship["id"] == 1
+    assert ship["project"] == "Work"
+    assert ship["tags"] == {"urgent", "next"}
+    assert ship["due"] is None
+    assert ship["entry"] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert ship["annotations"] == ("remember changelog",)
+    assert ship["depends"] == ("u-2",)
+
+
+def test_sqlite_reader_computes_dependency_urgency(fake_tw, replica):
+    tasks = {t["uuid"]: t for t in SqliteReader(fake_tw, replica).pending()}
+    # u-1 is blocked by u-2, which in turn is blocking
+    assert tasks["u-2"]["urgency"] > 8.0
+    assert tasks["u-1"]["urgency"] > tasks["u-2"]["urgency"]
+
+
+def test_sqlite_reader_delta_reads_only_touch_their_rows(fake_tw, replica, monkeypatch):
+    reader = SqliteReader(fake_tw, replica)
+    reader.pending()
+    statements = []
+    connect = reader._connect
+
+    def traced():
+        conn = connect()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(reader, "_connect", traced)
+    # u-2 no longer blocks anything once u-1 drops its dependency
+    conn = sqlite3.connect(replica)
+    data = json.loads(conn.execute("SELECT data FROM tasks WHERE uuid = 'u-1'").fetchone()[0])
+    del data["dep_u-2"]
+    data["modified"] = epoch(2024, 1, 6)
+    conn.execute("UPDATE tasks SET data = ? WHERE uuid = 'u-1'", (json.dumps(data),))
+    conn.commit()
+    conn.close()
+
+    changed = reader.modified_since(datetime(2024, 1, 3, tzinfo=timezone.utc))
+    assert sorted(t["uuid"] for t in changed) == ["u-1", "u-2"]
+    assert not any("json_each" in sql or "'pending'" in sql for sql in statements)
+    assert [t["urgency"] < 8.0 for t in reader.get_many(["u-2"])] == [True]
+
+
+def test_sqlite_reader_queries(fake_tw, replica):
+    reader = SqliteReader(fake_tw, replica)
+    assert reader.count("pending") == 2
+    assert reader.count("completed") == 1
+    assert reader.completed_page(project="Work") == []
+    assert reader.completed_page(tag="urgent") == []
+    assert [t["uuid"] for t in reader.completed_page(project="Home", tag="next")] == ["u-3"]
+    assert [t["uuid"] for t in reader.completed_page(limit=1)] == ["u-3"]
+    assert reader.completed_page(before=datetime(2024, 1, 1, tzinfo=timezone.utc)) == []
+    assert [t["uuid"] for t in reader.get_many(["u-2"])] == ["u-2"]
+
+    since = datetime(2024, 1, 3, tzinfo=timezone.utc)
+    assert [t["uuid"] for t in reader.modified_since(since)] == ["u-2"]
+
+
+def test_task_manager_reads_through_sqlite(fake_tw, replica):
+    task_manager = TaskManager(tw=fake_tw, reader=SqliteReader(fake_tw, replica))
+    assert [t["description"] for t in task_manager.current_tasks] == ["Ship release", "Write tests"]
+
+
+def test_task_manager_pages_completed_tasks(fake_tw, tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "COMPLETED_PAGE", 2)
+    monkeypatch.setattr(task_loader, "COMPLETED_PAGE", 2)
+    rows = {"p-1": {"status": "pending", "description": "Open", "entry": epoch(2024, 1, 1)}}
+    for day in range(1, 8):
+        rows[f"c-{day}"] = {
+            "status": "completed", "description": f"Done {day}",
+            "entry": epoch(2024, 1, 1), "end": epoch(2024, 2, day),
+        }
+    # Two tasks finished in the same second land on the same page
+    rows["c-tie"] = dict(rows["c-4"], description="Done 4 too")
+    path = make_replica(tmp_path / "taskchampion.sqlite3", rows, ["p-1"])
+    task_manager = TaskManager(tw=fake_tw, reader=SqliteReader(fake_tw, path))
+
+    task_manager.toggle_completed()
+    assert [t["description"] for t in task_manager.current_tasks] == ["Open", "Done 7", "Done 6"]
+    # Not near the end of the list yet
+    assert not task_manager.load_completed_near(0)
+
+    while task_manager.load_completed_near(len(task_manager.current_tasks) - 1):
+        pass
+    completed = [t["description"] for t in task_manager.current_tasks[1:]]
+    assert sorted(completed[3:5]) == ["Done 4", "Done 4 too"]
+    assert completed[:3] + completed[5:] == ["Done 7", "Done 6", "Done 5", "Done 3", "Done 2", "Done 1"]
+    assert not task_manager.completed_more
+
+
+def test_completed_pages_slide_within_the_window(fake_tw, tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "COMPLETED_PAGE", 2)
+    monkeypatch.setattr(task_loader, "COMPLETED_PAGE", 2)
+    monkeypatch.setattr(TaskManager, "COMPLETED_WINDOW", 3)
+    rows = {"p-1": {"status": "pending", "description": "Open", "entry": epoch(2024, 1, 1)}}
+    for day in range(1, 8):
+        rows[f"c-{day}"] = {
+            "status": "completed", "description": f"Done {day}",
+            "entry": epoch(2024, 1, 1), "end": epoch(2024, 2, day),
+        }
+    rows["c-tie"] = dict(rows["c-4"], description="Done 4 too")
+    path = make_replica(tmp_path / "taskchampion.sqlite3", rows, ["p-1"])
+    task_manager = TaskManager(tw=fake_tw, reader=SqliteReader(fake_tw, path))
+    task_manager.toggle_completed()
+
+    # Scrolling to the oldest drops the newest, never splitting a tie
+    while task_manager.load_completed_near(len(task_manager.current_tasks) - 1):
+        pass
+    assert [t["description"] for t in task_manager.current_tasks] == [
+        "Open", "Done 3", "Done 2", "Done 1"
+    ]
+    assert not task_manager.completed_more
+
+    # Scrolling back up reads them again and drops the oldest
+    while task_manager.load_completed_near(1):
+        pass
+    assert [t["description"] for t in task_manager.current_tasks] == [
+        "Open", "Done 7", "Done 6", "Done 5"
+    ]
+    assert task_manager.completed_after is None
+    assert task_manager.completed_more
+
+
+def test_completed_paging_stops_when_the_filter_lists_none(fake_tw, tmp_path, monkeypatch):
+    monkeypatch.setattr(models, "COMPLETED_PAGE", 2)
+    monkeypatch.setattr(task_loader, "COMPLETED_PAGE", 2)
+    monkeypatch.setattr(TaskManager, "COMPLETED_WINDOW", 3)
+    rows = {"p-1": {"status": "pending", "description": "Open", "entry": epoch(2024, 1, 1)}}
+    for day in range(1, 8):
+        rows[f"c-{day}"] = {
+            "status": "completed", "description": f"Done {day}",
+            "entry": epoch(2024, 1, 1), "end": epoch(2024, 2, day),
+        }
+    path = make_replica(tmp_path / "taskchampion.sqlite3", rows, ["p-1"])
+    task_manager = TaskManager(tw=fake_tw, reader=SqliteReader(fake_tw, path))
+    task_manager.toggle_completed()
+    task_manager.set_filter("Open")
+    assert [t["description"] for t in task_manager.current_tasks] == ["Open"]
+
+    # The selection sits near both ends of the short list; a page that lists
+    # nothing is not followed by another, in either direction
+    reads = 0
+    while task_manager.load_completed_near(0):
+        reads += 1
+        assert reads < 3
+    assert reads == 1
+
+    # Changing the filters allows reading again
+    task_manager.set_filter("Done")
+    assert task_manager.load_completed_near(len(task_manager.current_tasks) - 1)
+
+
+def test_cli_reader_pages_completed_tasks_by_end_date(fake_tw):
+    fake_tw.db.clear()
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(10):
+        end = (start + timedelta(days=20 * i)).strftime("%Y%m%dT%H%M%SZ")
+        fake_tw.insert({"description": f"Done {i}", "status": "completed", "end": end})
+    # Finished in the same second as Done 8
+    fake_tw.insert({"description": "Done 8 too", "status": "completed", "end": "20240609T000000Z"})
+    reader = TaskwarriorReader(fake_tw)
+
+    # Pages hold the tasks nearest the bound, however many the windows
+    # read, plus those sharing the last one's end time
+    first = reader.completed_page(before=datetime(2024, 12, 1, tzinfo=timezone.utc), limit=2)
+    assert sorted(t["description"] for t in first) == ["Done 8", "Done 8 too", "Done 9"]
+    pages = [first]
+    while pages[-1]:
+        pages.append(reader.completed_page(before=pages[-1][-1]["end"], limit=2))
+    assert [len(page) for page in pages] == [3, 2, 2, 2, 2, 0]
+    rest = [t["description"] for page in pages[1:] for t in page]
+    assert rest == [f"Done {i}" for i in range(7, -1, -1)]
+
+    newer = reader.completed_page(after=pages[-2][-1]["end"], limit=2)
+    assert [t["description"] for t in newer] == ["Done 2", "Done 1"]
+    # Past the start of the history the windows stop growing, and the reads
+    # stop once nothing older is left
+    commands = len(fake_tw.commands)
+    assert reader.completed_page(before=start, limit=2) == []
+    windows = [c for c in fake_tw.commands[commands:] if c[-1] == "export"]
+    assert len(windows) == 3
+    assert fake_tw.commands[-1][-1] == "count"
+
+
+def test_cli_reader_counts_without_exporting(fake_tw):
+    reader = TaskwarriorReader(fake_tw)
+    assert reader.count("completed") == 1
+    assert reader.count("pending") == 4
+    assert fake_tw.commands == [["status:'completed'", "count"], ["status:'pending'", "count"]]
+
+
+def test_make_reader_falls_back_to_cli(fake_tw):
+    assert isinstance(make_reader(fake_tw), TaskwarriorReader)
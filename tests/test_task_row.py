@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from task_row import TaskRow, parse_timestamp
+
+
+EXPORTED = {
+    "uuid": "u-1", "id": 3, "description": "Ship release", "project": "Work",
+    "tags": ["next", "urgent"], "urgency": 9.5, "priority": "H", "status": "pending",
+    "depends": ["u-2"], "entry": "20240101T000000Z", "modified": "20240102T123000Z",
+    "due": "20240110T170000Z", "annotations": [{"entry": "20240103T000000Z", "description": "note"}],
+}
+
+
+def test_parse_timestamp():
+    moment = parse_timestamp("20240102T123000Z")
+    assert moment == datetime(2024, 1, 2, 12, 30, tzinfo=timezone.utc)
+    assert moment.tzinfo is not None
+    assert parse_timestamp(None) is None
+
+
+def test_export_round_trip():
+    row = TaskRow.from_export(EXPORTED)
+    assert row["tags"] == {"next", "urgent"}
+    assert row["depends"] == ("u-2",)
+    assert row["annotations"] == ("note",)
+    assert row["recur"] is None
+
+    again = TaskRow.from_export(row.to_export())
+    for field in TaskRow.__slots__:
+        assert getattr(again, field) == getattr(row, field)
+
+
+def test_tasklib_style_lists_are_split():
+    row = TaskRow.from_export({"uuid": "u-1", "tags": "a,b", "depends": "u-2,u-3"})
+    assert row.tags == {"a", "b"}
+    assert row.depends == ("u-2", "u-3")
+
+
+def test_with_changes_copies(fake_tw):
+    row = TaskRow.from_export(EXPORTED)
+    changed = row.with_changes({"project": "Home", "tags": ["home"], "depends": []})
+    assert (changed.project, changed.tags, changed.depends) == ("Home", {"home"}, ())
+    assert (row.project, row.depends) == ("Work", ("u-2",))
+
+    task = changed.to_task(fake_tw)
+    assert task["uuid"] == "u-1"
+    assert task["project"] == "Home"
@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from task_row import TaskRow
+from task_store import TaskStore
+
+
+def rows(fake_tw, status=None):
+    return [
+        TaskRow.from_export(data) for data in fake_tw.db.values()
+        if status is None or data["status"] == status
+    ]
+
+
+def test_indexes_follow_in_place_edits(fake_tw):
+    store = TaskStore()
+    store.load(rows(fake_tw, "pending"))
+    assert store.pending_projects == {"Work": 2, "Home": 1}
+    assert store.pending_tags == {"urgent": 1, "code": 1}
+
+    task = store.select(tag="urgent")[0]
+    task.project = "Home"
+    task.tags = frozenset({"home"})
+    store.put(task)
+
+    assert store.pending_projects == {"Work": 1, "Home": 2}
+    assert store.pending_tags == {"code": 1, "home": 1}
+    assert store.select(project="Home", tag="home") == [task]
+
+    store.discard(task["uuid"])
+    assert store.pending_projects == {"Work": 1, "Home": 1}
+    assert "home" not in store.by_tag
+
+
+def test_select_intersects_project_and_tag(fake_tw):
+    store = TaskStore()
+    store.load(rows(fake_tw, "pending"))
+    assert [t["description"] for t in store.select(project="Work", tag="code")] == ["Review PR"]
+    assert store.select(project="Home", tag="code") == []
+    assert len(store.select()) == 4
+
+
+def test_reverse_dependency_index(fake_tw):
+    a = fake_tw.insert({"description": "Design"})
+    fake_tw.insert({"description": "Build", "depends": [a["uuid"]]})
+    store = TaskStore()
+    store.load(rows(fake_tw, "pending"))
+
+    design = store.get(a["uuid"])
+    build = store.select(text="build")[0]
+    assert store.dependencies_of(build) == [design]
+    assert store.dependents_of(design) == [build]
+
+    store.discard(build["uuid"])
+    assert store.dependents_of(design) == []
+    assert store.dependents == {}
+
+
+def test_dependency_lookup_does_not_query_backend(fake_tw):
+    a = fake_tw.insert({"description": "Design"})
+    fake_tw.insert({"description": "Build", "depends": [a["uuid"]]})
+    store = TaskStore()
+    store.load(rows(fake_tw, "pending"))
+    commands = len(fake_tw.commands)
+
+    build = store.select(text="build")[0]
+    assert [t["description"] for t in store.dependencies_of(build)] == ["Design"]
+    assert len(fake_tw.commands) == commands
+
+
+def test_statistics_follow_status_changes(fake_tw):
+    fake_tw.insert({"description": "Late", "due": "20231225T000000Z"})
+    fake_tw.insert({"description": "Soon", "due": "20240103T000000Z"})
+    store = TaskStore()
+    store.load(rows(fake_tw))
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    assert store.status_counts == {"pending": 6, "completed": 1}
+    assert store.pending_projects == {"Work": 2, "Home": 1}
+    assert store.due_counts(now) == (1, 1)
+
+    task = store.select(text="late")[0]
+    task.status = "completed"
+    store.put(task)
+    assert store.status_counts == {"pending": 5, "completed": 2}
+    assert store.due_counts(now) == (0, 1)
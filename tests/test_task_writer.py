@@ -0,0 +1,117 @@
+import threading
+import time
+import pytest
+from tasklib.backends import TaskWarriorException
+from models import TaskManager
+from task_writer import TaskWriter
+
+
+def descriptions(tasks):
+    return [t["description"] for t in tasks]
+
+
+def settle(task_manager, timeout=2.0):
+    """Wait for background loads and writes and apply their results"""
+    deadline = time.monotonic() + timeout
+    while (task_manager.loading or task_manager.saving) and time.monotonic() < deadline:
+        task_manager.poll_loader()
+        task_manager.poll_writer()
+        time.sleep(0.01)
+    assert not task_manager.loading and not task_manager.saving
+
+
+@pytest.fixture
+def task_manager(fake_tw, monkeypatch):
+    monkeypatch.setattr(TaskWriter, "RETRY_DELAYS", (0.01, 0.01))
+    task_manager = TaskManager(tw=fake_tw, background=True)
+    settle(task_manager)
+    return task_manager
+
+
+def test_edit_is_shown_before_it_is_saved(task_manager, fake_tw, monkeypatch):
+    gate = threading.Event()
+    save_task = fake_tw.save_task
+
+    def slow_save(task):
+        gate.wait(2.0)
+        save_task(task)
+
+    monkeypatch.setattr(fake_tw, "save_task", slow_save)
+    task_manager.edit_task(0, project="Office")
+
+    assert task_manager.saving
+    assert task_manager.current_tasks[0]["project"] == "Office"
+    assert task_manager.projects == ["Home", "Office", "Work"]
+    assert all(data.get("project") != "Office" for data in fake_tw.db.values())
+
+    gate.set()
+    settle(task_manager)
+    assert task_manager.current_tasks[0]["project"] == "Office"
+    assert [d["project"] for d in fake_tw.db.values() if d["description"] == "Write report"] == ["Office"]
+
+
+def test_added_task_gets_its_real_uuid(task_manager, fake_tw):
+    task_manager.add_task("Plant tree", project="Garden")
+    placeholder = task_manager.store.select(project="Garden")[0]["uuid"]
+    # Queued behind the add, against the placeholder
+    idx = descriptions(task_manager.current_tasks).index("Plant tree")
+    task_manager.edit_task(idx, tags=["outside"])
+    settle(task_manager)
+
+    task = task_manager.store.select(project="Garden")[0]
+    assert task["uuid"] != placeholder
+    assert task["uuid"] in fake_tw.db
+    assert list(task["tags"]) == ["outside"]
+    assert placeholder not in task_manager.store
+
+
+def test_locked_database_is_retried(task_manager, fake_tw, monkeypatch):
+    complete_task = fake_tw.complete_task
+    attempts = []
+
+    def contended_complete(task):
+        attempts.append(task["uuid"])
+        if len(attempts) < 3:
+            raise TaskWarriorException("database is locked")
+        complete_task(task)
+
+    monkeypatch.setattr(fake_tw, "complete_task", contended_complete)
+    task_manager.complete_task(0)
+    settle(task_manager)
+
+    assert len(attempts) == 3
+    assert task_manager.write_error is None
+    assert "Write report" not in descriptions(task_manager.current_tasks)
+
+
+def test_failed_write_is_rolled_back(task_manager, fake_tw, monkeypatch):
+    def broken_delete(task):
+        raise TaskWarriorException("Hook rejected the change\nCommand used: task delete")
+
+    monkeypatch.setattr(fake_tw, "delete_task", broken_delete)
+    task_manager.delete_task(0)
+    assert "Write report" not in descriptions(task_manager.current_tasks)
+
+    settle(task_manager)
+    assert descriptions(task_manager.current_tasks)[0] == "Write report"
+    assert task_manager.write_error == "Hook rejected the change"
+
+    task_manager.complete_task(1)
+    settle(task_manager)
+    assert task_manager.write_error is None
+
+
+def test_optimistic_edits_are_ranked_with_configured_coefficients(fake_tw):
+    fake_tw.config = {
+        "urgency.uda.priority.H.coefficient": "20",
+        "urgency.user.tag.home.coefficient": "3",
+    }
+    task_manager = TaskManager(tw=fake_tw, background=True)
+    settle(task_manager)
+
+    idx = descriptions(task_manager.current_tasks).index("Buy milk")
+    task_manager.edit_task(idx, priority="H", tags=["home"])
+    # 1.0 + 20.0 for priority H + 0.8 for one tag + 3.0 for the home tag
+    assert task_manager.current_tasks[0]["description"] == "Buy milk"
+    assert task_manager.current_tasks[0]["urgency"] == 24.8
+    settle(task_manager)
@@ -0,0 +1,33 @@
+from task_row import TaskRow
+from text_index import TextIndex, tokenize
+
+
+def make(uuid, description, project=None, tags=()):
+    return TaskRow(uuid=uuid, description=description, project=project, tags=frozenset(tags))
+
+
+def test_tokenize():
+    assert tokenize("Fix CI-pipeline, again!") == ["fix", "ci", "pipeline", "again"]
+    assert tokenize(None) == []
+
+
+def test_candidates_cover_substrings_across_fields():
+    index = TextIndex()
+    index.add(make("a", "Buy milk", project="Home"))
+    index.add(make("b", "Build pipeline", tags={"ci"}))
+    index.add(make("c", "Call mum"))
+
+    assert set(index.candidates("bu")) == {"a", "b"}
+    assert set(index.candidates("ipel")) == {"b"}
+    assert set(index.candidates("hom")) == {"a"}
+    assert set(index.candidates("buy mi")) == {"a"}
+    assert index.candidates("zzz") == {}
+    assert index.candidates("  - ") is None
+
+
+def test_remove_drops_postings():
+    index = TextIndex()
+    index.add(make("a", "Buy milk"))
+    index.remove("a")
+    assert index.postings == {}
+    assert len(index) == 0
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from urgency import UrgencyEngine, compute_urgency, load_coefficients
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def make_task(**fields):
+    task = dict.fromkeys(
+        ["project", "start", "scheduled", "wait", "tags", "annotations", "due", "entry", "priority",
+         "description"]
+    )
+    # Taskwarrior always sets entry; one entered just now adds no age
+    task["entry"] = NOW
+    task.update(fields)
+    return task
+
+
+def test_empty_task_has_no_urgency():
+    assert compute_urgency(make_task(), now=NOW) == 0.0
+
+
+def test_fields_add_default_coefficients():
+    task = make_task(project="Work", tags={"next"}, priority="H")
+    # project 1.0 + next 15.0 + one tag 0.8 + priority H 6.0
+    assert compute_urgency(task, now=NOW) == 22.8
+
+
+def test_due_and_age_factors():
+    overdue = make_task(due=NOW - timedelta(days=7))
+    assert compute_urgency(overdue, now=NOW) == 12.0
+
+    old = make_task(entry=NOW - timedelta(days=730))
+    assert compute_urgency(old, now=NOW) == 2.0
+
+
+@pytest.mark.parametrize("entry, age_max, exported", [
+    # Urgency Taskwarrior exports for a task with only these set
+    (None, 365.0, 2.0),
+    (NOW - timedelta(days=10), 0.0, 2.0),
+    (NOW - timedelta(days=400), 365.0, 2.0),
+    (NOW - timedelta(days=36, hours=23), 365.0, 0.1973),
+    (NOW - timedelta(hours=23), 365.0, 0.0),
+])
+def test_age_matches_taskwarrior(entry, age_max, exported):
+    task = make_task(entry=entry)
+    assert compute_urgency(task, now=NOW, age_max=age_max) == exported
+
+
+def test_dependency_flags():
+    assert compute_urgency(make_task(), blocking=True, blocked=True, now=NOW) == 3.0
+
+
+def test_coefficients_come_from_config():
+    coefficients, age_max, user = load_coefficients({
+        "urgency.due.coefficient": "9.5",
+        "urgency.age.max": "30",
+        "urgency.user.tag.home.coefficient": "-2",
+        "urgency.inherit": "no",
+        "color.due": "red",
+    })
+    assert coefficients["due"] == 9.5
+    assert coefficients["next"] == 15.0
+    assert age_max == 30.0
+    assert user == (("tag", "home", -2.0),)
+
+
+def test_engine_applies_user_coefficients():
+    engine = UrgencyEngine({
+        "urgency.user.project.Work.coefficient": "4",
+        "urgency.user.keyword.call.coefficient": "2",
+    })
+    task = make_task(project="Work.meetings", description="call Ann")
+    # project 1.0 + Work prefix 4.0 + keyword 2.0
+    assert engine.compute(task, now=NOW) == 7.0
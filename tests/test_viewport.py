@@ -0,0 +1,40 @@
+from task_row import TaskRow
+from ui_components import RowCache, Viewport
+
+
+def test_viewport_follows_selection():
+    viewport = Viewport()
+    assert viewport.scroll_to(0, 100, 10) == 0
+    assert viewport.scroll_to(9, 100, 10) == 0
+    assert viewport.scroll_to(10, 100, 10) == 1
+    assert viewport.scroll_to(50, 100, 10) == 41
+    assert viewport.scroll_to(45, 100, 10) == 41
+    assert viewport.scroll_to(40, 100, 10) == 40
+
+
+def test_viewport_clamps_to_list_end():
+    viewport = Viewport()
+    viewport.scroll_to(90, 100, 10)
+    # The list shrank underneath us
+    assert viewport.scroll_to(5, 8, 10) == 0
+
+
+def test_row_cache_reformats_changed_rows_only():
+    cache = RowCache()
+    calls = []
+
+    def format_row(task, width):
+        calls.append(task.uuid)
+        return f"{task.description}/{width}"
+
+    row = TaskRow(uuid="a", description="Buy milk")
+    assert cache.get("urgency", row, 80, format_row) == "Buy milk/80"
+    assert cache.get("urgency", row, 80, format_row) == "Buy milk/80"
+    assert calls == ["a"]
+
+    # A changed task is a new row; a resize changes the width
+    edited = row.with_changes({"description": "Buy oat milk"})
+    assert cache.get("urgency", edited, 80, format_row) == "Buy oat milk/80"
+    assert cache.get("urgency", edited, 60, format_row) == "Buy oat milk/60"
+    assert cache.get("project", edited, 60, format_row) == "Buy oat milk/60"
+    assert len(calls) == 4
@@ -0,0 +1,109 @@
+import pytest
+from tsakarori import TsakaroriTUI
+from virtual_screen import VirtualScreen, memory_task_manager
+
+TASKS = [
+    {"uuid": "u-1", "id": 1, "description": "Write report", "project": "Work",
+     "tags": ["urgent"], "urgency": 5.0, "status": "pending"},
+    {"uuid": "u-2", "id": 2, "description": "Buy milk", "project": "Home",
+     "urgency": 1.0, "status": "pending"},
+]
+
+
+def run(keys, monkeypatch, tmp_path, size=(24, 80)):
+    # The TUI keeps its colour config under HOME
+    monkeypatch.setenv("HOME", str(tmp_path))
+    with VirtualScreen(*size, keys) as screen:
+        TsakaroriTUI(memory_task_manager(TASKS)).main(screen.stdscr)
+    return screen
+
+
+def test_views_render_to_the_virtual_screen(monkeypatch, tmp_path):
+    screen = run("vq", monkeypatch, tmp_path)
+    first, by_project = screen.frames[0], screen.frames[1]
+
+    # The first frame clears and paints the whole screen
+    assert first.cells_changed >= 24 * 80
+    assert by_project.key == ord("v")
+    assert by_project.calls["addstr"] > 0
+    assert "Project: Home" in "\n".join(screen.text())
+
+
+def test_moving_the_selection_repaints_little(monkeypatch, tmp_path):
+    screen = run("jq", monkeypatch, tmp_path)
+    move = screen.frames[1]
+    assert move.key == ord("j")
+    # Header and footer keep their content; only list rows and details change
+    assert 0 < move.cells_changed < 24 * 80 // 2
+    assert screen.text()[3].startswith("   2. Buy milk")
+
+
+@pytest.mark.parametrize("view", ["all", "by_project", "by_tags"])
+def test_selection_moves_repaint_like_a_full_redraw(view, monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tasks = [dict(TASKS[0], uuid=f"u-{n}", id=n, urgency=float(-n)) for n in range(5)]
+    moved = TsakaroriTUI(memory_task_manager(tasks))
+    moved.current_view = view
+    with VirtualScreen(24, 80, "jjkq") as screen:
+        moved.main(screen.stdscr)
+    # Only the details pane was cleared; the list kept its other rows
+    assert [frame.calls["erase"] for frame in screen.frames[1:4]] == [1, 1, 1]
+
+    drawn = TsakaroriTUI(memory_task_manager(tasks))
+    drawn.current_view = view
+    drawn.selected_index = 1
+    with VirtualScreen(24, 80, "q") as full:
+        drawn.main(full.stdscr)
+    assert screen.physical == full.physical
+
+
+def test_held_keys_are_drawn_once(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tasks = [dict(TASKS[1], uuid=f"u-{n}", id=n, urgency=float(-n)) for n in range(10)]
+    app = TsakaroriTUI(memory_task_manager(tasks))
+    refreshes = []
+    monkeypatch.setattr(app.task_manager, "refresh", lambda: refreshes.append(1))
+    with VirtualScreen(24, 80, ["jjjjjk", "rrr", "q"]) as screen:
+        app.main(screen.stdscr)
+
+    start, moves, refresh, quit = screen.frames
+    assert moves.key == ord("j")
+    assert moves.calls["doupdate"] == 1
+    assert app.selected_index == 4
+    assert refreshes == [1]
+
+
+def test_marks_changed_within_a_batch_are_drawn(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tasks = [dict(TASKS[1], uuid=f"u-{n}", id=n, urgency=float(-n)) for n in range(5)]
+    app = TsakaroriTUI(memory_task_manager(tasks))
+    # Marking moves down; the batch unmarks the first task and marks the
+    # second, ending on the same row with as many marks
+    with VirtualScreen(24, 80, ["m", "kmmk", "q"]) as screen:
+        app.main(screen.stdscr)
+    assert app.task_manager.marked == {"u-1"}
+
+    drawn = TsakaroriTUI(memory_task_manager(tasks))
+    drawn.task_manager.marked = {"u-1"}
+    drawn.selected_index = 1
+    with VirtualScreen(24, 80, "q") as full:
+        drawn.main(full.stdscr)
+    assert screen.physical == full.physical
+
+
+def test_only_repeats_in_a_row_are_collapsed(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    app = TsakaroriTUI(memory_task_manager(TASKS))
+    with VirtualScreen(24, 80, ["uuumuu"]) as screen:
+        assert app.read_keys(screen.stdscr, -1) == [ord("u"), ord("m"), ord("u")]
+
+
+def test_keys_after_a_dialog_key_are_left_for_the_dialog(monkeypatch, tmp_path):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    app = TsakaroriTUI(memory_task_manager(TASKS))
+    with VirtualScreen(24, 80, ["jjaj"]) as screen:
+        assert app.read_keys(screen.stdscr, -1) == [ord("j"), ord("j"), ord("a")]
+        assert screen.pending == [ord("j")]
+        # Nothing else was typed
+        screen.pending = []
+        assert app.read_keys(screen.stdscr, 0) == []
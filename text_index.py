@@ -0,0 +1,69 @@
+import re
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercased word tokens of a piece of task text"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class TextIndex:
+    """Inverted word index over task descriptions, projects and tags.
+
+    A substring query is resolved by finding, for each word in it, the
+    vocabulary tokens containing that word and intersecting their
+    postings. The result is a superset of the tasks containing the query;
+    callers still verify the exact substring on what is left.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self._tokens = {}
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def add(self, task):
+        uuid = task.uuid
+        tokens = set(tokenize(task.description))
+        tokens.update(tokenize(task.project))
+        for tag in task.tags:
+            tokens.update(tokenize(tag))
+
+        self._tokens[uuid] = tokens
+        for token in tokens:
+            self.postings.setdefault(token, {})[uuid] = task
+
+    def remove(self, uuid):
+        for token in self._tokens.pop(uuid, ()):
+            postings = self.postings[token]
+            del postings[uuid]
+            if not postings:
+                del self.postings[token]
+
+    def candidates(self, query):
+        """Map uuid -> task for tasks that may contain `query`.
+
+        Returns None when the query has no word characters, in which case
+        the index cannot narrow anything down.
+        """
+        words = set(tokenize(query))
+        if not words:
+            return None
+
+        result = None
+        # Longer words match fewer tokens, so start with them
+        for word in sorted(words, key=len, reverse=True):
+            matched = {}
+            for token, postings in self.postings.items():
+                if word in token:
+                    matched.update(postings)
+
+            if result is None:
+                result = matched
+            else:
+                result = {uuid: task for uuid, task in result.items() if uuid in matched}
+            if not result:
+                break
+        return result
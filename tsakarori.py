@@ -1,16 +1,43 @@
 #!/usr/bin/env python3
+import argparse
+import cProfile
 import curses
 from models import TaskManager
-from ui_components import UIComponents
+from ui_components import RowCache, ScreenLayout, UIComponents, Viewport
 from dialogs import Dialogs
+from live_updates import UpdateListener
+from profiler import Profiler
+from snapshot_cache import SnapshotCache
 import tsakarori_config
 
 
 class TsakaroriTUI:
-    def __init__(self):
-        self.task_manager = TaskManager()
+    # How often the input loop wakes up to pick up background loads and
+    # writes in flight, to check for hook updates, and otherwise
+    POLL_INTERVAL_MS = 100
+    LISTEN_INTERVAL_MS = 250
+    IDLE_INTERVAL_MS = 1000
+    # Keys that never open a dialog or write over the panels
+    NON_DIALOG_KEYS = {
+        ord("j"), ord("k"), curses.KEY_DOWN, curses.KEY_UP, ord("v"), ord("D"),
+        ord(" "), ord("T"), ord("r"), ord("c"), ord("m"), ord("u"),
+    }
+    # Keys that do the same however often they are pressed in a row, so a
+    # run of them in a batch of input acts once
+    ONCE_PER_BATCH_KEYS = {ord("r"), ord("c"), ord("u")}
+
+    def __init__(self, task_manager=None, profiler=None):
+        self.task_manager = task_manager or TaskManager(background=True, cache=SnapshotCache())
+        # Only set with --profile; see Profiler.attach
+        self.profiler = profiler
+        # Socket the Taskwarrior hook sends changed tasks to, if listening
+        self.listener = None
         self.current_view = "all"
         self.selected_index = 0
+        self.viewport = Viewport()
+        self.row_cache = RowCache()
+        self.layout = None
+        self.drawn_view = None
         self.views = ["all", "by_project", "by_tags", "stats"]
         self.config = tsakarori_config.Config()
 
@@ -51,96 +78,328 @@ class TsakaroriTUI:
         stdscr.refresh()
         curses.napms(500)  # Show message for 500ms
 
+    def clamp_selection(self):
+        self.selected_index = max(
+            0, min(self.selected_index, len(self.task_manager.current_tasks) - 1)
+        )
+
+    def selected_uuid(self):
+        """Uuid of the selected task in the urgency list, if that is the view"""
+        tasks = self.task_manager.current_tasks
+        if self.current_view == "all" and self.selected_index < len(tasks):
+            return tasks[self.selected_index].uuid
+        return None
+
+    def follow_selection(self, uuid):
+        """Keep the task selected before the list was replaced selected"""
+        index = self.task_manager.index_of(uuid) if uuid else None
+        if index is None:
+            self.clamp_selection()
+        else:
+            self.selected_index = index
+
+    def draw(self, stdscr):
+        if self.layout is None:
+            self.layout = ScreenLayout(stdscr)
+        if self.current_view != self.drawn_view:
+            # Stats and task panels overlap
+            self.layout.invalidate()
+            self.drawn_view = self.current_view
+
+        task_manager = self.task_manager
+        self.layout.update(
+            "header",
+            (
+                self.current_view,
+                task_manager.filter_project,
+                task_manager.filter_tag,
+                task_manager.filter_text,
+                task_manager.mark_revision,
+                task_manager.loading,
+                task_manager.saving,
+                task_manager.write_error,
+                task_manager.stale,
+                task_manager.load_error,
+            ),
+            lambda win: UIComponents.draw_header(win, self.current_view, task_manager),
+        )
+
+        if self.current_view == "stats":
+            self.layout.update(
+                "stats",
+                task_manager.generation,
+                lambda win: UIComponents.draw_stats(win, task_manager),
+            )
+        else:
+            self.layout.update(
+                "tasks",
+                (task_manager.generation, self.current_view, task_manager.mark_revision),
+                lambda list_win, details_win: UIComponents.draw_tasks(
+                    list_win,
+                    details_win,
+                    task_manager.current_tasks,
+                    self.selected_index,
+                    self.current_view,
+                    task_manager,
+                    self.viewport,
+                    self.row_cache,
+                ),
+                # Moving the selection repaints two rows and the details
+                selection=self.selected_index,
+                move=lambda list_win, details_win, previous: UIComponents.move_selection(
+                    list_win,
+                    details_win,
+                    task_manager.current_tasks,
+                    previous,
+                    self.selected_index,
+                    self.current_view,
+                    task_manager,
+                    self.viewport,
+                    self.row_cache,
+                ),
+            )
+
+        overlay = None
+        if self.profiler and self.profiler.overlay:
+            overlay = self.profiler.overlay_text()
+        self.layout.update(
+            "footer", overlay, lambda win: UIComponents.draw_footer(win, overlay)
+        )
+        self.layout.refresh()
+
+    def preview_filter(self, stdscr, filter_text):
+        """Apply the text filter while it is being typed and redraw behind the dialog"""
+        self.task_manager.set_filter(filter_text)
+        self.selected_index = 0
+        self.draw(stdscr)
+
     def main(self, stdscr):
         curses.curs_set(0)
         self.setup_colors()
+        stdscr.bkgd(" ", curses.color_pair(4))
         stdscr.clear()
+        # Flush the cleared stdscr now; otherwise the first getch() would
+        # refresh it over the panels
+        stdscr.refresh()
 
+        profiler = self.profiler
+        if profiler:
+            profiler.start_frame(None)
+        redraw = True
         while True:
-            height, width = stdscr.getmaxyx()
-            stdscr.bkgd(" ", curses.color_pair(4))
-            stdscr.clear()
+            selected = self.selected_uuid()
+            if self.task_manager.poll_loader():
+                self.follow_selection(selected)
+                redraw = True
+            if self.task_manager.poll_writer():
+                self.clamp_selection()
+                redraw = True
+            # Changes made by other processes; they wait in the socket while
+            # our own writes are in flight, since the hook reports those too
+            if self.listener and not self.task_manager.saving:
+                if self.task_manager.apply_external(self.listener.receive()):
+                    self.clamp_selection()
+                    redraw = True
+            # Completed tasks are read page by page as the selection nears
+            # either end of those held; pages past the window are dropped
+            selected = self.selected_uuid()
+            if self.task_manager.load_completed_near(self.selected_index):
+                self.follow_selection(selected)
+                redraw = True
 
-            UIComponents.draw_header(stdscr, self.current_view, self.task_manager)
+            if redraw:
+                self.draw(stdscr)
 
-            if self.current_view == "stats":
-                UIComponents.draw_stats(stdscr, self.task_manager)
+            if self.task_manager.loading or self.task_manager.saving:
+                timeout = self.POLL_INTERVAL_MS
+            elif self.listener:
+                timeout = self.LISTEN_INTERVAL_MS
             else:
-                UIComponents.draw_tasks(
-                    stdscr,
-                    self.task_manager.current_tasks,
-                    self.selected_index,
-                    self.current_view,
-                    self.task_manager,
+                timeout = self.IDLE_INTERVAL_MS
+            if profiler:
+                # Wake-ups that drew nothing are not frames
+                profiler.end_frame(keep=redraw)
+            keys = self.read_keys(stdscr, timeout)
+            redraw = bool(keys)
+            if profiler:
+                profiler.start_frame(
+                    keys[0] if keys else -1,
+                    interactive=any(key not in self.NON_DIALOG_KEYS for key in keys),
                 )
+            if not keys:
+                continue
 
-            UIComponents.draw_footer(stdscr)
-            stdscr.refresh()
+            # Dialogs read input from stdscr and expect it to block
+            stdscr.timeout(-1)
+            # The whole batch is handled before the next draw, so a held
+            # key moves the selection in one jump
+            if not all(self.handle_key(stdscr, key) for key in keys):
+                break
 
+    def read_keys(self, stdscr, timeout):
+        """Keys typed since the last frame: the first waited for up to `timeout`
+        ms (none if it expires), then every key already queued behind it"""
+        stdscr.timeout(timeout)
+        key = stdscr.getch()
+        if key == -1:
+            return []
+        keys = [key]
+        stdscr.timeout(0)
+        # Keys typed after one that opens a dialog are the dialog's input
+        while keys[-1] in self.NON_DIALOG_KEYS:
             key = stdscr.getch()
-            if key == ord("q"):
+            if key == -1:
                 break
-            elif key == ord("j") or key == curses.KEY_DOWN:
-                self.selected_index = min(
-                    self.selected_index + 1, len(self.task_manager.current_tasks) - 1
-                )
-            elif key == ord("k") or key == curses.KEY_UP:
-                self.selected_index = max(self.selected_index - 1, 0)
-            elif key == ord("v"):
-                current_idx = self.views.index(self.current_view)
-                self.current_view = self.views[(current_idx + 1) % len(self.views)]
-            elif key == ord("a"):
-                Dialogs.add_task(stdscr, self.task_manager)
-            elif key == ord("e"):
-                Dialogs.edit_task(stdscr, self.task_manager, self.selected_index)
-            elif key == ord("?"):
-                Dialogs.show_help(stdscr, self.config)
-            elif key == ord("D") and self.task_manager.current_tasks:
-                self.task_manager.delete_task(self.selected_index)
-                self.selected_index = min(
-                    self.selected_index, len(self.task_manager.current_tasks) - 1
-                )
-            elif key == ord("d") and self.task_manager.current_tasks:
-                # Handle dependency creation
-                depends_on_task = Dialogs.select_dependency(
-                    stdscr, self.task_manager, self.selected_index
-                )
-                if depends_on_task:
-                    self.task_manager.set_dependency(
-                        self.selected_index, depends_on_task
-                    )
-            elif key == ord(" ") and self.task_manager.current_tasks:
-                self.task_manager.complete_task(self.selected_index)
-            elif key == ord("s"):
-                self.change_color_scheme(stdscr)
-            elif key == ord("T"):
-                self.task_manager.toggle_completed()
-                self.selected_index = min(
-                    self.selected_index, len(self.task_manager.current_tasks) - 1
+            if key not in self.ONCE_PER_BATCH_KEYS or key != keys[-1]:
+                keys.append(key)
+        return keys
+
+    def handle_key(self, stdscr, key):
+        """Act on one key; returns False when it quits"""
+        if key not in self.NON_DIALOG_KEYS:
+            # Dialogs draw over the panels
+            self.layout.invalidate()
+        if key == ord("q"):
+            return False
+        elif key == ord("j") or key == curses.KEY_DOWN:
+            self.selected_index = min(
+                self.selected_index + 1, len(self.task_manager.current_tasks) - 1
+            )
+        elif key == ord("k") or key == curses.KEY_UP:
+            self.selected_index = max(self.selected_index - 1, 0)
+        elif key == ord("v"):
+            current_idx = self.views.index(self.current_view)
+            self.current_view = self.views[(current_idx + 1) % len(self.views)]
+        elif key == ord("a"):
+            Dialogs.add_task(stdscr, self.task_manager)
+        elif key == ord("e"):
+            Dialogs.edit_task(stdscr, self.task_manager, self.selected_index)
+        elif key == ord("?"):
+            Dialogs.show_help(stdscr, self.config)
+        elif key == ord("m") and self.task_manager.current_tasks:
+            self.task_manager.toggle_mark(self.selected_index)
+            self.selected_index = min(
+                self.selected_index + 1, len(self.task_manager.current_tasks) - 1
+            )
+        elif key == ord("u"):
+            self.task_manager.clear_marks()
+        elif key == ord("M") and self.task_manager.marked:
+            Dialogs.bulk_modify(stdscr, self.task_manager)
+            self.clamp_selection()
+        elif key == ord("D") and self.task_manager.marked:
+            self.task_manager.bulk_delete()
+            self.clamp_selection()
+        elif key == ord("D") and self.task_manager.current_tasks:
+            self.task_manager.delete_task(self.selected_index)
+            self.selected_index = min(
+                self.selected_index, len(self.task_manager.current_tasks) - 1
+            )
+        elif key == ord("d") and self.task_manager.current_tasks:
+            # Handle dependency creation
+            depends_on_task = Dialogs.select_dependency(
+                stdscr, self.task_manager, self.selected_index
+            )
+            if depends_on_task:
+                self.task_manager.set_dependency(
+                    self.selected_index, depends_on_task
                 )
-            elif key == ord("p"):
-                project = Dialogs.filter_by_project(stdscr, self.task_manager)
-                if project is not None:
-                    self.task_manager.filter_project = project
-                    self.task_manager.update_task_lists()
-            elif key == ord("t"):
-                tag = Dialogs.filter_by_tag(stdscr, self.task_manager)
-                if tag is not None:
-                    self.task_manager.filter_tag = tag
-                    self.task_manager.update_task_lists()
-            elif key == ord("f"):
-                filter_text = Dialogs.filter_tasks(stdscr)
-                if filter_text is not None:
-                    self.task_manager.set_filter(filter_text)
-                    self.selected_index = 0  # Reset selection
-            elif key == ord("c"):
-                self.task_manager.clear_filters()
-                self.selected_index = 0  # Reset selection
-
-
-def main():
+        elif key == ord(" ") and self.task_manager.marked:
+            self.task_manager.bulk_complete()
+            self.clamp_selection()
+        elif key == ord(" ") and self.task_manager.current_tasks:
+            self.task_manager.complete_task(self.selected_index)
+        elif key == ord("s"):
+            self.change_color_scheme(stdscr)
+        elif key == ord("T"):
+            self.task_manager.toggle_completed()
+            self.selected_index = min(
+                self.selected_index, len(self.task_manager.current_tasks) - 1
+            )
+        elif key == ord("p"):
+            project = Dialogs.filter_by_project(stdscr, self.task_manager)
+            if project is not None:
+                self.task_manager.set_project_filter(project)
+        elif key == ord("t"):
+            tag = Dialogs.filter_by_tag(stdscr, self.task_manager)
+            if tag is not None:
+                self.task_manager.set_tag_filter(tag)
+        elif key == ord("f"):
+            previous_filter = self.task_manager.filter_text
+            filter_text = Dialogs.filter_tasks(
+                stdscr, lambda text: self.preview_filter(stdscr, text)
+            )
+            if filter_text is None:
+                # Cancelled: restore whatever was filtered before
+                self.task_manager.set_filter(previous_filter)
+            else:
+                self.task_manager.set_filter(filter_text)
+            self.selected_index = 0  # Reset selection
+        elif key == ord("r"):
+            self.task_manager.refresh()
+            self.clamp_selection()
+        elif key == curses.KEY_RESIZE:
+            self.layout.resize()
+            self.row_cache.clear()
+        elif key == ord("c"):
+            self.task_manager.clear_filters()
+            self.selected_index = 0  # Reset selection
+
+        return True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Terminal interface for Taskwarrior")
+    parser.add_argument(
+        "--profile", metavar="REPORT",
+        help="time every frame (data refresh, grouping, formatting, curses output) and "
+             "count `task` runs, and write a JSON report to REPORT on exit",
+    )
+    parser.add_argument(
+        "--profile-overlay", action="store_true",
+        help="show the last frame's timings in the footer (implies profiling)",
+    )
+    parser.add_argument(
+        "--cprofile", metavar="STATS",
+        help="run under cProfile and write pstats to STATS on exit; this slows "
+             "every frame, so use it apart from --profile",
+    )
+    parser.add_argument(
+        "--no-live-updates", action="store_true",
+        help="do not listen for changes sent by hooks/tsakarori-notify.py",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     app = TsakaroriTUI()
-    curses.wrapper(app.main)
+    if args.profile or args.profile_overlay:
+        app.profiler = Profiler(overlay=args.profile_overlay)
+        app.profiler.attach(app)
+
+    if not args.no_live_updates:
+        app.listener = UpdateListener.open()
+
+    try:
+        if args.cprofile:
+            profile = cProfile.Profile()
+            try:
+                profile.runcall(curses.wrapper, app.main)
+            finally:
+                profile.dump_stats(args.cprofile)
+        else:
+            curses.wrapper(app.main)
+    finally:
+        if app.listener:
+            app.listener.close()
+    # Edits made just before quitting may still be queued
+    app.task_manager.wait_for_writes()
+    if app.task_manager.write_error:
+        print(f"tsakarori: a change could not be saved: {app.task_manager.write_error}")
+    app.task_manager.save_snapshot()
+    if args.profile:
+        app.profiler.write_report(args.profile)
+        print(f"tsakarori: profile written to {args.profile}")
 
 
 if __name__ == "__main__":
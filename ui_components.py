@@ -1,11 +1,122 @@
 import curses
 from task_service import TaskService
+from task_store import count_due
+
+
+class Viewport:
+    """Scroll position of a list, kept across frames"""
+
+    def __init__(self):
+        self.offset = 0
+
+    def scroll_to(self, selected_row, total_rows, visible_rows):
+        """Scroll just enough to show selected_row and return the first visible row"""
+        if selected_row < self.offset:
+            self.offset = selected_row
+        elif selected_row >= self.offset + visible_rows:
+            self.offset = selected_row - visible_rows + 1
+        # Do not leave blank space below the last row
+        self.offset = max(0, min(self.offset, total_rows - visible_rows))
+        return self.offset
+
+
+class RowCache:
+    """Formatted list row text, reused across frames.
+
+    Entries are keyed by list kind and task uuid and hold the row they were
+    formatted from: rows are replaced, never edited, when a task changes, so
+    a different row object or list width means the text is stale.
+    """
+
+    # Entries of tasks that left the lists are not tracked; past this many
+    # the cache simply starts over
+    MAX_ENTRIES = 20000
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, kind, task, width, format_row):
+        key = (kind, task.uuid)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] is task and entry[1] == width:
+            return entry[2]
+        if len(self.entries) >= self.MAX_ENTRIES:
+            self.entries.clear()
+        text = format_row(task, width)
+        self.entries[key] = (task, width, text)
+        return text
+
+    def clear(self):
+        self.entries.clear()
+
+
+class ScreenLayout:
+    """Header, list/details, stats and footer windows of the main screen.
+
+    Each panel is repainted only when the key describing its content
+    changes; curses then sends just the changed cells on doupdate().
+    """
+
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.resize()
+
+    def resize(self):
+        height, width = self.stdscr.getmaxyx()
+        list_width = width // 2
+        body_height = max(height - 2, 1)
+        self.panels = {
+            "header": [curses.newwin(1, width, 0, 0)],
+            "tasks": [
+                curses.newwin(body_height, list_width + 1, 1, 0),
+                curses.newwin(body_height, max(width - list_width - 1, 1), 1, list_width + 1),
+            ],
+            "stats": [curses.newwin(body_height, width, 1, 0)],
+            "footer": [curses.newwin(1, width, height - 1, 0)],
+        }
+        for windows in self.panels.values():
+            for win in windows:
+                win.bkgd(" ", curses.color_pair(4))
+        self.invalidate()
+
+    def invalidate(self):
+        """Force every panel to be repainted, e.g. after a dialog covered it"""
+        self.drawn = {}
+
+    def update(self, name, key, draw, selection=None, move=None):
+        """Repaint a panel with draw(*windows) if its key changed since the last paint.
+
+        If only `selection` changed, move(*windows, previous_selection) may
+        repaint just what the new selection changes instead; it returns
+        False when it cannot (e.g. the list has to scroll), and the whole
+        panel is repainted.
+        """
+        windows = self.panels[name]
+        if name in self.drawn and self.drawn[name][0] == key:
+            previous = self.drawn[name][1]
+            if previous == selection:
+                return
+            if move is not None and move(*windows, previous):
+                for win in windows:
+                    win.noutrefresh()
+                self.drawn[name] = (key, selection)
+                return
+
+        for win in windows:
+            win.erase()
+        draw(*windows)
+        for win in windows:
+            win.noutrefresh()
+        self.drawn[name] = (key, selection)
+
+    def refresh(self):
+        curses.doupdate()
 
 
 class UIComponents:
     @staticmethod
-    def draw_header(stdscr, current_view, task_manager):
-        height, width = stdscr.getmaxyx()
+    def draw_header(win, current_view, task_manager):
+        height, width = win.getmaxyx()
 
         # Build filter info
         filters = []
@@ -17,107 +128,130 @@ class UIComponents:
             filters.append(f"Text:{task_manager.filter_text}")
 
         filter_str = " | Filters: " + ", ".join(filters) if filters else ""
-        header = f" Tsakarori | View: {current_view}{filter_str} | Press '?' for help "
+        marked_str = f" | {len(task_manager.marked)} marked" if task_manager.marked else ""
+        status_str = ""
+        if task_manager.stale:
+            status_str = " | cached, refreshing…"
+        elif task_manager.loading:
+            status_str = " | refreshing…"
+        elif task_manager.load_error:
+            status_str = " | load failed"
+        if task_manager.saving:
+            status_str += " | saving…"
+        header = f" Tsakarori | View: {current_view}{filter_str}{marked_str}{status_str} | Press '?' for help "
+
+        # A failed write replaces the header until the next write succeeds
+        if task_manager.write_error:
+            header = f" Save failed, change undone: {task_manager.write_error} "
+            win.attron(curses.color_pair(5) | curses.A_REVERSE)
+            win.addstr(0, 0, (header + " " * (width - len(header) - 1))[: width - 1])
+            win.attroff(curses.color_pair(5) | curses.A_REVERSE)
+            return
 
-        stdscr.attron(curses.color_pair(1))
-        stdscr.addstr(0, 0, header + " " * (width - len(header) - 1))
-        stdscr.attroff(curses.color_pair(1))
+        win.attron(curses.color_pair(1))
+        win.addstr(0, 0, (header + " " * (width - len(header) - 1))[: width - 1])
+        win.attroff(curses.color_pair(1))
 
     @staticmethod
-    def draw_footer(stdscr):
-        height, width = stdscr.getmaxyx()
-        footer = " q:Quit | a:Add | d:Add dependency | D:Delete | e:Edit | f:Filter | v:Change View | ?:Help "
-        stdscr.attron(curses.color_pair(2))
-        stdscr.addstr(height - 1, 0, footer + " " * (width - len(footer) - 1))
-        stdscr.attroff(curses.color_pair(2))
+    def draw_footer(win, overlay=None):
+        height, width = win.getmaxyx()
+        footer = " q:Quit | a:Add | d:Add dependency | D:Delete | e:Edit | m:Mark | f:Filter | v:Change View | ?:Help "
+        win.attron(curses.color_pair(2))
+        win.addstr(0, 0, (footer + " " * (width - len(footer) - 1))[: width - 1])
+        win.attroff(curses.color_pair(2))
+
+        # Frame timings from --profile-overlay cover the right of the key help
+        if overlay:
+            overlay = overlay[: width - 1]
+            win.attron(curses.color_pair(5) | curses.A_REVERSE)
+            win.addstr(0, width - 1 - len(overlay), overlay)
+            win.attroff(curses.color_pair(5) | curses.A_REVERSE)
 
     @staticmethod
-    def draw_task_list(stdscr, current_tasks, selected_index):
-        height, width = stdscr.getmaxyx()
-        list_width = width // 2
-        start_y = 0
-        max_tasks = height - 2
+    def format_task_row(task, list_width, metadata):
+        """Row text after the mark column: id, description and as much metadata as fits"""
+        desc_width = 30
+        task_id = f"{task.id:3}"
+        description = f"{task.description[:desc_width]:<{desc_width}}"
+
+        # Truncate metadata if too long; one column is left for the mark
+        available_width = list_width - 1 - len(task_id) - len(description) - 2
+        if len(metadata) > available_width:
+            metadata = metadata[: available_width - 3] + "...)"
+
+        return (task_id + ". " + description + metadata)[: list_width - 1]
+
+    @staticmethod
+    def row_formatter(format_metadata):
+        """format_row for RowCache.get: a task row with format_metadata's metadata"""
+        def format_row(task, list_width):
+            metadata = format_metadata(task, f"U:{task.urgency:4.1f}")
+            return UIComponents.format_task_row(task, list_width, metadata)
+        return format_row
+
+    @staticmethod
+    def urgency_metadata(task, urgency):
+        project = task.project or "None"
+        tags = ",".join(sorted(task.tags))
+        return f" ({urgency}, {project}, [{tags}])"
+
+    @staticmethod
+    def draw_list_row(win, y, text, list_width, selected, dim=False):
+        """One task row; the selected row is filled with the selection colour"""
+        if selected:
+            attr = curses.color_pair(3) | (curses.A_DIM if dim else curses.A_BOLD)
+        else:
+            attr = curses.color_pair(4) | (curses.A_DIM if dim else 0)
+        win.attron(attr)
+        # Padding up to the separator also wipes a previous selection fill
+        win.addstr(y, 0, text.ljust(list_width))
+        win.attroff(attr)
+
+    @staticmethod
+    def draw_task_list(win, current_tasks, selected_index, viewport=None, marked=(),
+                       row_cache=None):
+        height, width = win.getmaxyx()
+        list_width = width - 1  # Last column holds the separator
+        max_tasks = height - 1  # First row is left blank
 
         # Draw vertical separator
-        for y in range(1, height - 1):
-            stdscr.addstr(y, list_width, "│")
-
-        # Tasks are already sorted by urgency in TaskManager
-        # Draw task list
-        for idx, task in enumerate(current_tasks):
-            if idx >= start_y and idx < start_y + max_tasks:
-                # Format task info
-                desc_width = 30
-                task_id = f"{task['id']:4}"
-                description = f"{task['description'][:desc_width]:<{desc_width}}"
-
-                # Format metadata
-                urgency = f"U:{float(task['urgency'] or 0):4.1f}"
-                project = task["project"] or "None"
-                tags = ",".join(task["tags"] or [])
-                metadata = f" ({urgency}, {project}, [{tags}])"
-
-                # Truncate metadata if too long
-                available_width = list_width - len(task_id) - len(description) - 2
-                if len(metadata) > available_width:
-                    metadata = metadata[: available_width - 3] + "...)"
-
-                task_str = task_id + ". " + description + metadata
-
-                # Determine if task is completed
-                is_completed = task["status"] == "completed"
-
-                if idx == selected_index:
-                    if is_completed:
-                        stdscr.attron(curses.color_pair(3) | curses.A_DIM)
-                    else:
-                        stdscr.attron(curses.color_pair(3) | curses.A_BOLD)
-                    # Fill entire line width with selection color
-                    stdscr.addstr(idx + 2, 0, " " * (list_width))
-                    # Draw task info
-                    stdscr.addstr(idx + 2, 0, task_str)
-                    if is_completed:
-                        stdscr.attroff(curses.color_pair(3) | curses.A_DIM)
-                    else:
-                        stdscr.attroff(curses.color_pair(3) | curses.A_BOLD)
-                else:
-                    if is_completed:
-                        stdscr.attron(curses.color_pair(4) | curses.A_DIM)
-                    else:
-                        stdscr.attron(curses.color_pair(4))
-                    stdscr.addstr(idx + 2, 0, task_str)
-                    if is_completed:
-                        stdscr.attroff(curses.color_pair(4) | curses.A_DIM)
-                    else:
-                        stdscr.attroff(curses.color_pair(4))
+        win.vline(0, list_width, curses.ACS_VLINE, height)
+
+        format_row = UIComponents.row_formatter(UIComponents.urgency_metadata)
+
+        # Tasks are already sorted by urgency in TaskManager; only the rows
+        # inside the viewport are drawn, and only changed ones are formatted
+        viewport = viewport or Viewport()
+        row_cache = row_cache or RowCache()
+        start_y = viewport.scroll_to(selected_index, len(current_tasks), max_tasks)
+        for idx in range(start_y, min(start_y + max_tasks, len(current_tasks))):
+            task = current_tasks[idx]
+
+            # Marked tasks get a * in front of their id
+            mark = "*" if task.uuid in marked else " "
+            task_str = mark + row_cache.get("urgency", task, list_width, format_row)
+            UIComponents.draw_list_row(
+                win, idx - start_y + 1, task_str, list_width, idx == selected_index,
+                dim=task.status == "completed",
+            )
 
     @staticmethod
-    def draw_task_details(stdscr, task, selected_index, task_manager):
+    def draw_task_details(win, task, selected_index, task_manager):
         if task is None:
             return
 
-        height, width = stdscr.getmaxyx()
-        detail_x = (width // 2) + 1
-        detail_width = width - detail_x - 1
+        height, width = win.getmaxyx()
+        # Lines start in column 1; a full line on the bottom row would write
+        # the window's last cell, which curses reports as an error
+        detail_width = width - 2
 
         # Draw details header
-        stdscr.attron(curses.color_pair(5))
-        stdscr.addstr(1, detail_x + 1, "Task Details")
-        stdscr.attroff(curses.color_pair(5))
-
-        # Get dependencies and force load if it's a LazyUUIDTaskSet
-        depends = task._data.get("depends", None)
-        dep_list = []
-        if depends:
-            # Handle both direct UUID lists and LazyUUIDTaskSet
-            if hasattr(depends, "_data"):
-                dep_uuids = depends._data
-            else:
-                dep_uuids = depends
-            
-            # Convert UUIDs to strings and store in dep_list
-            if dep_uuids:
-                dep_list = [str(uuid) for uuid in dep_uuids]
+        win.attron(curses.color_pair(5))
+        win.addstr(0, 1, "Task Details"[:detail_width])
+        win.attroff(curses.color_pair(5))
+
+        depends = task.depends
+        dep_list = list(task.depends)
 
         # Draw task details
         details = [
@@ -142,30 +276,34 @@ class UIComponents:
             "",
         ]
 
-        # Add dependencies if they exist
+        # Resolve dependencies in both directions from the task store
         blocked_by = []
-        if dep_list:
-            # Find tasks that this task depends on
-            for t in task_manager.tw.tasks:
-                if str(t._data.get("uuid", "")) in dep_list:
-                    project_info = f" [{t['project']}]" if t["project"] else ""
-                    blocked_by.append(f"  - {t['description']}{project_info}")
+        for t in task_manager.store.dependencies_of(task):
+            project_info = f" [{t['project']}]" if t["project"] else ""
+            blocked_by.append(f"  - {t['description']}{project_info}")
 
         if blocked_by:
             details.extend(["Blocked by:", *blocked_by, ""])
 
+        blocking = []
+        for t in task_manager.store.dependents_of(task):
+            project_info = f" [{t['project']}]" if t["project"] else ""
+            blocking.append(f"  - {t['description']}{project_info}")
+
+        if blocking:
+            details.extend(["Blocking:", *blocking, ""])
+
         # Add debug info temporarily
         details.extend([
             "",
             "Debug info:",
             f"depends type: {type(depends)}",
             f"depends value: {depends}",
-            f"depends._data (if exists): {depends._data if hasattr(depends, '_data') else 'N/A'}",
             f"dep_list: {dep_list}",
         ])
 
         for idx, detail in enumerate(details):
-            if idx + 2 < height - 1:  # Leave space for header and footer
+            if idx + 1 < height:
                 if (
                     detail.startswith("Project:")
                     or detail.startswith("Tags:")
@@ -173,254 +311,218 @@ class UIComponents:
                     or detail == "Depends on:"
                     or detail == "Debug info:"
                 ):
-                    stdscr.attron(curses.color_pair(5))
-                    stdscr.addstr(idx + 2, detail_x + 1, detail[:detail_width])
-                    stdscr.attroff(curses.color_pair(5))
+                    win.attron(curses.color_pair(5))
+                    win.addstr(idx + 1, 1, detail[:detail_width])
+                    win.attroff(curses.color_pair(5))
                 else:
-                    stdscr.addstr(idx + 2, detail_x + 1, detail[:detail_width])
+                    win.addstr(idx + 1, 1, detail[:detail_width])
 
     @staticmethod
-    def draw_task_list_by_project(stdscr, task_manager, selected_index):
-        height, width = stdscr.getmaxyx()
-        list_width = width // 2
+    def group_layout(groups):
+        """Flatten (header, tasks) groups into list rows.
+
+        Returns the rows, each either ("header", text) or ("task", task,
+        task_index), and the row index of every task index in order.
+        """
+        rows = []
+        task_rows = []
+        for header, tasks in groups:
+            rows.append(("header", header))
+            for task in tasks:
+                task_rows.append(len(rows))
+                rows.append(("task", task, len(task_rows) - 1))
+        return rows, task_rows
+
+    @staticmethod
+    def draw_grouped_task_list(win, layout, selected_index, kind, format_metadata, viewport=None,
+                               marked=(), row_cache=None):
+        height, width = win.getmaxyx()
+        list_width = width - 1  # Last column holds the separator
+        max_rows = height - 1  # First row is left blank
 
         # Draw vertical separator
-        for y in range(1, height - 1):
-            stdscr.addstr(y, list_width, "│")
-
-        # Get tasks organized by project
-        projects, by_project, no_project_tasks = task_manager.get_tasks_by_project()
-
-        current_y = 2  # Start below header
-        current_index = 0
-        selected_task = None  # Track the selected task
-
-        # Draw projects and their tasks
-        for project in projects:
-            # Draw project header
-            stdscr.attron(curses.color_pair(5) | curses.A_BOLD)
-            stdscr.addstr(current_y, 0, f"Project: {project}")
-            stdscr.attroff(curses.color_pair(5) | curses.A_BOLD)
-            current_y += 1
-
-            # Draw tasks for this project
-            for task in by_project[project]:
-                if current_y < height - 1:  # Leave space for footer
-                    desc_width = 30
-                    task_id = f"{task['id']:4}"
-                    description = f"{task['description'][:desc_width]:<{desc_width}}"
-                    urgency = f"U:{float(task['urgency'] or 0):4.1f}"
-                    tags = ",".join(task["tags"] or [])
-                    metadata = f" ({urgency}, [{tags}])"
-
-                    available_width = list_width - len(task_id) - len(description) - 2
-                    if len(metadata) > available_width:
-                        metadata = metadata[: available_width - 3] + "...)"
-
-                    task_str = task_id + ". " + description + metadata
-
-                    if current_index == selected_index:
-                        selected_task = task  # Store the selected task
-                        stdscr.attron(curses.color_pair(3) | curses.A_BOLD)
-                        stdscr.addstr(current_y, 0, " " * (list_width))
-                        stdscr.addstr(current_y, 0, task_str)
-                        stdscr.attroff(curses.color_pair(3) | curses.A_BOLD)
-                    else:
-                        stdscr.attron(curses.color_pair(4))
-                        stdscr.addstr(current_y, 0, task_str)
-                        stdscr.attroff(curses.color_pair(4))
-
-                current_y += 1
-                current_index += 1
-
-        # Draw tasks with no project
-        if no_project_tasks and current_y < height - 1:
-            stdscr.attron(curses.color_pair(5) | curses.A_BOLD)
-            stdscr.addstr(current_y, 0, "No Project")
-            stdscr.attroff(curses.color_pair(5) | curses.A_BOLD)
-            current_y += 1
-
-            for task in no_project_tasks:
-                if current_y < height - 1:
-                    desc_width = 30
-                    task_id = f"{task['id']:4}"
-                    description = f"{task['description'][:desc_width]:<{desc_width}}"
-                    urgency = f"U:{float(task['urgency'] or 0):4.1f}"
-                    tags = ",".join(task["tags"] or [])
-                    metadata = f" ({urgency}, [{tags}])"
-
-                    available_width = list_width - len(task_id) - len(description) - 2
-                    if len(metadata) > available_width:
-                        metadata = metadata[: available_width - 3] + "...)"
-
-                    task_str = task_id + ". " + description + metadata
-
-                    if current_index == selected_index:
-                        selected_task = task  # Store the selected task
-                        stdscr.attron(curses.color_pair(3) | curses.A_BOLD)
-                        stdscr.addstr(current_y, 0, " " * (list_width))
-                        stdscr.addstr(current_y, 0, task_str)
-                        stdscr.attroff(curses.color_pair(3) | curses.A_BOLD)
-                    else:
-                        stdscr.attron(curses.color_pair(4))
-                        stdscr.addstr(current_y, 0, task_str)
-                        stdscr.attroff(curses.color_pair(4))
-
-                current_y += 1
-                current_index += 1
+        win.vline(0, list_width, curses.ACS_VLINE, height)
+
+        rows, task_rows = layout
+        selected_row = task_rows[selected_index] if selected_index < len(task_rows) else None
+        selected_task = rows[selected_row][1] if selected_row is not None else None
+        format_row = UIComponents.row_formatter(format_metadata)
+
+        # Only the rows inside the viewport are drawn, and only changed ones
+        # are formatted
+        viewport = viewport or Viewport()
+        row_cache = row_cache or RowCache()
+        start = viewport.scroll_to(selected_row or 0, len(rows), max_rows)
+        for y, row in enumerate(rows[start:start + max_rows], 1):
+            if row[0] == "header":
+                win.attron(curses.color_pair(5) | curses.A_BOLD)
+                win.addstr(y, 0, row[1][:list_width])
+                win.attroff(curses.color_pair(5) | curses.A_BOLD)
+                continue
+
+            _, task, current_index = row
+            mark = "*" if task.uuid in marked else " "
+            task_str = mark + row_cache.get(kind, task, list_width, format_row)
+            UIComponents.draw_list_row(win, y, task_str, list_width, current_index == selected_index)
 
         return selected_task
 
     @staticmethod
-    def draw_task_list_by_tag(stdscr, task_manager, selected_index):
-        height, width = stdscr.getmaxyx()
-        list_width = width // 2
+    def project_rows(task_manager):
+        """Row layout of the by-project view; it changes with the task lists only"""
+        def layout():
+            projects, by_project, no_project_tasks = task_manager.get_tasks_by_project()
+            groups = [(f"Project: {project}", by_project[project]) for project in projects]
+            if no_project_tasks:
+                groups.append(("No Project", no_project_tasks))
+            return UIComponents.group_layout(groups)
+        return task_manager.memoize("project_rows", layout)
 
-        # Draw vertical separator
-        for y in range(1, height - 1):
-            stdscr.addstr(y, list_width, "│")
-
-        # Get tasks organized by tag
-        tags, by_tag, no_tag_tasks = task_manager.get_tasks_by_tag()
-
-        current_y = 2  # Start below header
-        current_index = 0
-        selected_task = None  # Track the selected task
-
-        # Draw tags and their tasks
-        for tag in tags:
-            # Draw tag header
-            stdscr.attron(curses.color_pair(5) | curses.A_BOLD)
-            stdscr.addstr(current_y, 0, f"Tag: {tag}")
-            stdscr.attroff(curses.color_pair(5) | curses.A_BOLD)
-            current_y += 1
-
-            # Draw tasks for this tag
-            for task in by_tag[tag]:
-                if current_y < height - 1:  # Leave space for footer
-                    desc_width = 30
-                    task_id = f"{task['id']:4}"
-                    description = f"{task['description'][:desc_width]:<{desc_width}}"
-                    urgency = f"U:{float(task['urgency'] or 0):4.1f}"
-                    project = task["project"] or "None"
-                    metadata = f" ({urgency}, {project})"
-
-                    available_width = list_width - len(task_id) - len(description) - 2
-                    if len(metadata) > available_width:
-                        metadata = metadata[: available_width - 3] + "...)"
-
-                    task_str = task_id + ". " + description + metadata
-
-                    if current_index == selected_index:
-                        selected_task = task  # Store the selected task
-                        stdscr.attron(curses.color_pair(3) | curses.A_BOLD)
-                        stdscr.addstr(current_y, 0, " " * (list_width))
-                        stdscr.addstr(current_y, 0, task_str)
-                        stdscr.attroff(curses.color_pair(3) | curses.A_BOLD)
-                    else:
-                        stdscr.attron(curses.color_pair(4))
-                        stdscr.addstr(current_y, 0, task_str)
-                        stdscr.attroff(curses.color_pair(4))
-
-                current_y += 1
-                current_index += 1
-
-        # Draw tasks with no tags
-        if no_tag_tasks and current_y < height - 1:
-            stdscr.attron(curses.color_pair(5) | curses.A_BOLD)
-            stdscr.addstr(current_y, 0, "No Tags")
-            stdscr.attroff(curses.color_pair(5) | curses.A_BOLD)
-            current_y += 1
-
-            for task in no_tag_tasks:
-                if current_y < height - 1:
-                    desc_width = 30
-                    task_id = f"{task['id']:4}"
-                    description = f"{task['description'][:desc_width]:<{desc_width}}"
-                    urgency = f"U:{float(task['urgency'] or 0):4.1f}"
-                    project = task["project"] or "None"
-                    metadata = f" ({urgency}, {project})"
-
-                    available_width = list_width - len(task_id) - len(description) - 2
-                    if len(metadata) > available_width:
-                        metadata = metadata[: available_width - 3] + "...)"
-
-                    task_str = task_id + ". " + description + metadata
-
-                    if current_index == selected_index:
-                        selected_task = task  # Store the selected task
-                        stdscr.attron(curses.color_pair(3) | curses.A_BOLD)
-                        stdscr.addstr(current_y, 0, " " * (list_width))
-                        stdscr.addstr(current_y, 0, task_str)
-                        stdscr.attroff(curses.color_pair(3) | curses.A_BOLD)
-                    else:
-                        stdscr.attron(curses.color_pair(4))
-                        stdscr.addstr(current_y, 0, task_str)
-                        stdscr.attroff(curses.color_pair(4))
-
-                current_y += 1
-                current_index += 1
+    @staticmethod
+    def project_metadata(task, urgency):
+        tags = ",".join(sorted(task.tags))
+        return f" ({urgency}, [{tags}])"
 
-        return selected_task
+    @staticmethod
+    def tag_rows(task_manager):
+        """Row layout of the by-tags view; it changes with the task lists only"""
+        def layout():
+            tags, by_tag, no_tag_tasks = task_manager.get_tasks_by_tag()
+            groups = [(f"Tag: {tag}", by_tag[tag]) for tag in tags]
+            if no_tag_tasks:
+                groups.append(("No Tags", no_tag_tasks))
+            return UIComponents.group_layout(groups)
+        return task_manager.memoize("tag_rows", layout)
+
+    @staticmethod
+    def tag_metadata(task, urgency):
+        project = task.project or "None"
+        return f" ({urgency}, {project})"
 
     @staticmethod
-    def draw_tasks(stdscr, current_tasks, selected_index, current_view, task_manager):
+    def draw_task_list_by_project(win, task_manager, selected_index, viewport=None,
+                                  row_cache=None):
+        return UIComponents.draw_grouped_task_list(
+            win, UIComponents.project_rows(task_manager), selected_index, "project",
+            UIComponents.project_metadata, viewport, task_manager.marked, row_cache
+        )
+
+    @staticmethod
+    def draw_task_list_by_tag(win, task_manager, selected_index, viewport=None, row_cache=None):
+        return UIComponents.draw_grouped_task_list(
+            win, UIComponents.tag_rows(task_manager), selected_index, "tag",
+            UIComponents.tag_metadata, viewport, task_manager.marked, row_cache
+        )
+
+    @staticmethod
+    def draw_tasks(list_win, details_win, current_tasks, selected_index, current_view, task_manager,
+                   viewport=None, row_cache=None):
         if not current_tasks:
             return
 
         selected_task = None
         if current_view == "by_project":
             selected_task = UIComponents.draw_task_list_by_project(
-                stdscr, task_manager, selected_index
+                list_win, task_manager, selected_index, viewport, row_cache
             )
-            if selected_task:
-                UIComponents.draw_task_details(
-                    stdscr, selected_task, selected_index, task_manager
-                )
         elif current_view == "by_tags":
             selected_task = UIComponents.draw_task_list_by_tag(
-                stdscr, task_manager, selected_index
+                list_win, task_manager, selected_index, viewport, row_cache
             )
-            if selected_task:
-                UIComponents.draw_task_details(
-                    stdscr, selected_task, selected_index, task_manager
-                )
         else:
-            UIComponents.draw_task_list(stdscr, current_tasks, selected_index)
+            UIComponents.draw_task_list(
+                list_win, current_tasks, selected_index, viewport, task_manager.marked, row_cache
+            )
             if selected_index < len(current_tasks):
-                UIComponents.draw_task_details(
-                    stdscr, current_tasks[selected_index], selected_index, task_manager
-                )
+                selected_task = current_tasks[selected_index]
+
+        if selected_task:
+            UIComponents.draw_task_details(
+                details_win, selected_task, selected_index, task_manager
+            )
 
     @staticmethod
-    def draw_stats(stdscr, task_manager):
-        height, width = stdscr.getmaxyx()
-        pending = len(task_manager.tw.tasks.pending())
-        completed = len(task_manager.tw.tasks.completed())
+    def move_selection(list_win, details_win, current_tasks, previous_index, selected_index,
+                       current_view, task_manager, viewport, row_cache):
+        """Repaint the previously and newly selected rows and the details pane.
 
+        Returns False, having drawn nothing, if the new selection is not
+        inside the viewport: the list has to scroll and be drawn in full.
+        """
+        if current_view == "by_project":
+            kind, format_metadata = "project", UIComponents.project_metadata
+            rows, task_rows = UIComponents.project_rows(task_manager)
+        elif current_view == "by_tags":
+            kind, format_metadata = "tag", UIComponents.tag_metadata
+            rows, task_rows = UIComponents.tag_rows(task_manager)
+        else:
+            kind, format_metadata = "urgency", UIComponents.urgency_metadata
+            rows, task_rows = None, range(len(current_tasks))
+        if previous_index is None or not selected_index < len(task_rows):
+            return False
+
+        height, width = list_win.getmaxyx()
+        list_width = width - 1
+        start = viewport.offset
+        if not start <= task_rows[selected_index] < start + height - 1:
+            return False
+
+        format_row = UIComponents.row_formatter(format_metadata)
+        selected_task = None
+        for index in (previous_index, selected_index):
+            if index >= len(task_rows) or not start <= task_rows[index] < start + height - 1:
+                continue
+            task = current_tasks[index] if rows is None else rows[task_rows[index]][1]
+            mark = "*" if task.uuid in task_manager.marked else " "
+            task_str = mark + row_cache.get(kind, task, list_width, format_row)
+            UIComponents.draw_list_row(
+                list_win, task_rows[index] - start + 1, task_str, list_width,
+                index == selected_index, dim=rows is None and task.status == "completed",
+            )
+            selected_task = task
+
+        details_win.erase()
+        UIComponents.draw_task_details(details_win, selected_task, selected_index, task_manager)
+        return True
+
+    @staticmethod
+    def draw_stats(win, task_manager):
+        height, width = win.getmaxyx()
+        pending, projects, tags, dues = task_manager.pending_stats()
+        overdue, due_soon = count_due(dues)
+        filtered = (
+            task_manager.filter_project or task_manager.filter_tag or task_manager.filter_text
+        )
+
+        # Pending figures follow the filters, from counters kept by the task
+        # store when there are none; the completed total is Taskwarrior's
+        # count, fetched the first time only, and is never filtered
         stats = [
-            f"Total pending tasks: {pending}",
-            f"Total completed tasks: {completed}",
-            f"Number of projects: {len(task_manager.projects)}",
-            f"Number of tags: {len(task_manager.tags)}",
+            f"Total pending tasks: {pending}" + (" (filtered)" if filtered else ""),
+            f"Total completed tasks: {task_manager.completed_count()}"
+            + (" (all projects and tags)" if filtered else ""),
+            f"Overdue: {overdue}",
+            f"Due within a week: {due_soon}",
+            f"Number of projects: {len(projects)}",
+            f"Number of tags: {len(tags)}",
             "",
             "Projects:",
-            *[f"  - {p}" for p in task_manager.projects],
+            *[f"  - {p} ({n})" for p, n in sorted(projects.items())],
             "",
             "Tags:",
-            *[f"  - {t}" for t in task_manager.tags],
+            *[f"  - {t} ({n})" for t, n in sorted(tags.items())],
         ]
 
-        stdscr.attron(curses.color_pair(4))
+        win.attron(curses.color_pair(4))
         for idx, stat in enumerate(stats):
-            if idx < height - 2:
+            if idx < height:
                 if stat.startswith("Projects:") or stat.startswith("Tags:"):
-                    stdscr.attron(curses.color_pair(5))
-                    stdscr.addstr(idx + 1, 0, stat[: width - 1])
-                    stdscr.attroff(curses.color_pair(5))
+                    win.attron(curses.color_pair(5))
+                    win.addstr(idx, 0, stat[: width - 1])
+                    win.attroff(curses.color_pair(5))
                 else:
-                    stdscr.addstr(idx + 1, 0, stat[: width - 1])
-        stdscr.attroff(curses.color_pair(4))
+                    win.addstr(idx, 0, stat[: width - 1])
+        win.attroff(curses.color_pair(4))
 
 
 class TaskList:
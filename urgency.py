@@ -0,0 +1,145 @@
+from datetime import datetime
+
+
+# Taskwarrior's built-in urgency coefficients (see `man taskrc`)
+DEFAULT_COEFFICIENTS = {
+    "next": 15.0,
+    "due": 12.0,
+    "blocking": 8.0,
+    "scheduled": 5.0,
+    "active": 4.0,
+    "age": 2.0,
+    "annotations": 1.0,
+    "tags": 1.0,
+    "project": 1.0,
+    "waiting": -3.0,
+    "blocked": -5.0,
+    "uda.priority.H": 6.0,
+    "uda.priority.M": 3.9,
+    "uda.priority.L": 1.8,
+}
+DEFAULT_AGE_MAX = 365.0
+
+
+def _count_factor(count):
+    """Taskwarrior's step function for tag and annotation counts"""
+    if count >= 3:
+        return 1.0
+    return (0.0, 0.8, 0.9)[count]
+
+
+def _due_factor(due, now):
+    days_overdue = (now - due).total_seconds() / 86400.0
+    if days_overdue >= 7.0:
+        return 1.0
+    if days_overdue >= -14.0:
+        return ((days_overdue + 14.0) * 0.8 / 21.0) + 0.2
+    return 0.2
+
+
+def _age_factor(entry, now, age_max):
+    # As Taskwarrior's urgency_age: whole days, and the full factor for
+    # tasks without an entry date, past age.max or with age.max at 0
+    if not entry or not age_max:
+        return 1.0
+    age = int((now - entry).total_seconds() / 86400.0)
+    if age > age_max:
+        return 1.0
+    return age / age_max
+
+
+def load_coefficients(config):
+    """Read urgency settings from Taskwarrior configuration (as tasklib's tw.config).
+
+    Returns the coefficients, urgency.age.max and the user coefficients as
+    (kind, name, coefficient) for urgency.user.<kind>.<name>.coefficient,
+    where kind is "tag", "project" or "keyword". Anything not configured
+    keeps Taskwarrior's default.
+    """
+    coefficients = dict(DEFAULT_COEFFICIENTS)
+    age_max = DEFAULT_AGE_MAX
+    user = []
+    for key, value in config.items():
+        if not key.startswith("urgency."):
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+
+        name = key[len("urgency."):]
+        if name == "age.max":
+            age_max = value
+        elif name.endswith(".coefficient"):
+            name = name[: -len(".coefficient")]
+            kind, _, user_name = name[len("user."):].partition(".")
+            if not name.startswith("user."):
+                coefficients[name] = value
+            elif kind in ("tag", "project", "keyword") and user_name:
+                user.append((kind, user_name, value))
+    return coefficients, age_max, tuple(user)
+
+
+def compute_urgency(task, blocking=False, blocked=False, now=None,
+                    coefficients=DEFAULT_COEFFICIENTS, age_max=DEFAULT_AGE_MAX, user=()):
+    """Compute Taskwarrior's urgency for a task from its own fields.
+
+    `blocking` and `blocked` describe the task's place in the dependency
+    graph, which cannot be derived from the task alone. `user` holds the
+    user coefficients returned by load_coefficients.
+    """
+    now = now or datetime.now().astimezone()
+    tags = task["tags"] or set()
+    urgency = 0.0
+
+    if task["project"]:
+        urgency += coefficients["project"]
+    if task["start"]:
+        urgency += coefficients["active"]
+    if task["scheduled"] and task["scheduled"] < now:
+        urgency += coefficients["scheduled"]
+    if task["wait"] and task["wait"] > now:
+        urgency += coefficients["waiting"]
+    if blocked:
+        urgency += coefficients["blocked"]
+    if blocking:
+        urgency += coefficients["blocking"]
+    if "next" in tags:
+        urgency += coefficients["next"]
+    urgency += coefficients["annotations"] * _count_factor(len(task["annotations"] or []))
+    urgency += coefficients["tags"] * _count_factor(len(tags))
+    if task["due"]:
+        urgency += coefficients["due"] * _due_factor(task["due"], now)
+    urgency += coefficients["age"] * _age_factor(task["entry"], now, age_max)
+    if task["priority"]:
+        urgency += coefficients.get("uda.priority." + task["priority"], 0.0)
+    for kind, name, coefficient in user:
+        if kind == "tag" and name in tags:
+            urgency += coefficient
+        elif kind == "project" and (task["project"] or "").startswith(name):
+            urgency += coefficient
+        elif kind == "keyword" and name in (task["description"] or ""):
+            urgency += coefficient
+
+    return round(urgency, 4)
+
+
+class UrgencyEngine:
+    """compute_urgency with one Taskwarrior configuration's coefficients"""
+
+    def __init__(self, config=None):
+        self.coefficients, self.age_max, self.user = load_coefficients(config or {})
+
+    @classmethod
+    def for_taskwarrior(cls, tw):
+        """Engine for tw's configuration, or Taskwarrior's defaults if it cannot be read"""
+        try:
+            config = tw.config
+        except Exception:
+            config = {}
+        return cls(config)
+
+    def compute(self, task, blocking=False, blocked=False, now=None):
+        return compute_urgency(
+            task, blocking, blocked, now, self.coefficients, self.age_max, self.user
+        )